@@ -0,0 +1,64 @@
+''' Compare the per call cost of validating a payload with the pydantic models.
+
+- lookup: what _validate used to do, getattr(datamodel, model_name) and build the model on every call
+- registry: the validators prepared once by crudapp.validation.registry
+- registry batch: registry.validate_many over the same payloads
+
+Usage:
+>>> DJANGO_SETTINGS_MODULE=rockin.settings python benchmarks/bench_validation.py
+'''
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rockin.settings')
+
+import django
+django.setup()
+
+import datamodel
+from crudapp.validation import registry
+
+NUMBER = 10000
+
+payload = {
+    'id': 1,
+    'well': 'Test Well',
+    'registration_date': '2021-06-22 13:00:00',
+    'collection_date': '2021-06-22 12:00:00',
+    'remarks': 'Test Remarks',
+    'drilling_mud': 'Water-based mud',
+    'lithology': 'Test Lithology',
+    'core_type': 'Core',
+    'core_number': 'C1',
+    'planned_core_number': 'C1',
+    'core_section_number': 1,
+    'core_section_name': 'Test Well-C1-1',
+    'top_depth': 100.0,
+}
+payloads = [dict(payload, core_section_number=number) for number in range(NUMBER)]
+
+
+def lookup():
+    for item in payloads:
+        model = getattr(datamodel, 'Core')
+        try:
+            model(**item)
+        except Exception as e:
+            pass
+
+
+def registry_single():
+    for item in payloads:
+        registry.validate('Core', item)
+
+
+def registry_batch():
+    registry.validate_many('Core', payloads)
+
+
+if __name__ == '__main__':
+    for name, function in [('lookup', lookup), ('registry', registry_single), ('registry batch', registry_batch)]:
+        seconds = min(timeit.repeat(function, number=1, repeat=5))
+        print(f'{name:>15}: {seconds / NUMBER * 1e6:8.2f} us per payload')
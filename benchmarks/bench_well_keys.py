@@ -0,0 +1,108 @@
+''' Compare the samples pointing to their well by name (before) and by id (after).
+
+Two scratch tables with the same rows are created in the configured database:
+- by name: the sample stores the VARCHAR(255) name of the well, what to_field='name' did
+- by id: the sample stores the BIGINT id of the well, what migrate_well_keys converts to
+
+For each one it prints the size of the index on the well column and the time of the
+join that the lists and the reports run (the samples of a set of wells with the well name).
+The scratch tables are dropped at the end.
+
+Usage:
+>>> DJANGO_SETTINGS_MODULE=rockin.settings python benchmarks/bench_well_keys.py
+'''
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rockin.settings')
+
+import django
+django.setup()
+
+from django.db import connection, transaction
+
+WELLS = 500
+SAMPLES = 200000
+REPEAT = 20
+
+WELL_TABLE = 'bench_well'
+TABLES = {
+    'by name': ('bench_sample_by_name', 'varchar(255)'),
+    'by id': ('bench_sample_by_id', 'bigint'),
+}
+
+# Real well names are long, e.g. 'NLOG-DEL-GT-01-S2-SIDETRACK'
+well_names = [f'NLOG-DELFT-GEOTHERMAL-{number:04d}-S{number % 3}' for number in range(WELLS)]
+
+
+def create_tables(cursor):
+    cursor.execute(f'CREATE TABLE {WELL_TABLE} (id bigint PRIMARY KEY, name varchar(255) NOT NULL UNIQUE)')
+    cursor.executemany(f'INSERT INTO {WELL_TABLE} (id, name) VALUES (%s, %s)',
+                       [(number + 1, name) for number, name in enumerate(well_names)])
+
+    wells = [random.randrange(WELLS) for _ in range(SAMPLES)]
+    for label, (table, column_type) in TABLES.items():
+        cursor.execute(f'CREATE TABLE {table} (id bigint PRIMARY KEY, well_id {column_type} NOT NULL, top_depth double precision)')
+        cursor.execute(f'CREATE INDEX {table}_well ON {table} (well_id)')
+        rows = [(number + 1, well_names[well] if label == 'by name' else well + 1, random.random() * 3000)
+                for number, well in enumerate(wells)]
+        cursor.executemany(f'INSERT INTO {table} (id, well_id, top_depth) VALUES (%s, %s, %s)', rows)
+
+
+def drop_tables(cursor):
+    for table, _ in TABLES.values():
+        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+    cursor.execute(f'DROP TABLE IF EXISTS {WELL_TABLE}')
+
+
+def index_size(cursor, table):
+    ''' Bytes used by the index on the well column, None when the database does not tell
+    '''
+    if connection.vendor == 'mysql':
+        cursor.execute(f'ANALYZE TABLE {table}')
+        cursor.fetchall()
+        cursor.execute(
+            'SELECT stat_value * @@innodb_page_size FROM mysql.innodb_index_stats '
+            'WHERE database_name = DATABASE() AND table_name = %s AND index_name = %s AND stat_name = %s',
+            [table, f'{table}_well', 'size'])
+    elif connection.vendor == 'sqlite':
+        try:
+            cursor.execute('SELECT SUM(pgsize) FROM dbstat WHERE name = %s', [f'{table}_well'])
+        except Exception:
+            # sqlite built without the dbstat table
+            return None
+    elif connection.vendor == 'postgresql':
+        cursor.execute('SELECT pg_relation_size(%s)', [f'{table}_well'])
+    else:
+        return None
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def join(cursor, table):
+    def run():
+        # The samples of a few wells with the name of their well, the wells are picked by name
+        key = 'w.name' if table == TABLES['by name'][0] else 'w.id'
+        cursor.execute(
+            f'SELECT w.name, s.id, s.top_depth FROM {table} s JOIN {WELL_TABLE} w ON s.well_id = {key} '
+            f'WHERE w.name IN (%s, %s, %s) ORDER BY s.id', random.sample(well_names, 3))
+        cursor.fetchall()
+    return run
+
+
+if __name__ == '__main__':
+    with connection.cursor() as cursor:
+        drop_tables(cursor)
+        with transaction.atomic():
+            create_tables(cursor)
+        try:
+            for label, (table, _) in TABLES.items():
+                size = index_size(cursor, table)
+                seconds = min(timeit.repeat(join(cursor, table), number=1, repeat=REPEAT))
+                size = f'{size / 1024 / 1024:8.2f} MB' if size is not None else '     n/a'
+                print(f'{label:>8}: index {size}, join {seconds * 1000:8.2f} ms')
+        finally:
+            drop_tables(cursor)
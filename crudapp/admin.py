@@ -1,3 +1,52 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
 
-# Register your models here.
+from crudapp.models import Well
+from crudapp.rename import rename_well
+
+
+class RenameWellForm(forms.Form):
+    new_name = forms.CharField(max_length=255)
+
+
+@admin.action(description='Rename the selected well and its sample names')
+def rename_selected_well(modeladmin, request, queryset):
+    ''' Asks for the new name on an intermediate page, then renames the well with crudapp/rename.py
+    '''
+    if queryset.count() != 1:
+        modeladmin.message_user(request, 'Select a single well to rename.', messages.ERROR)
+        return None
+    well = queryset.get()
+
+    form = RenameWellForm(request.POST if 'apply' in request.POST else None)
+    if form.is_valid():
+        try:
+            renamed = rename_well(well, form.cleaned_data['new_name'])
+        except ValueError as e:
+            form.add_error('new_name', str(e))
+        else:
+            modeladmin.message_user(
+                request, f"Well renamed to {form.cleaned_data['new_name']}, {sum(renamed.values())} samples renamed.")
+            return None
+
+    return TemplateResponse(request, 'admin/crudapp/well/rename_well.html', {
+        **modeladmin.admin_site.each_context(request),
+        'title': f'Rename {well.name}',
+        'well': well,
+        'form': form,
+        'opts': modeladmin.model._meta,
+        'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+    })
+
+
+@admin.register(Well)
+class WellAdmin(admin.ModelAdmin):
+    list_display = ['name', 'closed', 'modified_at']
+    search_fields = ['name']
+    actions = [rename_selected_well]
+
+    def get_readonly_fields(self, request, obj=None):
+        # Renaming through the change form would leave the sample names behind, existing wells are renamed with the action
+        return ['name'] if obj is not None else []
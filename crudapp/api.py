@@ -0,0 +1,347 @@
+''' A small JSON API for the lab-instrument scripts and other machines that need to
+read and write samples without going through the HTML forms.
+
+Every resource is exposed with the same endpoints:
+    GET    api/<resource>/                 list, supports ?fields=, ?after=, ?limit= and ?format=rows
+    POST   api/<resource>/                 create one object or a list of objects
+    PATCH  api/<resource>/                 update a list of objects, each one must have an id
+    GET    api/<resource>/<pk>/            retrieve one object
+    PATCH  api/<resource>/<pk>/            update one object
+    DELETE api/<resource>/<pk>/            delete one object
+    POST   api/<resource>/bulk-edit/       assign the same values to every sample that matches a filter
+
+Machines authenticate with HTTP basic auth, browsers can use their session.
+
+Example:
+>>> curl -u user:pwd https://host/api/cores/?fields=id,core_section_name&limit=500
+'''
+import base64
+import json
+
+from django.contrib.auth import authenticate
+from django.db import IntegrityError, connections, transaction
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.generic import View
+
+from pydantic import ValidationError
+
+from .models import Well, Core, CoreChip, Cuttings, MicroCore, ARCHIVE_MODELS
+from .validation import registry
+from .signals import samples_changed
+from .audit import record_bulk
+from .samples import bulk_create, add_derived_names, get_columns, validation_errors, closed_well_message, closed_wells
+from .routers import ReplicaReadMixin
+from .bulk_edit import bulk_edit, BULK_EDIT_MODELS
+
+API_PREFIX = '/api/'
+
+# The url name of the resource and the django model that it exposes,
+# the pydantic model in datamodel has the same name as the django model
+API_MODELS = {
+    'wells': Well,
+    'cores': Core,
+    'corechips': CoreChip,
+    'cuttings': Cuttings,
+    'microcores': MicroCore,
+}
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+BULK_BATCH_SIZE = 500
+
+# Fields that are filled in by the server and can not be written by clients
+READ_ONLY_FIELDS = ['id', 'registration_date', 'registered_by']
+
+
+def api_response(data, status=200):
+    ''' Serialize without whitespace, responses with thousands of rows are
+    noticeably smaller this way
+    '''
+    return JsonResponse(data, status=status, safe=False,
+                        json_dumps_params={'separators': (',', ':')})
+
+
+def api_error(errors, status=400):
+    if not isinstance(errors, list):
+        errors = [errors]
+    return api_response({'errors': errors}, status=status)
+
+
+def basic_auth_user(request):
+    ''' Return the user of an HTTP basic authorization header or None if
+    there is no such header or the credentials are wrong
+    '''
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if not header.startswith('Basic '):
+        return None
+    try:
+        username, password = base64.b64decode(header[6:]).decode('utf-8').split(':', 1)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return authenticate(request, username=username, password=password)
+
+
+class ApiView(View):
+    ''' Base class of the api views, it takes care of authentication and
+    resolves the model of the requested resource
+    '''
+    model = None
+
+    @method_decorator(csrf_exempt)
+    def dispatch(self, request, *args, **kwargs):
+        self.model = API_MODELS.get(kwargs.get('resource'))
+        if self.model is None:
+            return api_error(f"Unknown resource {kwargs.get('resource')}", status=404)
+
+        user = basic_auth_user(request)
+        if user is not None:
+            # Basic auth can not be forged by another site so it does not need a csrf token
+            request.user = user
+            return super().dispatch(request, *args, **kwargs)
+
+        if not request.user.is_authenticated:
+            return api_error('Authentication credentials were not provided', status=401)
+
+        # Session authentication is what the browser sends automatically, keep csrf for it
+        return csrf_protect(super().dispatch)(request, *args, **kwargs)
+
+    def read_json(self):
+        try:
+            return json.loads(self.request.body or b'null')
+        except ValueError:
+            return None
+
+    def select_columns(self):
+        ''' Apply the ?fields= selection of the request, by default all fields are returned
+        '''
+        columns = get_columns(self.model)
+        fields = self.request.GET.get('fields')
+        if not fields:
+            return columns
+        selected = {}
+        for name in fields.split(','):
+            if name not in columns:
+                raise KeyError(name)
+            selected[name] = columns[name]
+        return selected
+
+    def serialize(self, queryset, columns):
+        rows = queryset.values_list(*columns.values())
+        names = list(columns.keys())
+        return names, [list(row) for row in rows]
+
+    def with_archive(self, columns, order_by=None, limit=None, **filters):
+        ''' The rows of the hot table and of the archive table (the samples of the
+        closed wells, see crudapp/archive.py) that match the filters.
+        With order_by and limit every table is sorted and cut before the union (where the
+        database allows it, MySQL does), the database does not union all the rows of both
+        tables to find a page.
+        '''
+        def table_rows(model, cut):
+            rows = model.objects.filter(**filters).values_list(*columns.values())
+            if cut and order_by is not None:
+                rows = rows.order_by(order_by)
+            return rows[:limit] if cut and limit is not None else rows
+
+        rows = table_rows(self.model, cut=True)
+        archive = ARCHIVE_MODELS.get(self.model)
+        if archive is None:
+            return rows
+        cut = connections[rows.db].features.supports_slicing_ordering_in_compound
+        rows = table_rows(self.model, cut).union(table_rows(archive, cut), all=True)
+        if order_by is not None:
+            rows = rows.order_by(order_by)
+        return rows[:limit] if limit is not None else rows
+
+    def wells_by_name(self, payloads):
+        ''' Fetch all the wells referenced by a batch of payloads with a single query
+        '''
+        names = {payload.get('well') for payload in payloads if payload.get('well')}
+        return Well.objects.in_bulk(names, field_name='name')
+
+    def build_instance(self, payload, wells, instance=None):
+        ''' Copy the payload into a model instance without saving it, the payload
+        was already validated by the pydantic model
+        '''
+        if instance is None:
+            instance = self.model()
+            if hasattr(instance, 'registered_by_id'):
+                instance.registered_by = self.request.user
+
+        for field in self.model._meta.concrete_fields:
+            if field.name not in payload or field.name in READ_ONLY_FIELDS:
+                continue
+            value = payload[field.name]
+            if field.name == 'well':
+                if value not in wells:
+                    raise ValueError(f'Well with name {value} not found.')
+                if wells[value].closed:
+                    raise ValueError(closed_well_message(wells[value]))
+                instance.well = wells[value]
+            else:
+                setattr(instance, field.attname, field.to_python(value))
+        return instance
+
+    def changed(self, instances, action):
+        # The bulk operations do not send the post_save signals
+        record_bulk(self.model, instances, action, user=self.request.user)
+        if self.model is Well:
+            return
+        for well_key in {instance.well_id for instance in instances}:
+            samples_changed(self.model, well_key)
+
+    def add_derived_names(self, payload):
+        return add_derived_names(self.model, payload)
+
+    def check(self, payloads):
+        ''' Validate a batch of payloads with the pydantic models, returns the errors
+        of all the invalid payloads together with their index in the batch
+        '''
+        # Our current pydantic models need an id to be created
+        data = [{'id': 1, **payload} for payload in payloads]
+        errors = []
+        for index, checked in enumerate(registry.validate_many(self.model.__name__, data)):
+            if type(checked) is ValidationError:
+                errors.extend(validation_errors(checked, index))
+        return errors
+
+    def update(self, payloads):
+        ''' Apply a list of partial updates, each payload has the id of the object
+        and only the fields that change
+        '''
+        instances = self.model.objects.in_bulk([payload['id'] for payload in payloads])
+        missing = [payload['id'] for payload in payloads if payload['id'] not in instances]
+        if missing:
+            return api_error(f'Objects with ids {missing} not found.', status=404)
+
+        # Validate the complete object that results from applying the changes
+        columns = get_columns(self.model)
+        names, rows = self.serialize(self.model.objects.filter(pk__in=instances.keys()), columns)
+        current = {}
+        for row in rows:
+            current_object = dict(zip(names, row))
+            current[current_object['id']] = current_object
+
+        errors = self.check([{**current[payload['id']], **payload} for payload in payloads])
+        if errors:
+            return api_error(errors)
+
+        wells = self.wells_by_name(payloads)
+        fields = set()
+        try:
+            for payload in payloads:
+                self.build_instance(payload, wells, instance=instances[payload['id']])
+                fields.update(name for name in payload if name not in READ_ONLY_FIELDS)
+            with transaction.atomic():
+                updated = self.model.objects.bulk_update(
+                    instances.values(), list(fields), batch_size=BULK_BATCH_SIZE) if fields else 0
+            self.changed(instances.values(), 'update')
+        except (ValueError, IntegrityError) as e:
+            return api_error(str(e), status=409 if isinstance(e, IntegrityError) else 400)
+
+        return api_response({'updated': updated})
+
+
+class ApiListView(ReplicaReadMixin, ApiView):
+    def get(self, request, *args, **kwargs):
+        try:
+            columns = self.select_columns()
+            after = int(request.GET.get('after', 0))
+            limit = max(1, min(int(request.GET.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+        except KeyError as e:
+            return api_error(f'Unknown field {e.args[0]}')
+        except ValueError:
+            return api_error('after and limit must be integers')
+
+        # The id is always the first column, it is the key of the next page
+        columns = {'id': 'id', **{name: column for name, column in columns.items() if name != 'id'}}
+        # Keyset pagination, the cost of a page does not grow with the page number
+        names = list(columns.keys())
+        rows = [list(row) for row in self.with_archive(columns, order_by='id', limit=limit, pk__gt=after)]
+
+        next_after = rows[-1][0] if len(rows) == limit else None
+        if request.GET.get('format') == 'rows':
+            return api_response({'fields': names, 'rows': rows, 'next': next_after})
+        return api_response({'results': [dict(zip(names, row)) for row in rows],
+                             'next': next_after})
+
+    def post(self, request, *args, **kwargs):
+        data = self.read_json()
+        payloads = data if isinstance(data, list) else [data]
+        if not all(isinstance(payload, dict) for payload in payloads):
+            return api_error('The body must be a json object or a list of json objects')
+
+        payloads = [self.add_derived_names(payload) for payload in payloads]
+        errors = self.check(payloads)
+        if errors:
+            return api_error(errors)
+
+        wells = self.wells_by_name(payloads)
+        try:
+            instances = [self.build_instance(payload, wells) for payload in payloads]
+            with transaction.atomic():
+                if self.model is not Well and closed_wells({instance.well_id for instance in instances}):
+                    # Closed since the payloads were checked
+                    raise ValueError('Some of the wells were closed meanwhile, their samples can not be changed.')
+                created = bulk_create(self.model, instances, batch_size=BULK_BATCH_SIZE)
+            self.changed(instances, 'create')
+        except (ValueError, IntegrityError) as e:
+            return api_error(str(e), status=409 if isinstance(e, IntegrityError) else 400)
+
+        return api_response({'created': len(created),
+                             'ids': [instance.pk for instance in created]}, status=201)
+
+    def patch(self, request, *args, **kwargs):
+        payloads = self.read_json()
+        if not isinstance(payloads, list) or not all(
+                isinstance(payload, dict) and 'id' in payload for payload in payloads):
+            return api_error('The body must be a list of json objects with an id')
+        return self.update(payloads)
+
+
+class ApiDetailView(ReplicaReadMixin, ApiView):
+    def get(self, request, *args, **kwargs):
+        try:
+            columns = self.select_columns()
+        except KeyError as e:
+            return api_error(f'Unknown field {e.args[0]}')
+        names = list(columns.keys())
+        rows = list(self.with_archive(columns, pk=kwargs['pk']))
+        if not rows:
+            return api_error('Not found.', status=404)
+        return api_response(dict(zip(names, rows[0])))
+
+    def patch(self, request, *args, **kwargs):
+        payload = self.read_json()
+        if not isinstance(payload, dict):
+            return api_error('The body must be a json object')
+        return self.update([{**payload, 'id': kwargs['pk']}])
+
+    def delete(self, request, *args, **kwargs):
+        deleted, _ = self.model.objects.filter(pk=kwargs['pk']).delete()
+        if not deleted:
+            return api_error('Not found.', status=404)
+        return api_response({'deleted': deleted})
+
+
+class ApiBulkEditView(ApiView):
+    ''' The body has the filter of the samples and the values to assign, e.g.
+    {"filter": {"well": "DEL-GT-01", "min_depth": 1500}, "set": {"preservation": "Frozen"}}
+    '''
+    def post(self, request, *args, **kwargs):
+        if self.model not in BULK_EDIT_MODELS.values():
+            return api_error(f"{kwargs['resource']} can not be bulk edited")
+        data = self.read_json()
+        if not isinstance(data, dict) or not isinstance(data.get('filter'), dict) \
+                or not isinstance(data.get('set'), dict):
+            return api_error('The body must be a json object with a filter and a set object')
+
+        try:
+            updated, errors = bulk_edit(self.model, data['filter'], data['set'], user=request.user)
+        except ValueError as e:
+            return api_error(str(e))
+        if errors:
+            return api_error(errors)
+        return api_response({'updated': updated})
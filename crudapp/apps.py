@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class CrudappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'crudapp'
+
+    def ready(self):
+        # Prepare the pydantic validators once instead of on every request
+        from .validation import registry
+        registry.build()
+
+        from django.db.models.signals import post_migrate
+        from .search import ensure_search_indexes
+        from .signals import connect_signals
+        from .audit import connect_audit
+        connect_signals()
+        connect_audit()
+        post_migrate.connect(ensure_search_indexes, sender=self)
@@ -0,0 +1,92 @@
+''' Archive of the samples of the closed wells.
+
+When a drilling campaign ends its wells are closed, the samples of a closed well are
+moved from the tables that the forms insert into to the archive tables (see
+`archive_model` in models.py). The hot tables and their indexes only keep the
+samples of the active wells, so they stay small enough to be cached.
+
+The pages and the api read both tables, `with_archive` unions them.
+
+Example:
+>>> archive_well(Well.objects.get(name='DEL-GT-01'))
+{'Core': 130, 'CoreChip': 260, 'Cuttings': 1200, 'MicroCore': 12}
+>>> with_archive(Core, well__name='DEL-GT-01').order_by('core_number', 'core_section_number')
+'''
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from .models import Well, ARCHIVE_MODELS
+from .signals import samples_changed
+
+
+def with_archive(model, **filters):
+    ''' The samples of the hot and of the archive table that match the filters,
+    the archived ones come back as instances of the hot model
+    '''
+    hot = model.objects.filter(**filters)
+    archive = ARCHIVE_MODELS.get(model)
+    if archive is None:
+        return hot
+    return hot.union(archive.objects.filter(**filters), all=True)
+
+
+def well_key(model, well):
+    # The value that the samples store in their well foreign key
+    return getattr(well, model._meta.get_field('well').target_field.attname)
+
+
+def move_samples(source, target, key, using=DEFAULT_DB_ALIAS):
+    ''' Move the samples of a well from one table to the other with two set based
+    statements, the rows keep their ids. Returns the number of rows moved.
+    '''
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in source._meta.concrete_fields)
+    well_column = quote(source._meta.get_field('well').column)
+    source_table = quote(source._meta.db_table)
+    target_table = quote(target._meta.db_table)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {target_table} ({columns}) '
+            f'SELECT {columns} FROM {source_table} WHERE {well_column} = %s', [key])
+        moved = cursor.rowcount
+        cursor.execute(f'DELETE FROM {source_table} WHERE {well_column} = %s', [key])
+    return moved
+
+
+def _set_closed(well, closed, using):
+    ''' Move the samples of the well and flag it in one transaction
+    '''
+    moved = {}
+    with transaction.atomic(using=using):
+        # Nobody can add samples to the well while they are moved
+        well = Well.objects.using(using).select_for_update().get(pk=well.pk)
+        if well.closed == closed:
+            return well, moved
+
+        for model, archive in ARCHIVE_MODELS.items():
+            source, target = (model, archive) if closed else (archive, model)
+            moved[model.__name__] = move_samples(source, target, well_key(model, well), using=using)
+
+        well.closed = closed
+        well.closed_at = timezone.now() if closed else None
+        well.save(update_fields=['closed', 'closed_at'])
+
+    # The moves are raw sql, the caches of the samples have to be told
+    for model in ARCHIVE_MODELS:
+        samples_changed(model, well_key(model, well))
+    return well, moved
+
+
+def archive_well(well, using=DEFAULT_DB_ALIAS):
+    ''' Close a well and move its samples to the archive tables.
+    Returns the number of samples moved for each model.
+    '''
+    return _set_closed(well, True, using)[1]
+
+
+def reopen_well(well, using=DEFAULT_DB_ALIAS):
+    ''' Move the samples of a closed well back to the hot tables
+    '''
+    return _set_closed(well, False, using)[1]
@@ -0,0 +1,309 @@
+''' Audit log of the changes to the objects of the app.
+
+Every save and delete is turned into an entry with the changed fields, the user and
+the time. Writing an audit row next to every save would double the latency of the
+forms, so the entries are kept in memory and written with one bulk insert when the
+buffer is full or every AUDIT_FLUSH_INTERVAL seconds, from a background thread.
+
+So that a crash does not lose the entries that are still in memory, every entry is
+also appended to a segment file of the spool directory (AUDIT_SPOOL_DIR). A segment
+is deleted once its entries are in the database, the segments that a dead process
+left behind are inserted by the next flush of any process.
+
+The segments have a random name and their process holds an flock on them while it
+writes them. A segment without lock belongs to nobody: the lock goes away with the
+process, even when a restarted container gives the same pid to a new process.
+
+The bulk operations do not send signals, they call `record_bulk` themselves.
+
+Example:
+>>> AuditEntry.objects.filter(model='crudapp.core', object_pk='12').order_by('timestamp')
+>>> audit_log.flush()   # write the buffered entries now, for example in tests
+'''
+import atexit
+import contextvars
+import fcntl
+import json
+import os
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+# Models whose changes are not audited, the audit log itself, the progress of the imports,
+# the depth corrections that are a log of their own, the files (curves, CT volumes and photos)
+# and the archive tables, the samples are only moved there
+NOT_AUDITED = ['AuditEntry', 'ImportJob', 'DepthCorrection', 'MeasurementCurve', 'CtVolume', 'Photo',
+               'CoreArchive', 'CoreChipArchive', 'CuttingsArchive', 'MicroCoreArchive']
+# Bookkeeping fields that change on every write to a well
+IGNORED_FIELDS = ['version', 'modified_at']
+_current_user = contextvars.ContextVar('audit_user', default=None)
+
+
+@contextmanager
+def acting_as(user):
+    ''' Attribute the changes made inside the block to a user, the middleware
+    does it for the requests and the import worker for its jobs
+    '''
+    token = _current_user.set(user)
+    try:
+        yield
+    finally:
+        _current_user.reset(token)
+
+
+class AuditUserMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # request.user is lazy, the session is only read if the request changes something
+        with acting_as(getattr(request, 'user', None)):
+            return self.get_response(request)
+
+
+def audited_models():
+    return [model for model in apps.get_app_config('crudapp').get_models()
+            if model.__name__ not in NOT_AUDITED]
+
+
+def _fields(model):
+    return [field.attname for field in model._meta.concrete_fields if field.attname not in IGNORED_FIELDS]
+
+
+def snapshot(instance):
+    # Read from __dict__, getattr would load the deferred fields of .only() querysets one query at a time
+    values = instance.__dict__
+    return {attname: values[attname] for attname in _fields(type(instance)) if attname in values}
+
+
+def _json(value):
+    # Dates, decimals and uuids become strings, the same way they are stored in the spool
+    return json.loads(json.dumps(value, cls=DjangoJSONEncoder))
+
+
+def diff(old, new, created=False):
+    ''' The fields that changed as {field: [old value, new value]}, a new object has all its fields
+    '''
+    if created:
+        return {field: _json([None, value]) for field, value in new.items()}
+    return {field: _json([old[field], value]) for field, value in new.items()
+            if field in old and old[field] != value}
+
+
+class AuditLog:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = []
+        self.segment = None
+        self.segment_path = None
+        self.flusher = None
+        self.wake_up = threading.Event()
+        # Only one flush at a time, the flusher thread and a full buffer can both start one
+        self.flush_lock = threading.Lock()
+
+    @property
+    def spool_dir(self):
+        return str(settings.AUDIT_SPOOL_DIR)
+
+    def _open_segment(self):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.segment_path = os.path.join(self.spool_dir, f'{uuid.uuid4().hex}.jsonl')
+        self.segment = open(self.segment_path, 'x', encoding='utf-8')
+        # Held until the entries are in the database, recover_spool leaves the locked segments alone
+        fcntl.flock(self.segment, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def add(self, entry):
+        with self.lock:
+            if self.segment is None:
+                self._open_segment()
+            self.segment.write(json.dumps(entry, cls=DjangoJSONEncoder) + '\n')
+            # Flushed to the operating system, it survives a crash of the process
+            self.segment.flush()
+            self.entries.append(entry)
+            full = len(self.entries) >= settings.AUDIT_BUFFER_SIZE
+
+        if not settings.AUDIT_FLUSH_INTERVAL:
+            if full:
+                self.flush()
+            return
+        self._start_flusher()
+        if full:
+            self.wake_up.set()
+
+    def _start_flusher(self):
+        if self.flusher is not None and self.flusher.is_alive():
+            return
+        with self.lock:
+            if self.flusher is None or not self.flusher.is_alive():
+                self.flusher = threading.Thread(target=self._run_flusher, name='audit-flusher', daemon=True)
+                self.flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            self.wake_up.wait(settings.AUDIT_FLUSH_INTERVAL)
+            self.wake_up.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # The segments stay in the spool, the next flush inserts them
+                print(f"Could not write the audit log: {e}", file=sys.stderr)
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        ''' Write the buffered entries and the segments left by dead processes
+        '''
+        with self.flush_lock:
+            with self.lock:
+                entries, self.entries = self.entries, []
+                segment, segment_path = self.segment, self.segment_path
+                self.segment = self.segment_path = None
+
+            if segment is not None:
+                try:
+                    if entries:
+                        write_entries(entries)
+                    # Removed while it is still locked, no other process can insert it a second time
+                    os.remove(segment_path)
+                finally:
+                    # Without the lock a segment that could not be written is left for recover_spool
+                    segment.close()
+            recover_spool(self.spool_dir)
+
+    def record(self, model, object_pk, action, changes, user=None):
+        if action == 'update' and not changes:
+            return
+        if user is None:
+            user = _current_user.get()
+        if user is not None and not user.is_authenticated:
+            user = None
+        self.add({
+            'entry_id': uuid.uuid4().hex,
+            'model': model._meta.label_lower,
+            'object_pk': str(object_pk),
+            'action': action,
+            'changes': changes,
+            'user_id': user.pk if user is not None else None,
+            'timestamp': timezone.now(),
+        })
+
+
+def write_entries(entries):
+    from .models import AuditEntry
+    AuditEntry.objects.bulk_create([
+        AuditEntry(entry_id=entry['entry_id'], model=entry['model'], object_pk=entry['object_pk'],
+                   action=entry['action'], changes=entry['changes'], user_id=entry['user_id'],
+                   timestamp=entry['timestamp'] if not isinstance(entry['timestamp'], str)
+                   else parse_datetime(entry['timestamp']))
+        for entry in entries], batch_size=500, ignore_conflicts=True)
+
+
+def recover_spool(spool_dir):
+    ''' Insert the entries of the segments that no running process holds a lock on,
+    they were left behind by a crash or by a flush that could not reach the database
+    '''
+    if not os.path.isdir(spool_dir):
+        return
+    for name in sorted(os.listdir(spool_dir)):
+        if not name.endswith('.jsonl'):
+            continue
+        path = os.path.join(spool_dir, name)
+        try:
+            segment = open(path, encoding='utf-8')
+        except FileNotFoundError:
+            continue
+        with segment:
+            try:
+                fcntl.flock(segment, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Still written by a running process
+                continue
+            if os.fstat(segment.fileno()).st_nlink == 0:
+                # Another process recovered it while we were opening it
+                continue
+            # The last line may be cut in half by the crash
+            entries = []
+            for line in segment:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    pass
+            write_entries(entries)
+            os.remove(path)
+
+
+audit_log = AuditLog()
+
+
+@atexit.register
+def _flush_at_exit():
+    # Only the processes that audited something, a management command that did not must not
+    # touch the spool of the others nor print on a stdout that may be redirected to a file
+    if audit_log.segment is None:
+        return
+    try:
+        audit_log.flush()
+    except Exception as e:
+        print(f"Could not write the audit log, it stays in the spool: {e}", file=sys.stderr)
+
+
+def record_bulk(model, instances, action, user=None):
+    ''' Audit the objects written by bulk_create, bulk_update or before a bulk delete.
+    For updates the instances must have been loaded from the database before they were changed.
+    '''
+    user = user if user is not None else _current_user.get()
+    records = []
+    for instance in instances:
+        current = snapshot(instance)
+        if action == 'delete':
+            changes = {field: _json([value, None]) for field, value in current.items()}
+        else:
+            changes = diff(getattr(instance, '_audit_snapshot', {}), current, created=action == 'create')
+        records.append((instance.pk, changes))
+        instance._audit_snapshot = current
+
+    def write():
+        for pk, changes in records:
+            audit_log.record(model, pk, action, changes, user=user)
+    transaction.on_commit(write)
+
+
+def take_snapshot(sender, instance, **kwargs):
+    # The values as loaded from the database, post_save compares them with the saved ones
+    instance._audit_snapshot = snapshot(instance)
+
+
+def object_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = snapshot(instance)
+    changes = diff(getattr(instance, '_audit_snapshot', {}), current, created=created)
+    instance._audit_snapshot = current
+    user = _current_user.get()
+    # Only the changes that are committed are audited
+    transaction.on_commit(lambda: audit_log.record(sender, instance.pk, 'create' if created else 'update',
+                                                   changes, user=user))
+
+
+def object_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+    changes = {field: _json([value, None]) for field, value in snapshot(instance).items()}
+    user = _current_user.get()
+    transaction.on_commit(lambda: audit_log.record(sender, pk, 'delete', changes, user=user))
+
+
+def connect_audit():
+    for model in audited_models():
+        name = model.__name__
+        post_init.connect(take_snapshot, sender=model, dispatch_uid=f'audit_snapshot_{name}')
+        post_save.connect(object_saved, sender=model, dispatch_uid=f'audit_saved_{name}')
+        post_delete.connect(object_deleted, sender=model, dispatch_uid=f'audit_deleted_{name}')
@@ -0,0 +1,216 @@
+''' In-process prefix trie with the names of the wells and the samples.
+
+The forms ask the autocomplete endpoint for the names that start with what the user
+typed instead of rendering every well of the database in a dropdown.
+The index is filled from the database the first time it is used and it is kept up
+to date by the save and delete signals of the models (see crudapp/signals.py).
+
+Every gunicorn worker and the import worker has its own trie. The writes bump a version
+shared through the cache (Redis in production) once they are committed: the process
+that wrote updates its trie in place, the others see the new version at their next
+suggestion and build their trie again. A write that is rolled back changes nothing.
+
+Example:
+>>> name_index.suggest('well', 'DEL')
+[{'value': 'DEL-GT-01', 'label': 'DEL-GT-01'}, {'value': 'DEL-GT-02', 'label': 'DEL-GT-02'}]
+'''
+import threading
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Well, Core, CoreChip, Cuttings, MicroCore, ARCHIVE_MODELS
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# The version of the names shared by all the processes
+VERSION_KEY = 'autocomplete-names-version'
+
+# The kind of name, the model that has it and the field with the name
+NAME_SOURCES = {
+    'well': [(Well, 'name')],
+    'sample': [
+        (Core, 'core_section_name'),
+        (CoreChip, 'corechip_name'),
+        (Cuttings, 'cuttings_name'),
+        (MicroCore, 'micro_core_name'),
+    ],
+}
+# The samples of the closed wells are in the archive tables
+NAME_SOURCES['sample'] += [(ARCHIVE_MODELS[model], field) for model, field in NAME_SOURCES['sample']]
+
+
+class PrefixTrie:
+    ''' A trie of lower case keys, every key keeps the original names that were added with it
+    '''
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    def add(self, name):
+        node = self.root
+        for char in name.lower():
+            node = node.setdefault(char, {})
+        names = node.setdefault(None, set())
+        if name not in names:
+            names.add(name)
+            self.size += 1
+
+    def remove(self, name):
+        path = [self.root]
+        for char in name.lower():
+            node = path[-1].get(char)
+            if node is None:
+                return
+            path.append(node)
+
+        names = path[-1].get(None, set())
+        if name not in names:
+            return
+        names.discard(name)
+        self.size -= 1
+        if not names:
+            del path[-1][None]
+
+        # Drop the branches that do not lead to any name anymore
+        key = name.lower()
+        for depth in range(len(key), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][key[depth - 1]]
+
+    def starting_with(self, prefix, limit=DEFAULT_LIMIT):
+        ''' The names that start with prefix in alphabetical order
+        '''
+        node = self.root
+        for char in prefix.lower():
+            node = node.get(char)
+            if node is None:
+                return []
+
+        results = []
+        stack = [node]
+        while stack and len(results) < limit:
+            node = stack.pop()
+            results.extend(sorted(node.get(None, ())))
+            # Push in reverse order so that the smallest character is visited first
+            stack.extend(node[char] for char in sorted((key for key in node if key is not None), reverse=True))
+        return results[:limit]
+
+
+def shared_version():
+    return cache.get(VERSION_KEY, 0)
+
+
+def bump_shared_version():
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        # Not in the cache yet, or evicted: every process builds its trie again
+        cache.add(VERSION_KEY, 0, None)
+        return cache.incr(VERSION_KEY)
+
+
+class NameIndex:
+    ''' One trie per kind of name, see NAME_SOURCES
+    '''
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tries = None
+        # The shared version the tries are up to date with
+        self.version = None
+        # The name of every object in the tries, it is needed to remove the old name of a renamed object
+        self.names = {}
+
+    def invalidate(self):
+        with self.lock:
+            self.tries = None
+            self.names = {}
+
+    def build(self):
+        # Read before the names, a write committed during the build makes the next use build again
+        version = shared_version()
+        tries = {kind: PrefixTrie() for kind in NAME_SOURCES}
+        names = {}
+        for kind, sources in NAME_SOURCES.items():
+            for model, field in sources:
+                # From the primary, the index lives until the next write and the replica may lag behind
+                for pk, name in model.objects.using(DEFAULT_DB_ALIAS).values_list('pk', field).iterator():
+                    if name:
+                        tries[kind].add(name)
+                        names[(model, pk)] = name
+        with self.lock:
+            self.tries = tries
+            self.names = names
+            self.version = version
+        return tries
+
+    def ensure_built(self):
+        tries = self.tries
+        if tries is None or self.version != shared_version():
+            tries = self.build()
+        return tries
+
+    def changed(self, apply=None, using=DEFAULT_DB_ALIAS):
+        ''' Bump the shared version once the transaction is committed. apply updates the trie of this
+        process, when another process wrote since the last version the trie is built again instead.
+        '''
+        def commit():
+            version = bump_shared_version()
+            with self.lock:
+                if apply is not None and self.tries is not None and self.version == version - 1:
+                    apply()
+                    self.version = version
+                else:
+                    self.tries = None
+                    self.names = {}
+        transaction.on_commit(commit, using=using)
+
+    def _source(self, model):
+        for kind, sources in NAME_SOURCES.items():
+            for source_model, field in sources:
+                if source_model is model:
+                    return kind, field
+        return None, None
+
+    def update(self, instance, using=DEFAULT_DB_ALIAS):
+        ''' Add the name of a saved object and drop its previous name, once it is committed
+        '''
+        kind, field = self._source(type(instance))
+        if kind is None:
+            return
+        # Read now, the instance can change before the commit
+        key, name = (type(instance), instance.pk), getattr(instance, field)
+
+        def apply():
+            old_name = self.names.pop(key, None)
+            if old_name:
+                self.tries[kind].remove(old_name)
+            if name:
+                self.tries[kind].add(name)
+                self.names[key] = name
+        self.changed(apply, using)
+
+    def remove(self, instance, using=DEFAULT_DB_ALIAS):
+        kind, _ = self._source(type(instance))
+        if kind is None:
+            return
+        # The collector clears the pk of the instance after the post_delete signals
+        key = (type(instance), instance.pk)
+
+        def apply():
+            name = self.names.pop(key, None)
+            if name:
+                self.tries[kind].remove(name)
+        self.changed(apply, using)
+
+    def suggest(self, kind, prefix, limit=DEFAULT_LIMIT):
+        if kind not in NAME_SOURCES:
+            raise ValueError(f'Unknown kind of name {kind}')
+        tries = self.ensure_built()
+        with self.lock:
+            names = tries[kind].starting_with(prefix, min(limit, MAX_LIMIT))
+        return [{'value': name, 'label': name} for name in names]
+
+
+name_index = NameIndex()
@@ -0,0 +1,140 @@
+''' Apply one change to many samples at once.
+
+The lab workflows change the same fields of a lot of samples, e.g. mark every section
+of the core C3 as ct scanned, or set the preservation of every section below 1500 m.
+`bulk_edit` selects the samples with a filter (well, core number, depth range) and
+applies the assignments with a single QuerySet.update(). The samples of the closed wells
+are archived and can not be changed, they are left out. The assignments are validated once, with the django fields and with the
+pydantic model of datamodel applied to one of the selected samples.
+
+Example:
+>>> bulk_edit(Core, {'well': 'DEL-GT-01', 'core_number': 'C3'}, {'ct_scanned': True})
+(12, [])
+'''
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.forms.models import model_to_dict
+
+from pydantic import ValidationError
+
+from .audit import audited_models, record_bulk, snapshot
+from .models import Core, CoreChip, Cuttings, MicroCore, Well
+from .samples import closed_well_message
+from .signals import samples_changed
+from .validation import registry
+
+# The sample types that can be edited and the field that holds their depth
+BULK_EDIT_MODELS = {
+    'core': Core,
+    'corechip': CoreChip,
+    'cuttings': Cuttings,
+    'microcore': MicroCore,
+}
+DEPTH_FIELDS = {
+    Core: 'top_depth',
+    CoreChip: 'corechip_depth',
+    Cuttings: 'cuttings_depth',
+}
+FILTERS = ['well', 'core_number', 'min_depth', 'max_depth']
+# Set by the server, or the same for every sample of a well
+NOT_EDITABLE = ['id', 'registration_date', 'registered_by', 'well']
+
+
+def editable_fields(model):
+    ''' The fields that can be assigned to many samples. The names of the samples are unique
+    and are built from the well and the numbers, both are left alone
+    '''
+    return {field.name: field for field in model._meta.concrete_fields
+            if field.editable and not field.unique and field.name not in NOT_EDITABLE
+            and not field.name.endswith(('_name', '_number'))}
+
+
+def sample_filter(model, filters):
+    ''' The Q object of the filters of a bulk edit, at least one of them is required
+    '''
+    unknown = [name for name in filters if name not in FILTERS]
+    if unknown:
+        raise ValueError(f'Unknown filters {unknown}')
+    filters = {name: value for name, value in filters.items() if value not in (None, '')}
+    if not filters:
+        raise ValueError('A bulk edit needs at least one filter')
+
+    query = Q(well__closed=False)
+    if 'well' in filters:
+        query &= Q(well__name=filters['well'])
+    if 'core_number' in filters:
+        if model is not Core:
+            raise ValueError(f'{model.__name__} has no core number')
+        query &= Q(core_number=filters['core_number'])
+    for name, lookup in [('min_depth', 'gte'), ('max_depth', 'lte')]:
+        if name in filters:
+            if model not in DEPTH_FIELDS:
+                raise ValueError(f'{model.__name__} has no depth')
+            try:
+                query &= Q(**{f'{DEPTH_FIELDS[model]}__{lookup}': float(filters[name])})
+            except (TypeError, ValueError):
+                raise ValueError(f'{name} must be a number')
+    return query
+
+
+def check_assignments(model, assignments, sample=None):
+    ''' Validate the assignments once, returns the cleaned values and a list of errors
+    '''
+    fields = editable_fields(model)
+    values, errors = {}, []
+    if not assignments:
+        errors.append({'field': None, 'msg': 'Nothing to change'})
+    for name, value in assignments.items():
+        if name not in fields:
+            errors.append({'field': name, 'msg': 'This field can not be bulk edited'})
+            continue
+        try:
+            values[name] = fields[name].clean(value, None)
+        except DjangoValidationError as e:
+            errors.append({'field': name, 'msg': ' '.join(e.messages)})
+    if errors or sample is None:
+        return values, errors
+
+    # The pydantic models validate whole samples, the assignments are applied to one of them
+    payload = {**model_to_dict(sample), 'well': sample.well.name, **values}
+    checked = registry.validate(model.__name__, payload)
+    if type(checked) is ValidationError:
+        for item in checked.errors():
+            errors.append({'field': item['loc'][0] if item['loc'] else None, 'msg': item['msg']})
+    return values, errors
+
+
+def bulk_edit(model, filters, assignments, user=None):
+    ''' Apply the assignments to every sample that matches the filters.
+    Returns the number of samples updated and the validation errors, nothing is
+    updated when there are errors.
+    '''
+    query = sample_filter(model, filters)
+    # The query leaves the closed wells out, a closed well asked for by name is an error
+    closed = Well.objects.filter(name=filters.get('well') or None, closed=True).first()
+    if closed is not None:
+        return 0, [{'field': 'well', 'msg': closed_well_message(closed)}]
+    sample = model.objects.filter(query).select_related('well').first()
+    values, errors = check_assignments(model, assignments, sample)
+    if errors or sample is None:
+        return 0, errors
+
+    with transaction.atomic():
+        queryset = model.objects.filter(query)
+        # Only the pk, the well and the assigned fields are loaded, for the audit trail
+        instances = list(queryset.select_for_update().only('pk', 'well', *values))
+        updated = queryset.update(**values) if instances else 0
+
+        for instance in instances:
+            instance._audit_snapshot = snapshot(instance)
+            for name, value in values.items():
+                setattr(instance, name, value)
+        if instances and model in audited_models():
+            record_bulk(model, instances, 'update', user=user)
+        well_keys = {instance.well_id for instance in instances}
+
+    # QuerySet.update does not send signals, the caches of the samples have to be told
+    for well_key in well_keys:
+        samples_changed(model, well_key)
+    return updated, errors
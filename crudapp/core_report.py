@@ -0,0 +1,152 @@
+''' Recovery, lengths, gaps and weights of the cores of a well.
+
+The sections of a well are read with one values_list query (hot and archive tables in a
+UNION) into numpy arrays, and the statistics of every core run (all the sections with
+the same core number) are computed at once with bincount and ufunc.at:
+
+- the length of a section is core_section_length, or bottom_depth - top_depth when it is not filled in,
+- the recovered length of a section is core_recovery, or its length when it is not filled in,
+- the cored interval of a run goes from its shallowest top to its deepest bottom,
+  its recovery is the recovered length over the cored interval,
+- the gaps are the intervals between a section and the next one that no section covers.
+
+The report is cached per well until the version of the well changes, then the sections
+are read again and all the runs are computed again: the query and the array operations
+cost the same for one run or for all the runs of a well.
+
+Example:
+>>> core_report(well)
+{'well': 'DEL-GT-01', 'version': 12, 'runs': [{'core_number': 'C1', 'top': 1500.0, 'bottom': 1509.0,
+ 'recovered': 8.7, 'recovery': 96.67, 'cumulative_recovered': 8.7, ...}, ...], 'gaps': [...], 'totals': {...}}
+'''
+import math
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .archive import with_archive
+from .models import Core
+
+FIELDS = ['core_number', 'top_depth', 'bottom_depth', 'core_section_length', 'core_recovery', 'core_weight']
+# Smaller gaps between two sections are the rounding of the depths
+GAP_TOLERANCE = 0.005
+DECIMALS = 3
+
+
+def read_sections(well):
+    ''' The core numbers and a float array with a column per depth, length, recovery and weight
+    field of the sections of a well, sorted by top depth. The missing values are nan.
+    '''
+    rows = list(with_archive(Core, well=well).values_list(*FIELDS))
+    rows.sort(key=lambda row: (row[1], row[0]))
+    numbers = np.array([row[0] for row in rows], dtype=object)
+    values = np.array([row[1:] for row in rows], dtype=float).reshape(-1, len(FIELDS) - 1)
+    return numbers, values
+
+
+def section_lengths(values):
+    ''' The length and the recovered length of every section
+    '''
+    top, bottom, length, recovery = values[:, 0], values[:, 1], values[:, 2], values[:, 3]
+    length = np.where(np.isnan(length), bottom - top, length)
+    recovered = np.where(np.isnan(recovery), length, recovery)
+    return length, recovered
+
+
+def run_stats(runs, count, values):
+    ''' The statistics of the runs, runs is the index of the run of every section.
+    Returns a dict of arrays with one value per run.
+    '''
+    top = values[:, 0]
+    length, recovered = section_lengths(values)
+    # Without a bottom depth a section ends where its length ends
+    bottom = np.where(np.isnan(values[:, 1]), top + length, values[:, 1])
+    weight = values[:, 4]
+
+    run_top = np.full(count, np.inf)
+    np.minimum.at(run_top, runs, top)
+    run_bottom = np.full(count, -np.inf)
+    np.maximum.at(run_bottom, runs, np.where(np.isnan(bottom), top, bottom))
+    cored = run_bottom - run_top
+    recovered_sum = np.bincount(runs, weights=np.nan_to_num(recovered), minlength=count)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        recovery = np.where(cored > 0, recovered_sum / cored * 100, np.nan)
+    return {
+        'sections': np.bincount(runs, minlength=count),
+        'top': run_top,
+        'bottom': run_bottom,
+        'cored': cored,
+        'length': np.bincount(runs, weights=np.nan_to_num(length), minlength=count),
+        'recovered': recovered_sum,
+        'recovery': recovery,
+        'weight': np.bincount(runs, weights=np.nan_to_num(weight), minlength=count),
+        'weighed_sections': np.bincount(runs, weights=~np.isnan(weight), minlength=count).astype(np.int64),
+    }
+
+
+def gaps(values):
+    ''' The intervals between consecutive sections that no section covers, as [top, bottom] pairs.
+    The sections are sorted by top depth.
+    '''
+    if len(values) < 2:
+        return []
+    length, _ = section_lengths(values)
+    bottom = np.where(np.isnan(values[:, 1]), values[:, 0] + length, values[:, 1])
+    # The deepest bottom so far, a long section can cover the next ones
+    reached = np.fmax.accumulate(bottom)
+    starts, ends = reached[:-1], values[1:, 0]
+    found = ~np.isnan(starts) & (ends - starts > GAP_TOLERANCE)
+    return [[_round(start), _round(end)] for start, end in zip(starts[found].tolist(), ends[found].tolist())]
+
+
+def _round(value):
+    return None if value is None or math.isnan(value) or math.isinf(value) else round(value, DECIMALS)
+
+
+def cache_key(well):
+    return f'core-report-{well.pk}'
+
+
+def core_report(well):
+    ''' The statistics of the core runs of a well and of the whole well
+    '''
+    cached = cache.get(cache_key(well))
+    if cached is not None and cached['version'] == well.version:
+        return cached['report']
+
+    numbers, values = read_sections(well)
+    names, runs = np.unique(numbers.astype(str), return_inverse=True)
+    computed = run_stats(runs.astype(np.int64).ravel(), len(names), values)
+    stats = {name: {key: _json(column[index]) for key, column in computed.items()}
+             for index, name in enumerate(names.tolist())}
+
+    ordered = sorted(stats.items(), key=lambda item: (item[1]['top'] is None, item[1]['top'], item[0]))
+    cumulative = np.cumsum([run['recovered'] for _, run in ordered]).tolist()
+    report_runs = [{'core_number': name, **run, 'cumulative_recovered': _round(total)}
+                   for (name, run), total in zip(ordered, cumulative)]
+
+    cored = sum(run['cored'] or 0 for run in report_runs)
+    recovered = cumulative[-1] if cumulative else 0.0
+    report = {
+        'well': well.name,
+        'version': well.version,
+        'runs': report_runs,
+        'gaps': gaps(values),
+        'totals': {
+            'runs': len(report_runs),
+            'sections': int(len(values)),
+            'cored': _round(cored),
+            'recovered': _round(recovered),
+            'recovery': _round(recovered / cored * 100) if cored > 0 else None,
+            'weight': _round(sum(run['weight'] for run in report_runs)),
+        },
+    }
+    cache.set(cache_key(well), {'version': well.version, 'report': report}, settings.FRAGMENT_CACHE_TIMEOUT)
+    return report
+
+
+def _json(value):
+    # The numpy scalars of the statistics as plain numbers, nan and inf as None
+    value = value.item()
+    return value if isinstance(value, int) else _round(value)
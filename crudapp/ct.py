@@ -0,0 +1,270 @@
+''' CT scans of the core sections, stored in tiles that can be served from a memory map.
+
+A CT volume is a stack of slices of a few thousand pixels each, a section of a metre
+is gigabytes. The viewer of the app never needs a whole volume: it shows one slice at a
+time, and only the part of it that fits on the screen. The stacks are imported once in a
+tiled layout, a .npy file of shape (slices, rows, columns, tile, tile):
+
+    CT_VOLUME_ROOT/<well id>/<core id>-<kind>-<volume id>/tiles.npy
+    CT_VOLUME_ROOT/<well id>/<core id>-<kind>-<volume id>/thumbnails.npy
+
+Every tile of a slice is a contiguous block of the file, so a tile is read from the
+memory map with a single copy and only its pages are read from the disk. The edges
+of the slices are padded with zeros up to a whole tile. thumbnails.npy has the slices
+reduced by thumbnail_factor, small enough to scroll through the whole volume.
+
+The tiles are served as raw bytes (the dtype and the shape are in the headers), with
+HTTP Range requests, and the tiles served last are kept in an LRU cache of every worker.
+
+Example:
+>>> volume = import_stack(core, 'scans/DEL-GT-01-C3-1/', kind='ct', voxel_size=0.2)
+>>> tile(volume, z=120, row=2, column=1)
+b'...'
+'''
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .archive import well_key
+from .models import Core, CtVolume, ARCHIVE_MODELS
+from .signals import samples_changed
+
+TILE_SIZE = 256
+# The longest side of the thumbnails, in pixels
+THUMBNAIL_SIZE = 256
+IMAGE_EXTENSIONS = ('.tif', '.tiff', '.png')
+# The flags of the core that tell a scan of the kind exists
+SCANNED_FIELDS = {'ct': 'ct_scanned', 'macroct': 'macroct_scanned'}
+
+
+def volume_path(volume, name='tiles.npy'):
+    return os.path.join(settings.CT_VOLUME_ROOT, volume.directory, name)
+
+
+def read_stack(source):
+    ''' The slices of a CT stack as (number of slices, iterator of 2d arrays).
+    The source is a .npy file of shape (slices, height, width), read through a memory map,
+    or a folder of images with one slice per file in the order of their names.
+    '''
+    if os.path.isfile(source) and source.endswith('.npy'):
+        stack = np.load(source, mmap_mode='r')
+        if stack.ndim != 3:
+            raise ValueError(f'A CT stack has 3 dimensions, {source} has {stack.ndim}')
+        return len(stack), (stack[z] for z in range(len(stack)))
+
+    if not os.path.isdir(source):
+        raise ValueError(f'{source} is neither a .npy file nor a folder of slices')
+    files = sorted(name for name in os.listdir(source) if name.lower().endswith(IMAGE_EXTENSIONS))
+    if not files:
+        raise ValueError(f'No slices ({", ".join(IMAGE_EXTENSIONS)}) found in {source}')
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ValueError('Pillow is needed to read the images of a stack, install rockin[imaging]')
+
+    def slices():
+        for name in files:
+            with Image.open(os.path.join(source, name)) as image:
+                yield np.asarray(image)
+    return len(files), slices()
+
+
+def to_tiles(image, tile_size):
+    ''' The tiles of a slice as an array of shape (rows, columns, tile, tile), padded with zeros
+    '''
+    rows, columns = -(-image.shape[0] // tile_size), -(-image.shape[1] // tile_size)
+    padded = np.zeros((rows * tile_size, columns * tile_size), dtype=image.dtype)
+    padded[:image.shape[0], :image.shape[1]] = image
+    return padded.reshape(rows, tile_size, columns, tile_size).swapaxes(1, 2)
+
+
+def reduce(image, factor):
+    ''' A slice reduced by factor with the mean of every block of factor x factor pixels
+    '''
+    if factor == 1:
+        return image
+    height, width = image.shape[0] // factor * factor, image.shape[1] // factor * factor
+    blocks = image[:height, :width].reshape(height // factor, factor, width // factor, factor)
+    return blocks.mean(axis=(1, 3)).astype(image.dtype)
+
+
+def import_stack(core, source, kind='ct', tile_size=TILE_SIZE, voxel_size=None, user=None):
+    ''' Write a CT stack in the tiled layout and link it to a core section.
+    The slices are converted one at a time, the stack is never loaded whole.
+
+    Converting a stack takes minutes, it is written in a temporary folder next to the final
+    one before the transaction, which only creates the row, renames the folder and sets the flag.
+    '''
+    if kind not in SCANNED_FIELDS:
+        raise ValueError(f'Unknown kind of scan {kind}')
+    count, slices = read_stack(source)
+    first = next(slices)
+    if first.ndim != 2:
+        raise ValueError('The slices of a CT stack must be grey scale images')
+    height, width = first.shape
+    rows, columns = -(-height // tile_size), -(-width // tile_size)
+    factor = max(1, -(-max(height, width) // THUMBNAIL_SIZE))
+
+    # In the folder of the well, the rename to the final folder stays on the same file system
+    parent = os.path.join(settings.CT_VOLUME_ROOT, str(core.well_id))
+    os.makedirs(parent, exist_ok=True)
+    temporary = tempfile.mkdtemp(dir=parent, prefix=f'.{core.pk}-{kind}-')
+    directory = None
+    try:
+        tiles = np.lib.format.open_memmap(os.path.join(temporary, 'tiles.npy'), mode='w+', dtype=first.dtype,
+                                          shape=(count, rows, columns, tile_size, tile_size))
+        thumbnails = np.lib.format.open_memmap(
+            os.path.join(temporary, 'thumbnails.npy'), mode='w+', dtype=first.dtype,
+            shape=(count, max(1, height // factor), max(1, width // factor)))
+        for z, image in enumerate(itertools.chain([first], slices)):
+            if image.shape != (height, width) or image.dtype != first.dtype:
+                raise ValueError(f'The slice {z} is {image.shape} {image.dtype}, '
+                                 f'the first one is {first.shape} {first.dtype}')
+            tiles[z] = to_tiles(image, tile_size)
+            thumbnails[z] = reduce(image, factor)[:thumbnails.shape[1], :thumbnails.shape[2]]
+        tiles.flush()
+        thumbnails.flush()
+        del tiles, thumbnails
+
+        with transaction.atomic():
+            volume = CtVolume.objects.create(
+                well_id=core.well_id, core_id=core.pk, kind=kind, directory='', source=str(source),
+                slices=count, height=height, width=width, dtype=first.dtype.str, tile_size=tile_size,
+                thumbnail_factor=factor, voxel_size=voxel_size, created_by=user)
+            volume.directory = os.path.join(str(core.well_id), f'{core.pk}-{kind}-{volume.pk}')
+            volume.save(update_fields=['directory'])
+
+            # The flags of the core say a scan exists, set where the section is, hot or archived
+            field = SCANNED_FIELDS[kind]
+            for table_model in (Core, ARCHIVE_MODELS[Core]):
+                table_model.objects.filter(pk=core.pk).update(**{field: True})
+
+            # Last, nothing can roll the transaction back once the folder has its final name
+            directory = volume_path(volume, '').rstrip(os.sep)
+            os.rename(temporary, directory)
+    except BaseException:
+        shutil.rmtree(temporary, ignore_errors=True)
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+        raise
+    samples_changed(Core, well_key(Core, core.well))
+    return volume
+
+
+def delete_volume(volume):
+    ''' Delete a volume and its files
+    '''
+    directory = volume_path(volume, '')
+    volume.delete()
+    open_volume.cache_clear()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@lru_cache(maxsize=32)
+def open_volume(path):
+    ''' The memory map of a file of a volume, kept open for the next tiles
+    '''
+    return np.load(path, mmap_mode='r')
+
+
+class TileCache:
+    ''' The tiles served last, up to max_bytes, the least recently used ones are dropped first
+    '''
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.tiles = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data = self.tiles.get(key)
+            if data is not None:
+                self.tiles.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.tiles:
+                return
+            self.tiles[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, dropped = self.tiles.popitem(last=False)
+                self.size -= len(dropped)
+
+    def clear(self):
+        with self.lock:
+            self.tiles.clear()
+            self.size = 0
+
+
+tile_cache = TileCache(settings.CT_TILE_CACHE_BYTES)
+
+
+def tile_shape(volume):
+    return [volume.tile_size, volume.tile_size]
+
+
+def thumbnail_shape(volume):
+    return [max(1, volume.height // volume.thumbnail_factor), max(1, volume.width // volume.thumbnail_factor)]
+
+
+def tile(volume, z, row, column):
+    ''' The bytes of a tile of a slice, from the cache or copied from the memory map
+    '''
+    rows, columns = -(-volume.height // volume.tile_size), -(-volume.width // volume.tile_size)
+    if not (0 <= z < volume.slices and 0 <= row < rows and 0 <= column < columns):
+        raise IndexError(f'No tile {z}/{row}/{column} in a volume of {volume.slices} slices of {rows}x{columns} tiles')
+    key = (volume.pk, 'tile', z, row, column)
+    data = tile_cache.get(key)
+    if data is None:
+        data = open_volume(volume_path(volume))[z, row, column].tobytes()
+        tile_cache.put(key, data)
+    return data
+
+
+def thumbnail(volume, z):
+    ''' The bytes of the thumbnail of a slice
+    '''
+    if not 0 <= z < volume.slices:
+        raise IndexError(f'No slice {z} in a volume of {volume.slices} slices')
+    key = (volume.pk, 'thumbnail', z)
+    data = tile_cache.get(key)
+    if data is None:
+        data = open_volume(volume_path(volume, 'thumbnails.npy'))[z].tobytes()
+        tile_cache.put(key, data)
+    return data
+
+
+def byte_range(header, size):
+    ''' The (start, end) of a Range header of a single range of bytes, end included.
+    None without a header, ValueError when the range can not be satisfied.
+    '''
+    if not header:
+        return None
+    unit, _, ranges = header.partition('=')
+    if unit.strip() != 'bytes' or ',' in ranges:
+        raise ValueError(f'Unsupported range {header}')
+    start, _, end = ranges.strip().partition('-')
+    try:
+        if not start:
+            # The last <end> bytes
+            start, end = max(0, size - int(end)), size - 1
+        else:
+            start, end = int(start), min(int(end), size - 1) if end else size - 1
+    except ValueError:
+        raise ValueError(f'Invalid range {header}')
+    if start > end or start >= size:
+        raise ValueError(f'Range {header} is outside of the {size} bytes')
+    return start, end
@@ -0,0 +1,212 @@
+''' Measurement curves of the core sections.
+
+The core loggers measure the gamma, the density, ... of a core section every centimetre,
+a 3000 m well has millions of points. They are not stored as rows: every curve of a
+section is a .npy file with a float64 array of shape (points, 2), the depth and the value,
+sorted by depth. The MeasurementCurve row only keeps the file and the extent of the curve.
+
+The files are memory mapped when they are read, a depth window is found with a binary
+search on the depth column and only the pages of the window are read from the disk.
+For the plots the window is decimated to the min and the max of every bucket of depth,
+a curve of millions of points becomes a few thousand without losing its peaks.
+
+Example:
+>>> curve = save_curve(core, 'gamma_ray', depths, values, unit='API')
+>>> depths, values = window(curve, 1500.0, 1501.0)
+>>> well_curve(well, 'gamma_ray', top=1500, bottom=1600, buckets=800)
+'''
+import csv
+import io
+
+import numpy as np
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from .archive import with_archive
+from .models import Core, MeasurementCurve, Well
+from .signals import bump_well_version
+
+KINDS = [kind for kind, _ in MeasurementCurve.KIND_CHOICES]
+# The buckets of the decimation, about the height in pixels of a plot
+DEFAULT_BUCKETS = 1000
+MAX_BUCKETS = 10000
+
+
+def to_points(depths, values):
+    ''' The (depth, value) array of a curve, sorted by depth without the missing values
+    '''
+    points = np.column_stack([np.asarray(depths, dtype=np.float64), np.asarray(values, dtype=np.float64)])
+    points = points[~np.isnan(points).any(axis=1)]
+    return points[np.argsort(points[:, 0], kind='stable')]
+
+
+def save_curve(core, kind, depths, values, unit=''):
+    ''' Store the curve of a kind of a core section, it replaces the curve stored before
+    '''
+    if kind not in KINDS:
+        raise ValueError(f'Unknown kind of curve {kind}')
+    points = to_points(depths, values)
+
+    buffer = io.BytesIO()
+    np.save(buffer, points)
+    curve = MeasurementCurve.objects.filter(core_id=core.pk, kind=kind).first() \
+        or MeasurementCurve(core_id=core.pk, well_id=core.well_id, kind=kind)
+    old_file = curve.data.name if curve.data else None
+
+    curve.unit = unit
+    curve.points = len(points)
+    curve.top_depth, curve.bottom_depth = (float(points[0, 0]), float(points[-1, 0])) if len(points) else (None, None)
+    curve.min_value, curve.max_value = (float(points[:, 1].min()), float(points[:, 1].max())) if len(points) else (None, None)
+    curve.data.save(f'{core.well_id}/{core.pk}-{kind}.npy', ContentFile(buffer.getvalue()), save=False)
+    curve.save()
+
+    if old_file and old_file != curve.data.name:
+        # The row of a rolled back transaction still points to the old file
+        transaction.on_commit(lambda storage=curve.data.storage: storage.delete(old_file))
+    # The plots of the well are cached by its version
+    bump_well_version(Well, core.well_id)
+    return curve
+
+
+def load(curve):
+    ''' The (depth, value) array of a curve, memory mapped when the file is on the local disk
+    '''
+    try:
+        path = curve.data.path
+    except NotImplementedError:
+        # Remote storages have no path, the whole file is read
+        with curve.data.open('rb') as file:
+            return np.load(io.BytesIO(file.read()))
+    return np.load(path, mmap_mode='r')
+
+
+def window(curve, top=None, bottom=None):
+    ''' The depths and the values of a curve between two depths, both included
+    '''
+    points = load(curve)
+    start = 0 if top is None else np.searchsorted(points[:, 0], top, side='left')
+    end = len(points) if bottom is None else np.searchsorted(points[:, 0], bottom, side='right')
+    selected = np.array(points[start:end])
+    return selected[:, 0], selected[:, 1]
+
+
+def decimate(depths, values, buckets):
+    ''' Keep the minimum and the maximum of every bucket of points, at most 2 * buckets points.
+    The peaks of the curve survive, which is what a plot of a few hundred pixels can show.
+    '''
+    if buckets <= 0 or len(depths) <= 2 * buckets:
+        return depths, values
+    # The points are split in buckets of the same size, sorted by value inside every bucket
+    # the first point of a bucket is its minimum and the last one its maximum
+    bucket = np.arange(len(depths)) * buckets // len(depths)
+    order = np.lexsort((values, bucket))
+    starts = np.searchsorted(bucket, np.arange(buckets), side='left')
+    ends = np.searchsorted(bucket, np.arange(buckets), side='right') - 1
+    keep = np.unique(np.concatenate([order[starts], order[ends]]))
+    return depths[keep], values[keep]
+
+
+def lttb(depths, values, threshold):
+    ''' Largest triangle three buckets: keep the first and the last point and, in every bucket
+    in between, the point that makes the largest triangle with the point kept before it and
+    the mean of the next bucket. Smoother than decimate, one point per bucket.
+    '''
+    if threshold < 3 or len(depths) <= threshold:
+        return depths, values
+    edges = np.linspace(1, len(depths) - 1, threshold - 1).astype(np.int64)
+    # The means of the buckets are computed at once from the cumulative sums
+    sums_depths = np.concatenate([[0.0], np.cumsum(depths)])
+    sums_values = np.concatenate([[0.0], np.cumsum(values)])
+    # The bucket after the bucket i is [edges[i + 1], edges[i + 2]), after the last one comes the last point
+    next_starts = edges[1:]
+    next_ends = np.append(edges[2:], len(depths))
+    counts = next_ends - next_starts
+    mean_depths = (sums_depths[next_ends] - sums_depths[next_starts]) / counts
+    mean_values = (sums_values[next_ends] - sums_values[next_starts]) / counts
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, len(depths) - 1
+    for bucket in range(threshold - 2):
+        # Every bucket depends on the point kept in the one before, only this loop is sequential
+        start, end = edges[bucket], edges[bucket + 1]
+        previous = keep[bucket]
+        areas = np.abs((depths[previous] - mean_depths[bucket]) * (values[start:end] - values[previous])
+                       - (depths[previous] - depths[start:end]) * (mean_values[bucket] - values[previous]))
+        keep[bucket + 1] = start + int(np.argmax(areas))
+    return depths[keep], values[keep]
+
+
+def lttb_buckets(depths, values, buckets):
+    # The same number of points as decimate
+    return lttb(depths, values, 2 * buckets)
+
+
+DECIMATIONS = {'minmax': decimate, 'lttb': lttb_buckets}
+
+
+def well_curve(well, kind, top=None, bottom=None, buckets=0, method='minmax'):
+    ''' The curve of a kind along the whole well, the curves of its sections that overlap
+    the window are joined in depth order and decimated together, to at most 2 * buckets points
+    '''
+    curves = MeasurementCurve.objects.filter(well=well, kind=kind, points__gt=0)
+    if top is not None:
+        curves = curves.filter(bottom_depth__gte=top)
+    if bottom is not None:
+        curves = curves.filter(top_depth__lte=bottom)
+
+    parts = [window(curve, top, bottom) for curve in curves.order_by('top_depth')]
+    if not parts:
+        return np.empty(0), np.empty(0)
+    depths = np.concatenate([depths for depths, _ in parts])
+    values = np.concatenate([values for _, values in parts])
+    order = np.argsort(depths, kind='stable')
+    return DECIMATIONS[method](depths[order], values[order], buckets)
+
+
+def read_logger_csv(file, section_column, depth_column, curve_columns):
+    ''' Read a csv export of a core logger with the points of many sections.
+    curve_columns maps the kinds of curves to the columns of the file.
+    Returns {section name: (depths, {kind: values})}, the values that are not numbers are missing.
+    '''
+    rows = {}
+    reader = csv.DictReader(file)
+    missing = [column for column in [section_column, depth_column, *curve_columns.values()]
+               if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f'Columns {missing} not found in the csv file')
+
+    for row in reader:
+        rows.setdefault(row[section_column], []).append(
+            [row[depth_column]] + [row[column] for column in curve_columns.values()])
+
+    sections = {}
+    for section, values in rows.items():
+        # genfromtxt turns the empty and the invalid cells into nan
+        table = np.genfromtxt(io.StringIO('\n'.join(','.join(row) for row in values)),
+                              delimiter=',', dtype=np.float64, ndmin=2)
+        sections[section] = (table[:, 0], {kind: table[:, index + 1] for index, kind in enumerate(curve_columns)})
+    return sections
+
+
+def import_curves(path, section_column, depth_column, curve_columns, units=None):
+    ''' Store the curves of every section of a logger export, returns the number of curves
+    stored and the names of the sections that were not found
+    '''
+    units = units or {}
+    with open(path, newline='') as file:
+        sections = read_logger_csv(file, section_column, depth_column, curve_columns)
+
+    cores = {core.core_section_name: core for core in
+             with_archive(Core, core_section_name__in=list(sections))}
+    stored, not_found = 0, []
+    for section, (depths, curves) in sections.items():
+        core = cores.get(section)
+        if core is None:
+            not_found.append(section)
+            continue
+        with transaction.atomic():
+            for kind, values in curves.items():
+                save_curve(core, kind, depths, values, unit=units.get(kind, ''))
+                stored += 1
+    return stored, not_found
+
@@ -0,0 +1,282 @@
+''' Correct the depths of all the samples of a well at once.
+
+The depths of the cores are measured by the driller, later they are shifted to match
+the depths of the wireline logs, and the wells drilled in feet are converted to metres.
+A correction multiplies the depths by a factor and then adds a shift that is
+interpolated linearly between the points of a shift table:
+
+    new depth = depth * factor + interp(depth * factor, table depths, table shifts)
+
+Outside of the table the shift of the first or of the last point is used.
+
+The lengths of the sections (core_section_length, core_recovery) follow their interval:
+they are multiplied by how much the correction stretched the interval of the section,
+which is the factor when there is no shift table. The points of the measurement curves
+are corrected like the depths and written to new files, the files from before are kept
+so that the correction can be undone.
+
+The depths of the well are read in one query per table, the new ones are computed with
+numpy and written back with batched UPDATE ... SET top_depth = CASE WHEN id = ... END
+statements, no sample is loaded as a model instance. The depths from before are kept
+in the DepthCorrection, the last correction of a well can be undone. The samples of a
+closed well are archived and can not be changed, its depths are neither corrected nor
+restored until the well is opened again.
+
+Example:
+>>> correct_depths(well, shifts=[(0, 1.2), (1500, 2.5)], dry_run=True)
+>>> correction = correct_depths(well, factor=FEET_TO_METRES, user=user)
+>>> undo_correction(correction)
+'''
+import io
+
+import numpy as np
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.utils import timezone
+
+from .archive import well_key
+from .curves import load
+from .models import Core, CoreChip, Cuttings, DepthCorrection, MeasurementCurve, Well
+from .samples import closed_well_message, closed_wells
+from .signals import samples_changed, bump_well_version
+
+FEET_TO_METRES = 0.3048
+# The depths are stored to the tenth of a millimetre, it keeps float noise out of the diffs
+DECIMALS = 4
+BATCH_SIZE = 500
+
+DEPTH_FIELDS = {
+    Core: ['top_depth', 'bottom_depth'],
+    CoreChip: ['corechip_depth', 'top_depth'],
+    Cuttings: ['cuttings_depth'],
+}
+# The lengths change with the interval of the sample, given by its top and its bottom depth
+LENGTH_FIELDS = {
+    Core: ['core_section_length', 'core_recovery'],
+}
+INTERVALS = {
+    Core: ('top_depth', 'bottom_depth'),
+}
+CURVES = 'MeasurementCurve'
+
+
+def check_shifts(shifts):
+    ''' The shift table as a sorted list of [depth, shift] pairs
+    '''
+    try:
+        points = sorted([float(depth), float(shift)] for depth, shift in shifts)
+    except (TypeError, ValueError):
+        raise ValueError('The shift table must be a list of (depth, shift) pairs of numbers')
+    depths = [depth for depth, _ in points]
+    if len(set(depths)) != len(depths):
+        raise ValueError('The depths of the shift table must be unique')
+    return points
+
+
+def corrected(depths, factor, shifts):
+    ''' The corrected depths of a numpy array, nan stays nan
+    '''
+    new = depths * factor
+    if shifts:
+        table = np.asarray(shifts, dtype=float)
+        new = new + np.interp(new, table[:, 0], table[:, 1])
+    return np.round(new, DECIMALS)
+
+
+def read_depths(model, well):
+    ''' The ids and the depths of the samples of a well, the missing depths are nan
+    '''
+    fields = DEPTH_FIELDS[model] + LENGTH_FIELDS.get(model, [])
+    rows = list(model.objects.filter(well=well).order_by('pk').values_list('pk', *fields))
+    if not rows:
+        return np.empty(0, dtype=np.int64), {field: np.empty(0) for field in fields}
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    depths = np.array([row[1:] for row in rows], dtype=float)
+    return ids, {field: depths[:, index] for index, field in enumerate(fields)}
+
+
+def stretch(model, old, factor, shifts):
+    ''' How much a correction stretches the interval of every sample. Without bottom depth the
+    interval ends where the section length ends, without an interval it is the factor.
+    '''
+    top_field, bottom_field = INTERVALS[model]
+    top, bottom = old[top_field], old[bottom_field]
+    bottom = np.where(np.isnan(bottom), top + old['core_section_length'], bottom)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = (corrected(bottom, factor, shifts) - corrected(top, factor, shifts)) / (bottom - top)
+    return np.where(np.isfinite(ratio) & (bottom > top), ratio, factor)
+
+
+def case_update(model, ids, values, batch_size=BATCH_SIZE):
+    ''' Write a different value to every row with one UPDATE per batch of rows:
+    UPDATE ... SET <field> = CASE WHEN id = 1 THEN 10.5 WHEN id = 2 THEN ... END WHERE id IN (...)
+    values is {field: numpy array}, nan is written as null. Returns the number of rows updated.
+    '''
+    updated = 0
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size].tolist()
+        assignments = {}
+        for field, column in values.items():
+            whens = [When(pk=pk, then=Value(None if np.isnan(value) else float(value)))
+                     for pk, value in zip(batch, column[start:start + batch_size].tolist())]
+            assignments[field] = Case(*whens, default=F(field), output_field=FloatField())
+        updated += model.objects.filter(pk__in=batch).update(**assignments)
+    return updated
+
+
+def _json(column):
+    return [None if np.isnan(value) else value for value in column.tolist()]
+
+
+def plan(well, factor=1.0, shifts=()):
+    ''' The samples whose depths change, {model: (ids, {field: old depths}, {field: new depths})}
+    '''
+    changes = {}
+    for model, fields in DEPTH_FIELDS.items():
+        ids, old = read_depths(model, well)
+        new = {field: corrected(old[field], factor, shifts) for field in fields}
+        if model in LENGTH_FIELDS:
+            ratio = stretch(model, old, factor, shifts)
+            new.update({field: np.round(old[field] * ratio, DECIMALS) for field in LENGTH_FIELDS[model]})
+        changed = np.zeros(len(ids), dtype=bool)
+        for field in new:
+            changed |= ~np.isnan(old[field]) & (new[field] != old[field])
+        if changed.any():
+            changes[model] = (ids[changed], {field: old[field][changed] for field in new},
+                              {field: new[field][changed] for field in new})
+    return changes
+
+
+def diff(changes, limit=None):
+    ''' The changes of a plan as rows of (model name, id, field, old depth, new depth)
+    '''
+    rows = []
+    for model, (ids, old, new) in changes.items():
+        for field in old:
+            changed = ~np.isnan(old[field]) & (new[field] != old[field])
+            for pk, before, after in zip(ids[changed].tolist(), old[field][changed].tolist(),
+                                         new[field][changed].tolist()):
+                rows.append((model.__name__, pk, field, before, after))
+                if limit is not None and len(rows) >= limit:
+                    return rows
+    return rows
+
+
+def correct_curves(well, factor, shifts, correction):
+    ''' Write the corrected points of the curves of the well to new files.
+    Returns the files and the extents of the curves from before.
+    '''
+    previous = {'id': [], 'data': [], 'top_depth': [], 'bottom_depth': []}
+    written = []
+    try:
+        for curve in MeasurementCurve.objects.select_for_update().filter(well=well, points__gt=0).order_by('pk'):
+            points = np.array(load(curve))
+            points[:, 0] = corrected(points[:, 0], factor, shifts)
+            if (points[:, 0] < 0).any():
+                raise ValueError('The correction makes depths of MeasurementCurve negative')
+            buffer = io.BytesIO()
+            # A shift table that goes back up can change the order of the points
+            np.save(buffer, points[np.argsort(points[:, 0], kind='stable')])
+
+            previous['id'].append(curve.pk)
+            previous['data'].append(curve.data.name)
+            previous['top_depth'].append(curve.top_depth)
+            previous['bottom_depth'].append(curve.bottom_depth)
+            name = curve.data.storage.save(f'curves/{curve.well_id}/{curve.core_id}-{curve.kind}-{correction.pk}.npy',
+                                           ContentFile(buffer.getvalue()))
+            written.append((curve.data.storage, name))
+            MeasurementCurve.objects.filter(pk=curve.pk).update(
+                data=name, top_depth=float(points[:, 0].min()), bottom_depth=float(points[:, 0].max()))
+    except BaseException:
+        for storage, name in written:
+            storage.delete(name)
+        raise
+    return previous
+
+
+def restore_curves(previous):
+    ''' Point the curves back to their files from before a correction and delete the corrected files
+    '''
+    curves = MeasurementCurve.objects.in_bulk(previous['id'])
+    for pk, name, top, bottom in zip(previous['id'], previous['data'], previous['top_depth'], previous['bottom_depth']):
+        curve = curves.get(pk)
+        if curve is None:
+            continue
+        if curve.data.name != name:
+            transaction.on_commit(lambda storage=curve.data.storage, corrected=curve.data.name: storage.delete(corrected))
+        MeasurementCurve.objects.filter(pk=pk).update(data=name, top_depth=top, bottom_depth=bottom)
+
+
+def correct_depths(well, factor=1.0, shifts=(), dry_run=False, user=None):
+    ''' Correct the depths of the samples of a well.
+    With dry_run the plan of the changes is returned and nothing is written,
+    otherwise the DepthCorrection that keeps the depths from before.
+    '''
+    shifts = check_shifts(shifts)
+    if factor <= 0:
+        raise ValueError('The factor must be positive')
+
+    with transaction.atomic():
+        # The well stays open until the correction is written
+        if closed_wells({well.pk}):
+            raise ValueError(closed_well_message(well))
+        changes = plan(well, factor, shifts)
+        for model, (ids, old, new) in changes.items():
+            if any((column < 0).any() for column in new.values()):
+                raise ValueError(f'The correction makes depths of {model.__name__} negative')
+        if dry_run:
+            return changes
+
+        correction = DepthCorrection(well=well, factor=factor, shifts=shifts, created_by=user)
+        correction.previous = {
+            model.__name__: {'id': ids.tolist(), **{field: _json(column) for field, column in old.items()}}
+            for model, (ids, old, new) in changes.items()
+        }
+        for model, (ids, old, new) in changes.items():
+            correction.samples += case_update(model, ids, new)
+        # The name of the corrected files has the id of the correction
+        correction.save()
+        curves = correct_curves(well, factor, shifts, correction)
+        if curves['id']:
+            correction.previous[CURVES] = curves
+            correction.save(update_fields=['previous'])
+
+    # The updates are set based, the caches of the samples have to be told
+    for model in changes:
+        samples_changed(model, well_key(model, well))
+    if CURVES in correction.previous:
+        # The plots of the curves are cached by the version of the well
+        bump_well_version(Well, well.pk)
+    return correction
+
+
+def undo_correction(correction):
+    ''' Write back the depths from before a correction, only the last correction of a well can be undone
+    '''
+    if correction.undone_at is not None:
+        raise ValueError('The correction was already undone')
+    if DepthCorrection.objects.filter(well_id=correction.well_id, undone_at__isnull=True,
+                                      pk__gt=correction.pk).exists():
+        raise ValueError('Undo the later corrections of the well first')
+
+    models = {model.__name__: model for model in DEPTH_FIELDS}
+    with transaction.atomic():
+        if closed_wells({correction.well_id}):
+            raise ValueError(closed_well_message(correction.well))
+        for name, previous in correction.previous.items():
+            if name == CURVES:
+                restore_curves(previous)
+                continue
+            ids = np.array(previous['id'], dtype=np.int64)
+            values = {field: np.array(column, dtype=float) for field, column in previous.items() if field != 'id'}
+            case_update(models[name], ids, values)
+        correction.undone_at = timezone.now()
+        correction.save(update_fields=['undone_at'])
+
+    for name in correction.previous:
+        if name in models:
+            samples_changed(models[name], well_key(models[name], correction.well))
+    if CURVES in correction.previous:
+        bump_well_version(Well, correction.well_id)
+    return correction
@@ -1,5 +1,53 @@
-from django.forms import ModelForm, ModelChoiceField, TextInput, inlineformset_factory, DateInput
-from crudapp.models import Contact, Well, Core, CoreChip, MicroCore, Cuttings
+from django.forms import Form, ModelForm, ModelChoiceField, ChoiceField, CharField, FloatField, DateTimeField, TextInput, inlineformset_factory, DateInput
+from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
+
+from crudapp.models import Contact, Well, Core, CoreChip, MicroCore, Cuttings, ImportJob, DRILLING_MUD_CHOICES
+from crudapp.samples import IMPORT_MODELS, closed_well_message
+from crudapp.bulk_edit import BULK_EDIT_MODELS, editable_fields
+
+
+class WellAutocompleteInput(TextInput):
+    ''' A text input for the well of a sample, the options are fetched lazily by main.js
+    from the autocomplete endpoint instead of rendering every well in a dropdown
+    '''
+    def __init__(self, attrs=None):
+        defaults = {
+            'list': 'well-options',
+            'autocomplete': 'off',
+            'data-autocomplete-url': reverse_lazy('autocomplete'),
+            'data-autocomplete-kind': 'well',
+        }
+        defaults.update(attrs or {})
+        super().__init__(attrs=defaults)
+
+
+class WellNameField(ModelChoiceField):
+    ''' The samples point to the well by its id, but the forms, the importers and
+    the users still send the name of the well. The field looks the well up by name,
+    and by id for the payloads built from the instances (model_to_dict, the api)
+    '''
+    def __init__(self, *args, **kwargs):
+        kwargs['to_field_name'] = 'name'
+        kwargs.setdefault('widget', WellAutocompleteInput())
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        try:
+            return super().to_python(value)
+        except ValidationError:
+            if not str(value).isdigit():
+                raise
+            try:
+                return self.queryset.get(pk=value)
+            except self.queryset.model.DoesNotExist:
+                raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+
+    def validate(self, value):
+        super().validate(value)
+        # The samples of a closed well are in the archive tables, see crudapp/archive.py
+        if value is not None and value.closed:
+            raise ValidationError(closed_well_message(value), code='closed')
 
 
 class ContactForm(ModelForm):
@@ -38,7 +86,10 @@ class CoreForm(ModelForm):
                    'bottom_depth'
                    ]
         
+        field_classes = {'well': WellNameField}
+
         widgets = {
+            'well': WellAutocompleteInput(),
             'core_section_name': TextInput(attrs={'readonly': 'readonly'}),
         }
 
@@ -52,6 +103,43 @@ class CoreForm(ModelForm):
                 instance.save()
             return instance
 
+class CoreBatchForm(Form):
+    ''' Fields shared by every section of a core run, they are entered once
+    and copied to all the sections of the batch
+    '''
+    core_number = ChoiceField(choices=Core.CORE_SECTION_CHOICES)
+    planned_core_number = ChoiceField(choices=Core.CORE_SECTION_CHOICES)
+    core_type = ChoiceField(choices=Core.CORE_TYPE_CHOICES, initial='Core')
+    collection_date = DateTimeField()
+    drilling_mud = ChoiceField(choices=[('', '---------')] + DRILLING_MUD_CHOICES, required=False)
+
+
+class CoreSectionForm(ModelForm):
+    ''' A single row of the batch registration, only the fields that change
+    from one section to the next are displayed
+    '''
+    class Meta:
+        model = Core
+        fields = [
+            'top_depth',
+            'bottom_depth',
+            'core_section_length',
+            'core_recovery',
+            'remarks',
+            'lithology',
+        ]
+
+
+def core_section_formset(sections, max_sections):
+    ''' Build a formset with one form per core section of a core run,
+    all of them belonging to the same well. A POST with more than max_sections
+    sections is invalid, no form is built beyond it whatever TOTAL_FORMS says
+    '''
+    return inlineformset_factory(
+        Well, Core, form=CoreSectionForm, fk_name='well', extra=sections, can_delete=False,
+        max_num=max_sections, validate_max=True, absolute_max=max_sections)
+
+
 class CoreChipForm(ModelForm):
     class Meta:
         model = CoreChip
@@ -68,7 +156,10 @@ class CoreChipForm(ModelForm):
             'registered_by',
         ]
 
+        field_classes = {'well': WellNameField}
+
         widgets = {
+            'well': WellAutocompleteInput(),
             'core_section_name': TextInput(attrs={'readonly': 'readonly'}),
         }
 
@@ -81,6 +172,12 @@ class MicroCoreForm(ModelForm):
             'registered_by',
         ]
 
+        field_classes = {'well': WellNameField}
+
+        widgets = {
+            'well': WellAutocompleteInput(),
+        }
+
 
 class CuttingsForm(ModelForm):
     class Meta:
@@ -101,10 +198,34 @@ class CuttingsForm(ModelForm):
             'dried_date': 'Dried Date',
         }
 
+        field_classes = {'well': WellNameField}
+
         widgets = {
             # Add any specific widgets you require. For example, a date picker for dates.
+            'well': WellAutocompleteInput(),
             'dried_date': DateInput(attrs={'type': 'date'}),
         }
 
         # Exclude fields that are not necessary or are automatically handled by the system
         exclude = ['registered_by']
+
+
+class ImportJobForm(ModelForm):
+    model_name = ChoiceField(choices=[(name, name) for name in IMPORT_MODELS], label='Import into')
+
+    class Meta:
+        model = ImportJob
+        fields = ['csv_file', 'model_name', 'mapping_file']
+
+
+class BulkEditForm(Form):
+    ''' The filter of the samples and the single field that is assigned to all of them
+    '''
+    sample_type = ChoiceField(choices=[(name, model._meta.verbose_name) for name, model in BULK_EDIT_MODELS.items()])
+    well = CharField(required=False, widget=WellAutocompleteInput())
+    core_number = CharField(required=False)
+    min_depth = FloatField(required=False, label='From depth')
+    max_depth = FloatField(required=False, label='To depth')
+    field = ChoiceField(choices=sorted({(name, name) for model in BULK_EDIT_MODELS.values()
+                                        for name in editable_fields(model)}))
+    value = CharField(required=False)
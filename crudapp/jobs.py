@@ -0,0 +1,264 @@
+''' Background imports of csv files.
+
+The upload view stores the file in an ImportJob and pushes the id of the job on a
+redis list, the worker process (`python manage.py import_worker`) pops the ids and
+imports the rows in chunks, writing its progress to the job after every chunk so
+that the progress endpoint can report it.
+
+A worker moves the id it pops to its own processing list and removes it from there
+when the job is finished. A running worker refreshes a heartbeat key that expires soon
+after it dies, the jobs left in the processing lists of the workers without heartbeat
+are put back on the queue when a worker starts, and continue after the rows that
+were already processed.
+Without IMPORT_QUEUE_URL (development and the tests) the job runs right away in
+the process that enqueues it.
+
+Example:
+>>> job = ImportJob.objects.create(csv_file=upload, model_name='Core', created_by=user)
+>>> enqueue(job)
+>>> ImportJob.objects.get(pk=job.pk).progress()
+{'status': 'done', 'rows_processed': 1200, 'rows_imported': 1198, 'rows_per_second': 850.3, ...}
+'''
+import csv
+import io
+from itertools import islice
+
+from django.conf import settings
+from django.core import exceptions
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from pydantic import ValidationError
+
+from .models import Well, ImportJob
+from .validation import registry
+from .signals import samples_changed
+from .audit import record_bulk
+from .samples import IMPORT_MODELS, bulk_create, add_derived_names, validation_errors, closed_well_message, closed_wells
+from .management.commands.import_data import convert_date_format
+from .management.commands.mappings import load_mappings
+
+QUEUE_KEY = 'rockin:import_jobs'
+# The jobs that a worker took and did not finish yet, one list per worker
+PROCESSING_KEY = 'rockin:import_jobs:processing:{worker}'
+# Refreshed by every running worker, it expires when the worker dies
+HEARTBEAT_KEY = 'rockin:import_workers:{worker}'
+HEARTBEAT_SECONDS = 30
+CHUNK_SIZE = 500
+# Enough to fix a broken file, a file where every row fails would make the job huge otherwise
+MAX_STORED_ERRORS = 1000
+
+# Fields that are filled in by the server
+SKIPPED_FIELDS = ['id', 'registration_date', 'registered_by']
+
+
+def get_connection():
+    # redis is only needed by the processes that use the queue
+    import redis
+    return redis.Redis.from_url(settings.IMPORT_QUEUE_URL)
+
+
+def enqueue(job):
+    if not settings.IMPORT_QUEUE_URL:
+        run_job(job.pk)
+        return
+    get_connection().lpush(QUEUE_KEY, job.pk)
+
+
+def dequeue(connection, worker, timeout=5):
+    ''' Wait for the next job, returns its id or None if no job arrived before the timeout.
+    The id stays in the processing list of the worker until `acknowledge`.
+    '''
+    item = connection.brpoplpush(QUEUE_KEY, PROCESSING_KEY.format(worker=worker), timeout=timeout)
+    if item is None:
+        return None
+    return int(item)
+
+
+def acknowledge(connection, worker, job_id):
+    connection.lrem(PROCESSING_KEY.format(worker=worker), 1, job_id)
+
+
+def heartbeat(connection, worker):
+    connection.set(HEARTBEAT_KEY.format(worker=worker), 1, ex=HEARTBEAT_SECONDS)
+
+
+def requeue_stale(connection):
+    ''' Put the jobs of the workers that died while running them back on the queue,
+    returns their ids
+    '''
+    requeued = []
+    for key in connection.scan_iter(PROCESSING_KEY.format(worker='*')):
+        worker = key.decode().rsplit(':', 1)[-1]
+        if connection.exists(HEARTBEAT_KEY.format(worker=worker)):
+            continue
+        while True:
+            item = connection.rpoplpush(key, QUEUE_KEY)
+            if item is None:
+                break
+            requeued.append(int(item))
+    return requeued
+
+
+def clean_row(row, column_mappings, ignore_columns):
+    ''' Rename the columns of a csv row to the fields of the model and convert
+    the values the same way as `manage.py import_data`
+    '''
+    payload = {}
+    for column, value in row.items():
+        if column is None or column in ignore_columns:
+            continue
+        value = value.strip() if isinstance(value, str) else value
+        payload[column_mappings.get(column, column)] = value if value != '' else None
+
+    for field, value in payload.items():
+        if '_date' in field and value is not None and parse_datetime(value) is None:
+            payload[field] = convert_date_format(value) or value
+
+    if payload.get('dried_sample'):
+        payload['dried_sample'] = {'yes': True, 'no': False}.get(
+            payload['dried_sample'].lower(), payload['dried_sample'])
+    return payload
+
+
+def build_instance(model, payload, wells, user):
+    instance = model(registered_by=user)
+    for field in model._meta.concrete_fields:
+        if field.name not in payload or field.name in SKIPPED_FIELDS:
+            continue
+        value = payload[field.name]
+        if field.name == 'well':
+            if value not in wells:
+                raise ValueError(f'Well with name {value} not found.')
+            if wells[value].closed:
+                raise ValueError(closed_well_message(wells[value]))
+            instance.well = wells[value]
+        else:
+            setattr(instance, field.attname, field.to_python(value))
+    return instance
+
+
+def save_chunk(model, instances):
+    ''' Insert a chunk with one query, if the database rejects it the rows are
+    inserted one by one to find the ones that are wrong.
+    Returns the saved instances and the (index, message) of the rejected ones.
+    '''
+    closed = set()
+    try:
+        with transaction.atomic():
+            # The wells may have been closed since the chunk was checked
+            closed = closed_wells({instance.well_id for instance in instances})
+            if not closed:
+                return bulk_create(model, instances), []
+    except IntegrityError:
+        pass
+
+    saved, rejected = [], []
+    for index, instance in enumerate(instances):
+        if instance.well_id in closed:
+            rejected.append((index, closed_well_message(instance.well)))
+            continue
+        try:
+            with transaction.atomic():
+                # Not save(), Core.save() would rename the section
+                bulk_create(model, [instance])
+            saved.append(instance)
+        except IntegrityError as e:
+            rejected.append((index, str(e)))
+    return saved, rejected
+
+
+def import_chunk(model, rows, user):
+    ''' Validate and insert a chunk of (line number, payload) rows.
+    Returns the number of imported rows and the errors of the other rows.
+    '''
+    payloads = [add_derived_names(model, payload) for _, payload in rows]
+    # Our current pydantic models need an id to be created
+    checked = registry.validate_many(model.__name__, [{'id': 1, **payload} for payload in payloads])
+
+    wells = Well.objects.in_bulk({payload.get('well') for payload in payloads if payload.get('well')},
+                                 field_name='name')
+    errors = []
+    instances, lines = [], []
+    for (line, payload), result in zip(rows, checked):
+        if type(result) is ValidationError:
+            errors.extend({'row': line, **error} for error in validation_errors(result))
+            continue
+        try:
+            instances.append(build_instance(model, payload, wells, user))
+            lines.append(line)
+        except (ValueError, exceptions.ValidationError) as e:
+            errors.append({'row': line, 'field': None, 'msg': str(e)})
+
+    saved, rejected = save_chunk(model, instances)
+    for index, message in rejected:
+        errors.append({'row': lines[index], 'field': None, 'msg': message})
+
+    # bulk_create does not send the post_save signals
+    for well_key in {instance.well_id for instance in saved}:
+        samples_changed(model, well_key)
+    record_bulk(model, saved, 'create', user=user)
+    return len(saved), errors
+
+
+def read_rows(job):
+    ''' The rows of the csv file of a job as (line number, payload) with the
+    mappings of the job applied
+    '''
+    column_mappings, ignore_columns = {}, []
+    if job.mapping_file:
+        column_mappings, _, ignore_columns = load_mappings(job.mapping_file.path)
+        column_mappings = column_mappings or {}
+        ignore_columns = ignore_columns or []
+
+    with job.csv_file.open('rb') as file:
+        reader = csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+        for row in reader:
+            yield reader.line_num, clean_row(row, column_mappings, ignore_columns)
+
+
+def count_rows(job):
+    with job.csv_file.open('rb') as file:
+        # Minus the header
+        return max(sum(1 for _ in csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))) - 1, 0)
+
+
+def run_job(job_id, chunk_size=CHUNK_SIZE):
+    ''' Import the csv file of a job, the counters and the errors of the job are
+    saved after every chunk
+    '''
+    job = ImportJob.objects.select_related('created_by').get(pk=job_id)
+    model = IMPORT_MODELS.get(job.model_name)
+
+    job.status = 'running'
+    job.started_at = timezone.now()
+    job.save(update_fields=['status', 'started_at'])
+
+    progress_fields = ['rows_total', 'rows_processed', 'rows_imported', 'rows_failed', 'errors']
+    try:
+        if model is None:
+            raise ValueError(f'Unknown model {job.model_name}')
+        job.rows_total = count_rows(job)
+
+        # A job that is run again after its worker died continues after the rows it processed
+        rows = islice(read_rows(job), job.rows_processed, None)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            imported, errors = import_chunk(model, chunk, job.created_by)
+            job.rows_processed += len(chunk)
+            job.rows_imported += imported
+            job.rows_failed += len({error['row'] for error in errors})
+            job.errors = (job.errors + errors)[:MAX_STORED_ERRORS]
+            job.save(update_fields=progress_fields)
+        job.status = 'done'
+    except Exception as e:
+        print(f"Import job {job.pk} failed: {e}")
+        job.errors = job.errors[:MAX_STORED_ERRORS - 1] + [{'row': None, 'field': None, 'msg': str(e)}]
+        job.status = 'failed'
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=progress_fields + ['status', 'finished_at'])
+    return job
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crudapp.models import Well
+from crudapp.archive import archive_well, reopen_well
+
+
+class Command(BaseCommand):
+    """
+    Close a well and move its samples to the archive tables, or reopen it.
+
+    Usage:
+        python manage.py archive_well "DEL-GT-01"
+        python manage.py archive_well "DEL-GT-01" --reopen
+    """
+    help = 'Move the samples of a closed well to the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('well_name', type=str, help='Name of the well')
+        parser.add_argument('--reopen', action='store_true',
+                            help='Move the samples back to the hot tables')
+
+    def handle(self, *args, **kwargs):
+        try:
+            well = Well.objects.get(name=kwargs['well_name'])
+        except Well.DoesNotExist:
+            raise CommandError(f"Well with name {kwargs['well_name']} not found.")
+
+        if kwargs['reopen']:
+            moved = reopen_well(well)
+        else:
+            moved = archive_well(well)
+
+        if not moved:
+            print(f"Well {well.name} is already {'open' if kwargs['reopen'] else 'closed'}.")
+        for model_name, count in moved.items():
+            print(f"{model_name}: {count} samples moved")
@@ -0,0 +1,79 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crudapp.models import Well, DepthCorrection
+
+
+def read_shift_file(path):
+    ''' A csv file with a depth and a shift column
+    '''
+    with open(path, newline='') as file:
+        reader = csv.DictReader(file)
+        if not reader.fieldnames or not {'depth', 'shift'} <= set(reader.fieldnames):
+            raise CommandError('The shift file needs a depth and a shift column')
+        return [(row['depth'], row['shift']) for row in reader]
+
+
+class Command(BaseCommand):
+    """
+    Shift the depths of the samples of a well or convert them between feet and metres,
+    see crudapp/depths.py.
+
+    Usage:
+        python manage.py correct_depths "DEL-GT-01" --shift 0:1.2 --shift 1500:2.5 --dry-run
+        python manage.py correct_depths "DEL-GT-01" --shift-file log_shifts.csv
+        python manage.py correct_depths "DEL-GT-01" --feet-to-metres
+        python manage.py correct_depths "DEL-GT-01" --undo
+    """
+    help = 'Correct the depths of the samples of a well with a shift table or a unit conversion'
+
+    def add_arguments(self, parser):
+        parser.add_argument('well_name', type=str, help='Name of the well')
+        parser.add_argument('--shift', action='append', default=[],
+                            help='A point of the shift table as depth:shift, can be repeated')
+        parser.add_argument('--shift-file', type=str, help='csv file with a depth and a shift column')
+        units = parser.add_mutually_exclusive_group()
+        units.add_argument('--feet-to-metres', action='store_true', help='Convert the depths from feet to metres')
+        units.add_argument('--metres-to-feet', action='store_true', help='Convert the depths from metres to feet')
+        parser.add_argument('--dry-run', action='store_true', help='Show the changes without writing them')
+        parser.add_argument('--limit', type=int, default=20, help='Changes shown by --dry-run')
+        parser.add_argument('--undo', action='store_true', help='Undo the last correction of the well')
+
+    def handle(self, *args, **kwargs):
+        # depths imports numpy, only when a correction actually runs
+        from crudapp.depths import correct_depths, undo_correction, diff, FEET_TO_METRES
+
+        try:
+            well = Well.objects.get(name=kwargs['well_name'])
+        except Well.DoesNotExist:
+            raise CommandError(f"Well with name {kwargs['well_name']} not found.")
+
+        if kwargs['undo']:
+            correction = DepthCorrection.objects.filter(well=well, undone_at__isnull=True).order_by('pk').last()
+            if correction is None:
+                raise CommandError(f"Well {well.name} has no correction to undo.")
+            try:
+                undo_correction(correction)
+            except ValueError as e:
+                raise CommandError(str(e))
+            print(f"Correction {correction.pk} undone, {correction.samples} samples restored")
+            return
+
+        try:
+            shifts = [point.split(':') for point in kwargs['shift']]
+            if kwargs['shift_file']:
+                shifts += read_shift_file(kwargs['shift_file'])
+            factor = FEET_TO_METRES if kwargs['feet_to_metres'] else 1 / FEET_TO_METRES if kwargs['metres_to_feet'] else 1.0
+            if not shifts and factor == 1.0:
+                raise CommandError('Pass a shift table or a unit conversion')
+            result = correct_depths(well, factor=factor, shifts=shifts, dry_run=kwargs['dry_run'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if kwargs['dry_run']:
+            print(f"{sum(len(ids) for ids, _, _ in result.values())} samples would change")
+            for model_name, pk, field, before, after in diff(result, limit=kwargs['limit']):
+                print(f"{model_name} {pk} {field}: {before} -> {after}")
+        else:
+            print(f"Correction {result.pk}: {result.samples} samples corrected")
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crudapp.archive import with_archive
+from crudapp.models import Core
+
+
+class Command(BaseCommand):
+    """
+    Import the CT scan of a core section in the tiled layout that the viewer reads,
+    see crudapp/ct.py. The stack is a folder of tiff slices or a .npy file of shape (slices, height, width).
+
+    Usage:
+        python manage.py import_ct "DEL-GT-01-C3-1" /mnt/ct_share/DEL-GT-01/C3-1/ --voxel-size 0.2
+        python manage.py import_ct "DEL-GT-01-C3-1" scan.npy --kind macroct --tile-size 512
+    """
+    help = 'Import the CT scan of a core section'
+
+    def add_arguments(self, parser):
+        # ct imports numpy, only when the command actually runs
+        from crudapp.ct import TILE_SIZE, SCANNED_FIELDS
+
+        parser.add_argument('core_section_name', type=str, help='Name of the core section')
+        parser.add_argument('source', type=str, help='Folder of slices or .npy file with the stack')
+        parser.add_argument('--kind', choices=list(SCANNED_FIELDS), default='ct', help='The kind of scan')
+        parser.add_argument('--tile-size', type=int, default=TILE_SIZE, help='The side of the tiles in voxels')
+        parser.add_argument('--voxel-size', type=float, help='The size of a voxel in millimetres')
+
+    def handle(self, *args, **kwargs):
+        from crudapp.ct import import_stack
+
+        core = next(iter(with_archive(Core, core_section_name=kwargs['core_section_name'])), None)
+        if core is None:
+            raise CommandError(f"Core section {kwargs['core_section_name']} not found.")
+        if kwargs['tile_size'] <= 0:
+            raise CommandError('The tile size must be positive')
+
+        try:
+            volume = import_stack(core, kwargs['source'], kind=kwargs['kind'],
+                                  tile_size=kwargs['tile_size'], voxel_size=kwargs['voxel_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        print(f"CT volume {volume.pk} imported, {volume.slices} slices of {volume.height}x{volume.width}")
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crudapp.models import MeasurementCurve
+
+# Not curves.KINDS, curves imports numpy and the command is imported at every start
+KINDS = [kind for kind, _ in MeasurementCurve.KIND_CHOICES]
+
+
+def kind_option(value):
+    ''' kind=COLUMN, the kind of a curve and the column of the csv file it is read from
+    '''
+    kind, _, column = value.partition('=')
+    if not column:
+        column = kind
+    if kind not in KINDS:
+        raise CommandError(f"Unknown kind of curve {kind}, the kinds are {', '.join(KINDS)}")
+    return kind, column
+
+
+class Command(BaseCommand):
+    """
+    Store the measurement curves of a csv export of a core logger, one row per point,
+    the rows of many sections can be in the same file. See crudapp/curves.py.
+
+    Usage:
+        python manage.py import_curves mscl_export.csv --curve gamma_ray=NGR --curve density="Den1 (g/cc)"
+        python manage.py import_curves mscl_export.csv --section-column SECTION --depth-column DEPTH --curve density=DEN --unit density=g/cc
+    """
+    help = 'Store the measurement curves of the core sections from a csv export of a core logger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', type=str, help='Path to the csv file')
+        parser.add_argument('--section-column', default='core_section_name', help='Column with the names of the core sections')
+        parser.add_argument('--depth-column', default='depth', help='Column with the depths of the points')
+        parser.add_argument('--curve', action='append', default=[], help='A curve as kind=COLUMN, can be repeated')
+        parser.add_argument('--unit', action='append', default=[], help='The unit of a curve as kind=UNIT, can be repeated')
+
+    def handle(self, *args, **kwargs):
+        from crudapp.curves import import_curves
+
+        if not kwargs['curve']:
+            raise CommandError('At least one --curve kind=COLUMN is needed')
+        curve_columns = dict(kind_option(value) for value in kwargs['curve'])
+        units = dict(value.partition('=')[::2] for value in kwargs['unit'])
+
+        try:
+            stored, not_found = import_curves(kwargs['csv_file'], kwargs['section_column'],
+                                              kwargs['depth_column'], curve_columns, units)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        print(f"{stored} curves stored")
+        if not_found:
+            print(f"Sections not found: {', '.join(not_found)}")
@@ -1,8 +1,5 @@
 import os
-import pandas as pd
-import yaml
 from datetime import datetime
-import pytz
 
 from django.core.management.base import BaseCommand
 
@@ -58,6 +55,9 @@ def convert_date_format(date_str):
     return None
 
 def process_row(row, model):
+    # pandas is only imported when an import actually runs, it is slow to import
+    import pandas as pd
+
     # Modify or set default values
     row = {k: v if pd.notnull(v) else None for k, v in row.items()}
 
@@ -138,6 +138,8 @@ class Command(BaseCommand):
         parser.add_argument('mapping_file', type=str, help='Path to the YAML mapping file')
 
     def handle(self, *args, **kwargs):
+        import pandas as pd
+
         csv_file = kwargs['csv_file']
         model_name = kwargs['model_name']
         mapping_file = kwargs['mapping_file']
@@ -162,6 +164,8 @@ class Command(BaseCommand):
         Returns:
             dict: A dictionary containing the column mappings.
         """
+        import yaml
+
         print('Loading column mappings from YAML file...')
         with open(filename, 'r') as file:
             return yaml.safe_load(file)
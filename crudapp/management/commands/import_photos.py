@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crudapp.photos import import_folder
+
+
+class Command(BaseCommand):
+    """
+    Import the photos of a folder, the files are matched to the core sections, core chips
+    and micro cores by name. See crudapp/photos.py.
+
+    Usage:
+        python manage.py import_photos /mnt/photos/DEL-GT-01/
+        python manage.py import_photos /mnt/photos/DEL-GT-01/ --workers 8
+    """
+    help = 'Import the photos of the samples from a folder'
+
+    def add_arguments(self, parser):
+        parser.add_argument('folder', type=str, help='Folder with the photos')
+        parser.add_argument('--workers', type=int, help='Processes that resize the photos, one per cpu by default')
+
+    def handle(self, *args, **kwargs):
+        try:
+            report = import_folder(kwargs['folder'], workers=kwargs['workers'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        print(f"{report['imported']} photos imported, {report['duplicates']} already there")
+        if report['not_matched']:
+            print(f"No sample for: {', '.join(report['not_matched'])}")
+        for error in report['errors']:
+            print(f"{error['file']}: {error['msg']}")
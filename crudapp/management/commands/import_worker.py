@@ -0,0 +1,74 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from crudapp.jobs import get_connection, dequeue, acknowledge, heartbeat, requeue_stale, run_job, HEARTBEAT_SECONDS
+
+
+class Command(BaseCommand):
+    """
+    Run the csv imports that staff upload through the web app.
+
+    The upload view puts the jobs on the redis queue of IMPORT_QUEUE_URL, this command
+    takes them one at a time and imports them in chunks. Run as many workers as
+    imports should run in parallel. The jobs of a worker that died are put back on
+    the queue by the workers that are still running.
+
+    Usage:
+        python manage.py import_worker
+        python manage.py import_worker --burst   # stop when the queue is empty
+    """
+    help = 'Run the queued csv imports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true', help='Stop when there are no more jobs')
+        parser.add_argument('--timeout', type=int, default=5,
+                            help='Seconds to wait for a job before checking again')
+
+    def handle(self, *args, **kwargs):
+        if not settings.IMPORT_QUEUE_URL:
+            raise CommandError('IMPORT_QUEUE_URL is not set, the imports run in the web process')
+
+        connection = get_connection()
+        worker = uuid.uuid4().hex
+        heartbeat(connection, worker)
+        stopped = threading.Event()
+        # A long job must not let the heartbeat expire, it is refreshed from a thread
+        beat = threading.Thread(target=self.beat, args=(connection, worker, stopped), daemon=True)
+        beat.start()
+
+        checked = self.requeue(connection)
+        print('Waiting for import jobs...')
+        try:
+            while True:
+                job_id = dequeue(connection, worker, timeout=kwargs['timeout'])
+                # A worker is only known to be dead once its heartbeat expired, look again from time to time
+                if time.monotonic() - checked >= HEARTBEAT_SECONDS:
+                    checked = self.requeue(connection)
+                if job_id is None:
+                    if kwargs['burst']:
+                        break
+                    continue
+
+                # The worker lives for days, do not keep using a connection that the database closed
+                close_old_connections()
+                print(f"Importing job {job_id}...")
+                job = run_job(job_id)
+                acknowledge(connection, worker, job_id)
+                print(f"Job {job_id} {job.status}: {job.rows_imported} rows imported, {job.rows_failed} rows failed")
+        finally:
+            stopped.set()
+
+    def requeue(self, connection):
+        requeued = requeue_stale(connection)
+        if requeued:
+            print(f"Jobs {requeued} of dead workers put back on the queue")
+        return time.monotonic()
+
+    def beat(self, connection, worker, stopped):
+        while not stopped.wait(HEARTBEAT_SECONDS / 3):
+            heartbeat(connection, worker)
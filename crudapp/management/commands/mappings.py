@@ -39,14 +39,17 @@ Remember, the actual transformation and application of these mappings depend on
 
 '''
 import os
-import pandas as pd
-import yaml
 import csv
 import argparse
 
+# pandas and yaml are imported inside the functions that use them, importing them
+# takes longer than starting django and most processes that import this module never need them
+
 def load_mappings(yaml_file):
     """Load column name and data value mappings from a YAML file.
     """
+    import yaml
+
     with open(yaml_file, 'r') as file:
         mappings = yaml.safe_load(file)
     return mappings.get('column_mappings', {}), mappings.get('data_mappings', {}), mappings.get('ignore_columns', [])
@@ -105,6 +108,8 @@ def apply_mappings(csv_file, column_mappings, data_mappings, column_to_modify, o
         print(e)
         return  # Stop execution if the delimiter is not valid
 
+    import pandas as pd
+
     # Proceed with loading the data
     df = pd.read_csv(csv_file, encoding='utf-8')
 
@@ -136,6 +141,8 @@ def process_csv_data(base_path, raw_csv, mapping_file, output_csv, column_to_mod
     - output_csv (str): Path to save the modified CSV file, relative to the base path.
     - column_to_modify (str, optional): The specific column to apply data value mappings to. Default is None.
     """
+    import pandas as pd
+
     # Full paths for files
     csv_file_path = f"{base_path}/{raw_csv}"
     mapping_file_path = f"{base_path}/{mapping_file}"
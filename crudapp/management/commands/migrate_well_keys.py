@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crudapp.well_keys import sample_tables, table_state, add_column, backfill, swap, drop_old, CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    """
+    Convert the well foreign key of the samples from the well name to the well id,
+    see crudapp/well_keys.py for the whole procedure.
+
+    Usage:
+        python manage.py migrate_well_keys --chunk-size 5000 --pause 0.1
+        python manage.py migrate_well_keys --swap
+        python manage.py migrate_well_keys --drop-old
+    """
+    help = 'Move the well foreign key of the samples to the integer id of the well'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Rows updated by each statement of the backfill')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to wait between two chunks, leaves room for the other writers')
+        parser.add_argument('--swap', action='store_true',
+                            help='Replace the name column with the id column, stop the writers first')
+        parser.add_argument('--drop-old', action='store_true',
+                            help='Drop the name columns of the converted tables')
+
+    def progress(self, table, done, last):
+        print(f"{table}: up to id {done} of {last}")
+
+    def handle(self, *args, **kwargs):
+        for table in sample_tables():
+            state = table_state(table)
+            if state == 'missing':
+                continue
+
+            if state == 'converted':
+                if kwargs['drop_old'] and drop_old(table):
+                    print(f"{table}: dropped the well name column")
+                else:
+                    print(f"{table}: already uses the well id")
+                continue
+
+            if add_column(table):
+                print(f"{table}: added the well id column")
+            filled, missing = backfill(table, chunk_size=kwargs['chunk_size'], pause=kwargs['pause'],
+                                       progress=self.progress)
+            print(f"{table}: {filled} rows filled, {missing} rows left")
+
+            if kwargs['swap']:
+                try:
+                    swap(table)
+                except (NotImplementedError, ValueError) as e:
+                    raise CommandError(str(e))
+                print(f"{table}: now uses the well id")
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crudapp.models import Well
+from crudapp.purge import purge_well, CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    """
+    Delete a well with all its samples in chunks, see crudapp/purge.py.
+    Use it instead of the admin or the api for the wells with a lot of samples.
+
+    Usage:
+        python manage.py purge_well "TEST-01"
+        python manage.py purge_well "TEST-01" --keep-well --chunk-size 10000
+    """
+    help = 'Delete a well and its samples in chunks of rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('well_name', type=str, help='Name of the well')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Rows deleted by each statement')
+        parser.add_argument('--keep-well', action='store_true',
+                            help='Only delete the samples of the well')
+
+    def progress(self, model, deleted, total):
+        print(f"{model.__name__}: {deleted}/{total} deleted")
+
+    def handle(self, *args, **kwargs):
+        try:
+            well = Well.objects.get(name=kwargs['well_name'])
+        except Well.DoesNotExist:
+            raise CommandError(f"Well with name {kwargs['well_name']} not found.")
+
+        deleted = purge_well(well, chunk_size=kwargs['chunk_size'], progress=self.progress,
+                             keep_well=kwargs['keep_well'])
+
+        print(f"{sum(deleted.values())} samples deleted")
+        if not kwargs['keep_well']:
+            print(f"Well {kwargs['well_name']} deleted")
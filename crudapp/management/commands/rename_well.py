@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crudapp.models import Well
+from crudapp.rename import rename_well
+
+
+class Command(BaseCommand):
+    """
+    Rename a well and the names of its samples that are built from it, see crudapp/rename.py.
+
+    Usage:
+        python manage.py rename_well "DEL-GT-01" "DEL-GT-01-S1"
+    """
+    help = 'Rename a well and every sample name derived from it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('well_name', type=str, help='Current name of the well')
+        parser.add_argument('new_name', type=str, help='New name of the well')
+
+    def handle(self, *args, **kwargs):
+        try:
+            well = Well.objects.get(name=kwargs['well_name'])
+        except Well.DoesNotExist:
+            raise CommandError(f"Well with name {kwargs['well_name']} not found.")
+
+        try:
+            renamed = rename_well(well, kwargs['new_name'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if not renamed:
+            print(f"Well {well.name} already has that name.")
+        for model_name, count in renamed.items():
+            print(f"{model_name}: {count} samples renamed")
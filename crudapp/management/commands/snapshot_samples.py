@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crudapp.snapshot import snapshot, SNAPSHOT_MODELS
+
+
+class Command(BaseCommand):
+    """
+    Write the samples to a Parquet dataset partitioned by well, see crudapp/snapshot.py.
+
+    Every run appends the samples registered since the previous run as a new version,
+    --full rewrites the whole dataset. The runs only append new samples, the edits and
+    the deletes of samples already in the snapshot need a --full run. Needs the analytics extra: pip install .[analytics]
+
+    Usage:
+        python manage.py snapshot_samples /data/snapshot
+        python manage.py snapshot_samples /data/snapshot --full --table core
+    """
+    help = 'Snapshot the samples to a Parquet dataset for offline analytics'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', type=str, help='Directory of the dataset')
+        parser.add_argument('--full', action='store_true', help='Rewrite the dataset instead of appending')
+        parser.add_argument('--table', action='append', choices=list(SNAPSHOT_MODELS),
+                            help='Only snapshot this table, can be repeated')
+
+    def handle(self, *args, **kwargs):
+        try:
+            added = snapshot(kwargs['output_dir'], full=kwargs['full'], tables=kwargs['table'])
+        except ImportError as e:
+            raise CommandError(str(e))
+
+        for name, rows in added.items():
+            print(f"{name}: {rows} rows added")
@@ -2,6 +2,8 @@ from django.urls import reverse
 from django.contrib.auth.middleware import AuthenticationMiddleware
 from django.http import HttpResponseRedirect
 
+from crudapp.api import API_PREFIX
+
 
 
 class CustomAuthenticationMiddleware(AuthenticationMiddleware):
@@ -9,6 +11,10 @@ class CustomAuthenticationMiddleware(AuthenticationMiddleware):
         # This is required as a base case otherwise the middleware would loop infinitely
         if request.path == reverse('login') or request.path == reverse('logout'):
             return None
+
+        # The api answers with a 401 itself, machines can not follow a redirect to the login form
+        if request.path.startswith(API_PREFIX):
+            return None
         
         if request.method == 'GET' and not request.user.is_authenticated:
             return HttpResponseRedirect(reverse('login'))
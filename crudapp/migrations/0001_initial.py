@@ -0,0 +1,156 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:21
+
+import crudapp.models
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('firstName', models.CharField(blank=True, max_length=255, null=True, verbose_name='First name')),
+                ('lastName', models.CharField(blank=True, max_length=255, null=True, verbose_name='Last name')),
+                ('email', models.EmailField(max_length=254)),
+                ('phone', models.CharField(blank=True, max_length=20, null=True)),
+                ('address', models.TextField(blank=True, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('createdAt', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Well',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Well',
+                'verbose_name_plural': 'Wells',
+            },
+        ),
+        migrations.CreateModel(
+            name='MicroCore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('registration_date', models.DateTimeField(auto_now_add=True, help_text='The time when the core was registered in the database')),
+                ('collection_date', models.DateTimeField(default=django.utils.timezone.now, help_text='The date when the core was collected')),
+                ('remarks', models.CharField(help_text='The remarks of the section of a meter sample', max_length=255)),
+                ('drilling_mud', models.CharField(blank=True, choices=[('Water-based mud', 'Water-based mud'), ('Oil-based mud', 'Oil-based mud')], help_text='The drilling mud used for the perforation of the core', max_length=17, null=True)),
+                ('lithology', models.CharField(blank=True, help_text='The lithology of the core', max_length=255, null=True)),
+                ('micro_core_number', models.IntegerField(help_text='The predefined name of the micro core')),
+                ('micro_core_name', models.CharField(help_text='The name of the micro core that is generated based on well_name', max_length=255, unique=True)),
+                ('drilling_method', models.CharField(blank=True, choices=[('Rotary', 'Rotary'), ('Motor', 'Motor'), ('Both', 'Both')], help_text='The method used for drilling', max_length=100, null=True)),
+                ('drilling_bit', models.CharField(blank=True, help_text='The bit used for drilling', max_length=255, null=True)),
+                ('registered_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('well', models.ForeignKey(help_text='The name of the well', on_delete=django.db.models.deletion.CASCADE, related_name='corechips_well', to='crudapp.well', to_field='name')),
+            ],
+            options={
+                'verbose_name': 'Micro Core',
+                'verbose_name_plural': 'Micro Cores',
+            },
+        ),
+        migrations.CreateModel(
+            name='Cuttings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('registration_date', models.DateTimeField(auto_now_add=True, help_text='The time when the core was registered in the database')),
+                ('collection_date', models.DateTimeField(default=django.utils.timezone.now, help_text='The date when the core was collected', null=True)),
+                ('remarks', models.CharField(help_text='The remarks of the section of a meter sample', max_length=255)),
+                ('drilling_mud', models.CharField(blank=True, choices=[('Water-based mud', 'Water-based mud'), ('Oil-based mud', 'Oil-based mud')], help_text='The drilling mud used for the perforation of the core', max_length=17, null=True)),
+                ('lithology', models.CharField(blank=True, help_text='The lithology of the core', max_length=255, null=True)),
+                ('sample_weight', crudapp.models.PositiveFloatField(blank=True, help_text='The weight of the sample in kilograms', null=True)),
+                ('cuttings_number', models.IntegerField(help_text='The predefined name of the cuttings')),
+                ('cuttings_name', models.CharField(help_text='The name of the cuttings', max_length=255, unique=True)),
+                ('cuttings_depth', crudapp.models.PositiveFloatField(help_text='The depth of the cuttings in meters')),
+                ('sample_state', models.CharField(choices=[('Wet washed', 'Wet washed'), ('Wet unwashed', 'Wet unwashed'), ('Dry washed', 'Dry washed')], help_text='The state of the sample', max_length=100)),
+                ('collection_method', models.CharField(blank=True, choices=[('Drilling', 'Drilling'), ('Coring', 'Coring'), ('Rathole', 'Rathole'), ('Flushing', 'Flushing')], help_text='The method used for collecting the cuttings', max_length=8, null=True)),
+                ('drilling_method', models.CharField(blank=True, choices=[('Rotary', 'Rotary'), ('Motor', 'Motor'), ('Both', 'Both')], help_text='The method used for drilling', max_length=100, null=True)),
+                ('dried_sample', models.BooleanField(blank=True, help_text='Whether the sample was dried or not', null=True)),
+                ('dried_by', models.CharField(blank=True, help_text='The user who dried the sample', max_length=255, null=True)),
+                ('dried_date', models.DateTimeField(blank=True, help_text='The date when the sample was dried', null=True)),
+                ('registered_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('well', models.ForeignKey(help_text='The id of the well', on_delete=django.db.models.deletion.CASCADE, related_name='cuttings_well', to='crudapp.well', to_field='name')),
+            ],
+            options={
+                'verbose_name': 'Cuttings',
+                'verbose_name_plural': 'Cuttings',
+            },
+        ),
+        migrations.CreateModel(
+            name='CoreChip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('registration_date', models.DateTimeField(auto_now_add=True, help_text='The time when the core was registered in the database')),
+                ('collection_date', models.DateTimeField(default=django.utils.timezone.now, help_text='The date when the core was collected', null=True)),
+                ('remarks', models.CharField(help_text='The remarks of the section of a meter sample', max_length=255)),
+                ('drilling_mud', models.CharField(blank=True, choices=[('Water-based mud', 'Water-based mud'), ('Oil-based mud', 'Oil-based mud')], help_text='The drilling mud used for the perforation of the core', max_length=17, null=True)),
+                ('lithology', models.CharField(blank=True, help_text='The lithology of the core', max_length=255, null=True)),
+                ('sample_weight', crudapp.models.PositiveFloatField(blank=True, help_text='The weight of the sample in kilograms', null=True)),
+                ('core_section_name', models.CharField(help_text='The name of the section based on the well name, the core number and the core section number. See that CC has a sequential relationship with the core number and core section number', max_length=255)),
+                ('corechip_number', models.CharField(help_text='The predefined name of the core chip', max_length=255, unique=True)),
+                ('from_top_bottom', models.CharField(choices=[('Top', 'Top'), ('Bottom', 'Bottom')], help_text='Whether the core chip was taken from the top or the bottom of the core', max_length=6)),
+                ('corechip_name', models.CharField(help_text='The name of the core chip that is generated based on well_name, core_number, core_section_number, core_chip_number and from_top_bottom', max_length=255, unique=True)),
+                ('corechip_depth', crudapp.models.PositiveFloatField(help_text='The depth of the core chip in meters')),
+                ('formation', models.CharField(blank=True, help_text='The formation of the core chip', max_length=255, null=True)),
+                ('top_depth', crudapp.models.PositiveFloatField(help_text='The top depth of the section of a meter sample', null=True)),
+                ('registered_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('well', models.ForeignKey(help_text='The name of the well', on_delete=django.db.models.deletion.CASCADE, related_name='corechips', to='crudapp.well', to_field='name')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Core',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('registration_date', models.DateTimeField(auto_now_add=True, help_text='The time when the core was registered in the database')),
+                ('collection_date', models.DateTimeField(default=django.utils.timezone.now, help_text='The date when the core was collected', null=True)),
+                ('remarks', models.CharField(help_text='The remarks of the section of a meter sample', max_length=255)),
+                ('drilling_mud', models.CharField(blank=True, choices=[('Water-based mud', 'Water-based mud'), ('Oil-based mud', 'Oil-based mud')], help_text='The drilling mud used for the perforation of the core', max_length=17, null=True)),
+                ('lithology', models.CharField(blank=True, help_text='The lithology of the core', max_length=255, null=True)),
+                ('sample_weight', crudapp.models.PositiveFloatField(blank=True, help_text='The weight of the sample in kilograms', null=True)),
+                ('core_number', models.CharField(choices=[('C1', 'C1'), ('C2', 'C2'), ('C3', 'C3'), ('C4', 'C4'), ('C5', 'C5'), ('C6', 'C6'), ('C7', 'C7'), ('C8', 'C8'), ('C9', 'C9')], help_text='The predefined name of the core from C1 to C9', max_length=2)),
+                ('planned_core_number', models.CharField(choices=[('C1', 'C1'), ('C2', 'C2'), ('C3', 'C3'), ('C4', 'C4'), ('C5', 'C5'), ('C6', 'C6'), ('C7', 'C7'), ('C8', 'C8'), ('C9', 'C9')], help_text='The predefined name of the core from C1 to C9', max_length=2)),
+                ('core_section_number', models.PositiveIntegerField(help_text='The counter for all 1 meter sections of the core', validators=[django.core.validators.MinValueValidator(1)])),
+                ('core_section_name', models.CharField(help_text='The name of the section based on the well name, the core number and the core section number. See that CC has a sequential relationship with the core number and core section number', max_length=255, unique=True)),
+                ('core_type', models.CharField(choices=[('Core', 'Core'), ('Core catcher', 'Core catcher')], default='', help_text='The type of the core', max_length=12)),
+                ('top_depth', crudapp.models.PositiveFloatField(help_text='The top depth of the section of a meter sample')),
+                ('bottom_depth', crudapp.models.PositiveFloatField(blank=True, help_text='The bottom depth of the section of a meter sample', null=True)),
+                ('core_section_length', crudapp.models.PositiveFloatField(blank=True, help_text='The length of the section of a meter sample', null=True)),
+                ('core_recovery', crudapp.models.PositiveFloatField(blank=True, help_text='The recovery of the material in the core liner', null=True)),
+                ('core_diameter', crudapp.models.PositiveFloatField(blank=True, help_text='The diameter of the core in inches', null=True)),
+                ('coring_method', models.CharField(blank=True, choices=[('Motor', 'Motor'), ('Rotary', 'Rotary'), ('Both', 'Both')], help_text='The method used for coring', max_length=6, null=True)),
+                ('coreliner', models.CharField(blank=True, help_text='The material used for the core liner', max_length=255, null=True)),
+                ('formation', models.CharField(blank=True, help_text='The geological formation where the core was extracted from', max_length=255, null=True)),
+                ('core_status', models.CharField(blank=True, choices=[('Preserved', 'Preserved'), ('Opened', 'Opened')], help_text='The status of the core', max_length=9, null=True)),
+                ('preservation', models.CharField(blank=True, choices=[('Refrigerated at 4 degrees Celsius', 'Refrigerated at 4 degrees Celsius'), ('Core rack at room temperature', 'Core rack at room temperature')], help_text='The preservation method used for the core', max_length=35, null=True)),
+                ('core_weight', crudapp.models.PositiveFloatField(blank=True, help_text='The weight of the core in kilograms', null=True)),
+                ('ct_scanned', models.BooleanField(blank=True, help_text='Whether the core was CT scanned or not', null=True)),
+                ('macroct_scanned', models.BooleanField(blank=True, help_text='Whether the core was CT scanned or not', null=True)),
+                ('gamma_ray', models.BooleanField(blank=True, help_text='Whether the core was gamma ray scanned or not', null=True)),
+                ('radiation', crudapp.models.PositiveFloatField(blank=True, help_text='The radiation of the core in Bq units', null=True)),
+                ('registered_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('well', models.ForeignKey(help_text='The name of the well', on_delete=django.db.models.deletion.CASCADE, related_name='cores', to='crudapp.well', to_field='name')),
+            ],
+            options={
+                'verbose_name': 'Core',
+                'verbose_name_plural': 'Cores',
+                'db_table': 'core',
+                'indexes': [models.Index(fields=['core_number', 'core_section_number'], name='core_core_nu_805f2e_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,296 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:21
+
+import crudapp.models
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    # The containers used to make their own migrations when they started, the databases created that
+    # way already have these tables: migrate --fake-initial records them without creating them again
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('crudapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='well',
+            name='closed',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='well',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='well',
+            name='modified_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='well',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='MicroCoreArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('registration_date', models.DateTimeField(auto_now_add=True, help_text='The time when the core was registered in the database')),
+                ('collection_date', models.DateTimeField(default=django.utils.timezone.now, help_text='The date when the core was collected')),
+                ('remarks', models.CharField(help_text='The remarks of the section of a meter sample', max_length=255)),
+                ('drilling_mud', models.CharField(blank=True, choices=[('Water-based mud', 'Water-based mud'), ('Oil-based mud', 'Oil-based mud')], help_text='The drilling mud used for the perforation of the core', max_length=17, null=True)),
+                ('lithology', models.CharField(blank=True, help_text='The lithology of the core', max_length=255, null=True)),
+                ('micro_core_number', models.IntegerField(help_text='The predefined name of the micro core')),
+                ('micro_core_name', models.CharField(help_text='The name of the micro core that is generated based on well_name', max_length=255, unique=True)),
+                ('drilling_method', models.CharField(blank=True, choices=[('Rotary', 'Rotary'), ('Motor', 'Motor'), ('Both', 'Both')], help_text='The method used for drilling', max_length=100, null=True)),
+                ('drilling_bit', models.CharField(blank=True, help_text='The bit used for drilling', max_length=255, null=True)),
+                ('registered_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('well', models.ForeignKey(help_text='The name of the well', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='crudapp.well', to_field='name')),
+            ],
+            options={
+                'verbose_name': 'Archived Micro Core',
+                'verbose_name_plural': 'Archived Micro Cores',
+                'db_table': 'crudapp_microcore_archive',
+            },
+        ),
+        migrations.CreateModel(
+            name='MeasurementCurve',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('gamma_ray', 'Gamma ray'), ('density', 'Density'), ('magnetic_susceptibility', 'Magnetic susceptibility'), ('p_wave_velocity', 'P-wave velocity'), ('resistivity', 'Resistivity')], max_length=30)),
+                ('unit', models.CharField(blank=True, max_length=20)),
+                ('data', models.FileField(help_text='The .npy file with the (depth, value) pairs sorted by depth', upload_to='curves/')),
+                ('points', models.PositiveIntegerField(default=0)),
+                ('top_depth', models.FloatField(blank=True, null=True)),
+                ('bottom_depth', models.FloatField(blank=True, null=True)),
+                ('min_value', models.FloatField(blank=True, null=True)),
+                ('max_value', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('core', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='curves', to='crudapp.core')),
+                ('well', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='curves', to='crudapp.well')),
+            ],
+            options={
+                'verbose_name': 'Measurement curve',
+                'verbose_name_plural': 'Measurement curves',
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('csv_file', models.FileField(help_text='The csv file with the samples', upload_to='imports/')),
+                ('mapping_file', models.FileField(blank=True, help_text='Optional YAML file with the column_mappings and ignore_columns of the csv file', null=True, upload_to='imports/')),
+                ('model_name', models.CharField(help_text='The model into which the rows are imported', max_length=20)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=7)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('rows_total', models.PositiveIntegerField(default=0)),
+                ('rows_processed', models.PositiveIntegerField(default=0)),
+                ('rows_imported', models.PositiveIntegerField(default=0)),
+                ('rows_failed', models.PositiveIntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Import job',
+                'verbose_name_plural': 'Import jobs',
+            },
+        ),
+        migrations.CreateModel(
+            name='DepthCorrection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('factor', models.FloatField(default=1.0, help_text='Multiplies the depths before the shift, 0.3048 converts feet to metres')),
+                ('shifts', models.JSONField(blank=True, default=list)),
+                ('previous', models.JSONField(default=dict, editable=False)),
+                ('samples', models.PositiveIntegerField(default=0, help_text='The number of samples corrected')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('undone_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('well', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='depth_corrections', to='crudapp.well')),
+            ],
+            options={
+                'verbose_name': 'Depth correction',
+                'verbose_name_plural': 'Depth corrections',
+            },
+        ),
+        migrations.CreateModel(
+            name='CuttingsArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('registration_date', models.DateTimeField(auto_now_add=True, help_text='The time when the core was registered in the database')),
+                ('collection_date', models.DateTimeField(default=django.utils.timezone.now, help_text='The date when the core was collected', null=True)),
+                ('remarks', models.CharField(help_text='The remarks of the section of a meter sample', max_length=255)),
+                ('drilling_mud', models.CharField(blank=True, choices=[('Water-based mud', 'Water-based mud'), ('Oil-based mud', 'Oil-based mud')], help_text='The drilling mud used for the perforation of the core', max_length=17, null=True)),
+                ('lithology', models.CharField(blank=True, help_text='The lithology of the core', max_length=255, null=True)),
+                ('sample_weight', crudapp.models.PositiveFloatField(blank=True, help_text='The weight of the sample in kilograms', null=True)),
+                ('cuttings_number', models.IntegerField(help_text='The predefined name of the cuttings')),
+                ('cuttings_name', models.CharField(help_text='The name of the cuttings', max_length=255, unique=True)),
+                ('cuttings_depth', crudapp.models.PositiveFloatField(help_text='The depth of the cuttings in meters')),
+                ('sample_state', models.CharField(choices=[('Wet washed', 'Wet washed'), ('Wet unwashed', 'Wet unwashed'), ('Dry washed', 'Dry washed')], help_text='The state of the sample', max_length=100)),
+                ('collection_method', models.CharField(blank=True, choices=[('Drilling', 'Drilling'), ('Coring', 'Coring'), ('Rathole', 'Rathole'), ('Flushing', 'Flushing')], help_text='The method used for collecting the cuttings', max_length=8, null=True)),
+                ('drilling_method', models.CharField(blank=True, choices=[('Rotary', 'Rotary'), ('Motor', 'Motor'), ('Both', 'Both')], help_text='The method used for drilling', max_length=100, null=True)),
+                ('dried_sample', models.BooleanField(blank=True, help_text='Whether the sample was dried or not', null=True)),
+                ('dried_by', models.CharField(blank=True, help_text='The user who dried the sample', max_length=255, null=True)),
+                ('dried_date', models.DateTimeField(blank=True, help_text='The date when the sample was dried', null=True)),
+                ('registered_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('well', models.ForeignKey(help_text='The id of the well', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='crudapp.well', to_field='name')),
+            ],
+            options={
+                'verbose_name': 'Archived Cuttings',
+                'verbose_name_plural': 'Archived Cuttings',
+                'db_table': 'crudapp_cuttings_archive',
+            },
+        ),
+        migrations.CreateModel(
+            name='CtVolume',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('ct', 'CT'), ('macroct', 'Macro CT')], default='ct', max_length=10)),
+                ('directory', models.CharField(help_text='The folder of the volume, relative to CT_VOLUME_ROOT', max_length=255)),
+                ('source', models.CharField(blank=True, help_text='Where the stack was imported from', max_length=500)),
+                ('slices', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('width', models.PositiveIntegerField()),
+                ('dtype', models.CharField(max_length=10)),
+                ('tile_size', models.PositiveIntegerField()),
+                ('thumbnail_factor', models.PositiveIntegerField(default=1)),
+                ('voxel_size', models.FloatField(blank=True, help_text='The size of a voxel in millimetres', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('core', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='ct_volumes', to='crudapp.core')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('well', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ct_volumes', to='crudapp.well')),
+            ],
+            options={
+                'verbose_name': 'CT volume',
+                'verbose_name_plural': 'CT volumes',
+            },
+        ),
+        migrations.CreateModel(
+            name='CoreChipArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('registration_date', models.DateTimeField(auto_now_add=True, help_text='The time when the core was registered in the database')),
+                ('collection_date', models.DateTimeField(default=django.utils.timezone.now, help_text='The date when the core was collected', null=True)),
+                ('remarks', models.CharField(help_text='The remarks of the section of a meter sample', max_length=255)),
+                ('drilling_mud', models.CharField(blank=True, choices=[('Water-based mud', 'Water-based mud'), ('Oil-based mud', 'Oil-based mud')], help_text='The drilling mud used for the perforation of the core', max_length=17, null=True)),
+                ('lithology', models.CharField(blank=True, help_text='The lithology of the core', max_length=255, null=True)),
+                ('sample_weight', crudapp.models.PositiveFloatField(blank=True, help_text='The weight of the sample in kilograms', null=True)),
+                ('core_section_name', models.CharField(help_text='The name of the section based on the well name, the core number and the core section number. See that CC has a sequential relationship with the core number and core section number', max_length=255)),
+                ('corechip_number', models.CharField(help_text='The predefined name of the core chip', max_length=255, unique=True)),
+                ('from_top_bottom', models.CharField(choices=[('Top', 'Top'), ('Bottom', 'Bottom')], help_text='Whether the core chip was taken from the top or the bottom of the core', max_length=6)),
+                ('corechip_name', models.CharField(help_text='The name of the core chip that is generated based on well_name, core_number, core_section_number, core_chip_number and from_top_bottom', max_length=255, unique=True)),
+                ('corechip_depth', crudapp.models.PositiveFloatField(help_text='The depth of the core chip in meters')),
+                ('formation', models.CharField(blank=True, help_text='The formation of the core chip', max_length=255, null=True)),
+                ('top_depth', crudapp.models.PositiveFloatField(help_text='The top depth of the section of a meter sample', null=True)),
+                ('registered_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('well', models.ForeignKey(help_text='The name of the well', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='crudapp.well', to_field='name')),
+            ],
+            options={
+                'verbose_name': 'Archived core chip',
+                'verbose_name_plural': 'Archived core chips',
+                'db_table': 'crudapp_corechip_archive',
+            },
+        ),
+        migrations.CreateModel(
+            name='CoreArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('registration_date', models.DateTimeField(auto_now_add=True, help_text='The time when the core was registered in the database')),
+                ('collection_date', models.DateTimeField(default=django.utils.timezone.now, help_text='The date when the core was collected', null=True)),
+                ('remarks', models.CharField(help_text='The remarks of the section of a meter sample', max_length=255)),
+                ('drilling_mud', models.CharField(blank=True, choices=[('Water-based mud', 'Water-based mud'), ('Oil-based mud', 'Oil-based mud')], help_text='The drilling mud used for the perforation of the core', max_length=17, null=True)),
+                ('lithology', models.CharField(blank=True, help_text='The lithology of the core', max_length=255, null=True)),
+                ('sample_weight', crudapp.models.PositiveFloatField(blank=True, help_text='The weight of the sample in kilograms', null=True)),
+                ('core_number', models.CharField(choices=[('C1', 'C1'), ('C2', 'C2'), ('C3', 'C3'), ('C4', 'C4'), ('C5', 'C5'), ('C6', 'C6'), ('C7', 'C7'), ('C8', 'C8'), ('C9', 'C9')], help_text='The predefined name of the core from C1 to C9', max_length=2)),
+                ('planned_core_number', models.CharField(choices=[('C1', 'C1'), ('C2', 'C2'), ('C3', 'C3'), ('C4', 'C4'), ('C5', 'C5'), ('C6', 'C6'), ('C7', 'C7'), ('C8', 'C8'), ('C9', 'C9')], help_text='The predefined name of the core from C1 to C9', max_length=2)),
+                ('core_section_number', models.PositiveIntegerField(help_text='The counter for all 1 meter sections of the core', validators=[django.core.validators.MinValueValidator(1)])),
+                ('core_section_name', models.CharField(help_text='The name of the section based on the well name, the core number and the core section number. See that CC has a sequential relationship with the core number and core section number', max_length=255, unique=True)),
+                ('core_type', models.CharField(choices=[('Core', 'Core'), ('Core catcher', 'Core catcher')], default='', help_text='The type of the core', max_length=12)),
+                ('top_depth', crudapp.models.PositiveFloatField(help_text='The top depth of the section of a meter sample')),
+                ('bottom_depth', crudapp.models.PositiveFloatField(blank=True, help_text='The bottom depth of the section of a meter sample', null=True)),
+                ('core_section_length', crudapp.models.PositiveFloatField(blank=True, help_text='The length of the section of a meter sample', null=True)),
+                ('core_recovery', crudapp.models.PositiveFloatField(blank=True, help_text='The recovery of the material in the core liner', null=True)),
+                ('core_diameter', crudapp.models.PositiveFloatField(blank=True, help_text='The diameter of the core in inches', null=True)),
+                ('coring_method', models.CharField(blank=True, choices=[('Motor', 'Motor'), ('Rotary', 'Rotary'), ('Both', 'Both')], help_text='The method used for coring', max_length=6, null=True)),
+                ('coreliner', models.CharField(blank=True, help_text='The material used for the core liner', max_length=255, null=True)),
+                ('formation', models.CharField(blank=True, help_text='The geological formation where the core was extracted from', max_length=255, null=True)),
+                ('core_status', models.CharField(blank=True, choices=[('Preserved', 'Preserved'), ('Opened', 'Opened')], help_text='The status of the core', max_length=9, null=True)),
+                ('preservation', models.CharField(blank=True, choices=[('Refrigerated at 4 degrees Celsius', 'Refrigerated at 4 degrees Celsius'), ('Core rack at room temperature', 'Core rack at room temperature')], help_text='The preservation method used for the core', max_length=35, null=True)),
+                ('core_weight', crudapp.models.PositiveFloatField(blank=True, help_text='The weight of the core in kilograms', null=True)),
+                ('ct_scanned', models.BooleanField(blank=True, help_text='Whether the core was CT scanned or not', null=True)),
+                ('macroct_scanned', models.BooleanField(blank=True, help_text='Whether the core was CT scanned or not', null=True)),
+                ('gamma_ray', models.BooleanField(blank=True, help_text='Whether the core was gamma ray scanned or not', null=True)),
+                ('radiation', crudapp.models.PositiveFloatField(blank=True, help_text='The radiation of the core in Bq units', null=True)),
+                ('registered_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('well', models.ForeignKey(help_text='The name of the well', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='crudapp.well', to_field='name')),
+            ],
+            options={
+                'verbose_name': 'Archived Core',
+                'verbose_name_plural': 'Archived Cores',
+                'db_table': 'core_archive',
+            },
+        ),
+        migrations.CreateModel(
+            name='AuditEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_id', models.CharField(max_length=32, unique=True)),
+                ('model', models.CharField(help_text='The app label and name of the model', max_length=100)),
+                ('object_pk', models.CharField(max_length=255)),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')], max_length=6)),
+                ('changes', models.JSONField(default=dict)),
+                ('timestamp', models.DateTimeField(db_index=True)),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Audit entry',
+                'verbose_name_plural': 'Audit entries',
+            },
+        ),
+        migrations.CreateModel(
+            name='Photo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sample_model', models.CharField(choices=[('Core', 'Core'), ('CoreChip', 'Core chip'), ('MicroCore', 'Micro core')], max_length=20)),
+                ('sample_id', models.BigIntegerField()),
+                ('sha256', models.CharField(help_text='The sha256 of the original file, its name in PHOTO_ROOT', max_length=64)),
+                ('extension', models.CharField(max_length=10)),
+                ('filename', models.CharField(help_text='The name of the file that was imported', max_length=255)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('size', models.PositiveBigIntegerField(help_text='The size of the original file in bytes')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('well', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='photos', to='crudapp.well')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sample_model', 'sample_id'], name='crudapp_pho_sample__29032a_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='photo',
+            constraint=models.UniqueConstraint(fields=('sample_model', 'sample_id', 'sha256'), name='unique_photo_per_sample'),
+        ),
+        migrations.AddIndex(
+            model_name='measurementcurve',
+            index=models.Index(fields=['well', 'kind', 'top_depth'], name='crudapp_mea_well_id_97a82b_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='measurementcurve',
+            constraint=models.UniqueConstraint(fields=('core', 'kind'), name='unique_curve_kind_per_core'),
+        ),
+        migrations.AddIndex(
+            model_name='auditentry',
+            index=models.Index(fields=['model', 'object_pk'], name='crudapp_aud_model_261c69_idx'),
+        ),
+    ]
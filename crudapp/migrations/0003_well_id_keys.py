@@ -0,0 +1,98 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:21
+
+from django.db import migrations, models
+from django.db.migrations.operations.base import Operation
+import django.db.models.deletion
+
+# The samples point to Well.id instead of Well.name
+WELL_KEYS = [
+    migrations.AlterField(
+        model_name='core',
+        name='well',
+        field=models.ForeignKey(help_text='The name of the well', on_delete=django.db.models.deletion.CASCADE, related_name='cores', to='crudapp.well'),
+    ),
+    migrations.AlterField(
+        model_name='corearchive',
+        name='well',
+        field=models.ForeignKey(help_text='The name of the well', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='crudapp.well'),
+    ),
+    migrations.AlterField(
+        model_name='corechip',
+        name='well',
+        field=models.ForeignKey(help_text='The name of the well', on_delete=django.db.models.deletion.CASCADE, related_name='corechips', to='crudapp.well'),
+    ),
+    migrations.AlterField(
+        model_name='corechiparchive',
+        name='well',
+        field=models.ForeignKey(help_text='The name of the well', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='crudapp.well'),
+    ),
+    migrations.AlterField(
+        model_name='cuttings',
+        name='well',
+        field=models.ForeignKey(help_text='The id of the well', on_delete=django.db.models.deletion.CASCADE, related_name='cuttings_well', to='crudapp.well'),
+    ),
+    migrations.AlterField(
+        model_name='cuttingsarchive',
+        name='well',
+        field=models.ForeignKey(help_text='The id of the well', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='crudapp.well'),
+    ),
+    migrations.AlterField(
+        model_name='microcore',
+        name='well',
+        field=models.ForeignKey(help_text='The name of the well', on_delete=django.db.models.deletion.CASCADE, related_name='corechips_well', to='crudapp.well'),
+    ),
+    migrations.AlterField(
+        model_name='microcorearchive',
+        name='well',
+        field=models.ForeignKey(help_text='The name of the well', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='crudapp.well'),
+    ),
+]
+
+
+class ConvertWellKeys(Operation):
+    ''' The database side of WELL_KEYS. The tables with rows are converted online by
+    `manage.py migrate_well_keys` (see crudapp/well_keys.py), its --swap leaves them with the
+    same well_id column as these fields: they are left alone. The tables that still hold the
+    names are only converted here when they are empty, a new database or a new archive table.
+    '''
+    reversible = False
+
+    def __init__(self, operations):
+        self.operations = operations
+
+    def state_forwards(self, app_label, state):
+        for operation in self.operations:
+            operation.state_forwards(app_label, state)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        connection = schema_editor.connection
+        for operation in self.operations:
+            model = from_state.apps.get_model(app_label, operation.model_name)
+            table = model._meta.db_table
+            with connection.cursor() as cursor:
+                well_id = next(column for column in connection.introspection.get_table_description(cursor, table)
+                               if column.name == 'well_id')
+                if connection.introspection.get_field_type(well_id.type_code, well_id) != 'CharField':
+                    continue
+                cursor.execute(f'SELECT 1 FROM {connection.ops.quote_name(table)} LIMIT 1')
+                if cursor.fetchone() is not None:
+                    raise RuntimeError(f'{table} still points to the wells by name, convert it first with '
+                                       f'python manage.py migrate_well_keys --swap, see crudapp/well_keys.py')
+            operation.database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def describe(self):
+        return 'Point the samples that are not converted yet to the id of the well'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crudapp', '0002_archive_jobs_audit_and_measurements'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=WELL_KEYS,
+            database_operations=[ConvertWellKeys(WELL_KEYS)],
+        ),
+    ]
@@ -37,6 +37,15 @@ class Well(models.Model):
     # id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=255, unique=True)
 
+    # Incremented on every write to the well or to any of its samples, the pages of a well
+    # use it to answer conditional requests and as the key of their cached fragments
+    version = models.PositiveIntegerField(default=0, editable=False)
+    modified_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    # The samples of a closed well are moved to the archive tables, see crudapp/archive.py
+    closed = models.BooleanField(default=False, editable=False)
+    closed_at = models.DateTimeField(null=True, blank=True, editable=False)
+
     class Meta:
         verbose_name = "Well"
         verbose_name_plural = "Wells"
@@ -110,19 +119,19 @@ class CoreBase(RockinBase):
     def save(self, *args, **kwargs):
         if not self.pk:
             # If this is a new instance of the model, generate the core name based on the related well name
-            well_name = self.well.name
-            core_number = self.core_number
-            core_section_number = Core.objects.filter(
-                well=self.well).count() + 1
-            self.core_section_name = f"{well_name}-{core_number}-{core_section_number}"
+            # The number given is kept while its name is free, otherwise the section comes after the run
+            name = f"{self.well.name}-{self.core_number}-{self.core_section_number}"
+            if not self.core_section_number or any(table.objects.filter(core_section_name=name).exists()
+                                                   for table in (Core, ARCHIVE_MODELS[Core])):
+                self.core_section_number = next_core_section_number(self.well, self.core_number)
+            self.core_section_name = f"{self.well.name}-{self.core_number}-{self.core_section_number}"
         super().save(*args, **kwargs)
 
 
 class Core(CoreBase):
     # id = models.AutoField(primary_key=True, help_text="The id of the core")
     well = models.ForeignKey(Well, on_delete=models.CASCADE,
-                             help_text="The name of the well", related_name='cores',
-                             to_field='name')
+                             help_text="The name of the well", related_name='cores')
 
     CORE_TYPE_CHOICES = [
         ('Core', 'Core'),
@@ -222,8 +231,7 @@ class Core(CoreBase):
 
 class CoreChip(RockinBase):
     well = models.ForeignKey(Well, on_delete=models.CASCADE,
-                             help_text="The name of the well", related_name='corechips',
-                             to_field='name')
+                             help_text="The name of the well", related_name='corechips')
     core_section_name = models.CharField(
         max_length=255, 
         unique=False,
@@ -260,8 +268,7 @@ class CoreChip(RockinBase):
 class Cuttings(RockinBase):
     # id = models.AutoField(primary_key=True, help_text="The id of the core")
     well = models.ForeignKey(Well, on_delete=models.CASCADE,
-                             help_text="The id of the well", related_name='cuttings_well',
-                             to_field='name')
+                             help_text="The id of the well", related_name='cuttings_well')
     cuttings_number = models.IntegerField(
         help_text="The predefined name of the cuttings")
     cuttings_name = models.CharField(
@@ -292,8 +299,7 @@ class Cuttings(RockinBase):
 
 class MicroCore(models.Model):
     well = models.ForeignKey(Well, on_delete=models.CASCADE,
-                help_text="The name of the well", related_name='corechips_well',
-                to_field='name')
+                help_text="The name of the well", related_name='corechips_well')
 
     registration_date = models.DateTimeField(
         help_text="The time when the core was registered in the database",
@@ -329,3 +335,272 @@ class MicroCore(models.Model):
     class Meta:
         verbose_name = "Micro Core"
         verbose_name_plural = "Micro Cores"
+
+
+def archive_model(model):
+    ''' A copy of a sample model with its own table, it keeps the samples of the closed wells
+    so that the tables the forms insert into only have the samples of the active wells
+    '''
+    attrs = {'__module__': model.__module__}
+    # Same columns in the same order, the reads union both tables
+    for field in model._meta.concrete_fields:
+        if field.is_relation:
+            attrs[field.name] = models.ForeignKey(
+                field.remote_field.model, on_delete=field.remote_field.on_delete, to_field=field.to_fields[0],
+                related_name='+', null=field.null, blank=field.blank, help_text=field.help_text)
+        else:
+            attrs[field.name] = field.clone()
+
+    attrs['Meta'] = type('Meta', (), {
+        'db_table': f'{model._meta.db_table}_archive',
+        'verbose_name': f'Archived {model._meta.verbose_name}',
+        'verbose_name_plural': f'Archived {model._meta.verbose_name_plural}',
+    })
+    return type(f'{model.__name__}Archive', (models.Model,), attrs)
+
+
+CoreArchive = archive_model(Core)
+CoreChipArchive = archive_model(CoreChip)
+CuttingsArchive = archive_model(Cuttings)
+MicroCoreArchive = archive_model(MicroCore)
+
+ARCHIVE_MODELS = {
+    Core: CoreArchive,
+    CoreChip: CoreChipArchive,
+    Cuttings: CuttingsArchive,
+    MicroCore: MicroCoreArchive,
+}
+
+
+
+def next_core_section_number(well, core_number):
+    ''' The number of the next section of a core run of a well: one more than the largest
+    number of the run, the sections of a well that was closed and opened again may still be archived.
+    well is a Well or its name.
+    '''
+    well_filter = {'well__name': well} if isinstance(well, str) else {'well': well}
+    numbers = [table.objects.filter(core_number=core_number, **well_filter)
+               .aggregate(models.Max('core_section_number'))['core_section_number__max']
+               for table in (Core, ARCHIVE_MODELS[Core])]
+    return max([number for number in numbers if number is not None], default=0) + 1
+
+
+class ImportJob(models.Model):
+    ''' A csv file uploaded through the web app, the import runs in the worker
+    process (see crudapp/jobs.py) and writes its progress here
+    '''
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    csv_file = models.FileField(upload_to='imports/', help_text="The csv file with the samples")
+    mapping_file = models.FileField(
+        upload_to='imports/', null=True, blank=True,
+        help_text="Optional YAML file with the column_mappings and ignore_columns of the csv file")
+    model_name = models.CharField(max_length=20, help_text="The model into which the rows are imported")
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default='queued')
+
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    rows_total = models.PositiveIntegerField(default=0)
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_imported = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    # The first errors as {"row": <line number>, "field": ..., "msg": ...}, see jobs.MAX_STORED_ERRORS
+    errors = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        verbose_name = "Import job"
+        verbose_name_plural = "Import jobs"
+
+    def rows_per_second(self):
+        if self.started_at is None or not self.rows_processed:
+            return 0.0
+        end = self.finished_at or timezone.now()
+        elapsed = (end - self.started_at).total_seconds()
+        return round(self.rows_processed / elapsed, 1) if elapsed > 0 else 0.0
+
+    def progress(self):
+        return {
+            'id': self.pk,
+            'status': self.status,
+            'model': self.model_name,
+            'rows_total': self.rows_total,
+            'rows_processed': self.rows_processed,
+            'rows_imported': self.rows_imported,
+            'rows_per_second': self.rows_per_second(),
+            'rows_failed': self.rows_failed,
+            'errors': self.errors,
+        }
+
+
+class AuditEntry(models.Model):
+    ''' Who changed which object and when, the entries are written in batches
+    by the audit log (see crudapp/audit.py)
+    '''
+    ACTION_CHOICES = [
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+    # Generated when the change is captured, it keeps a replayed spool from inserting an entry twice
+    entry_id = models.CharField(max_length=32, unique=True)
+    model = models.CharField(max_length=100, help_text="The app label and name of the model")
+    object_pk = models.CharField(max_length=255)
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES)
+    # {"<field>": [<old value>, <new value>]}
+    changes = models.JSONField(default=dict)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False)
+    timestamp = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Audit entry"
+        verbose_name_plural = "Audit entries"
+        indexes = [
+            models.Index(fields=['model', 'object_pk']),
+        ]
+
+    def __str__(self):
+        return f"{self.timestamp} {self.user_id} {self.action} {self.model} {self.object_pk}"
+
+
+class DepthCorrection(models.Model):
+    ''' A correction of the depths of the samples of a well: a unit conversion followed
+    by a piecewise linear shift. It keeps the depths from before so that it can be undone,
+    see crudapp/depths.py
+    '''
+    well = models.ForeignKey(Well, on_delete=models.CASCADE, related_name='depth_corrections')
+    factor = models.FloatField(
+        default=1.0, help_text="Multiplies the depths before the shift, 0.3048 converts feet to metres")
+    # [[<depth>, <shift>], ...] sorted by depth, the shift is interpolated in between
+    shifts = models.JSONField(default=list, blank=True)
+    # {"<model>": {"id": [...], "<depth or length field>": [<value before the correction>, ...]}},
+    # the curves also keep their files: {"MeasurementCurve": {"id": [...], "data": [<file>, ...], ...}}
+    previous = models.JSONField(default=dict, editable=False)
+    samples = models.PositiveIntegerField(default=0, help_text="The number of samples corrected")
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    undone_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Depth correction"
+        verbose_name_plural = "Depth corrections"
+
+    def __str__(self):
+        return f"{self.well} x{self.factor} {self.shifts} ({self.samples} samples)"
+
+
+class MeasurementCurve(models.Model):
+    ''' A continuous measurement along a core section, e.g. the core gamma or the density
+    logged every centimetre. The points are not rows of the database, they are stored as a
+    numpy array of (depth, value) pairs in a .npy file, see crudapp/curves.py
+    '''
+    KIND_CHOICES = [
+        ('gamma_ray', 'Gamma ray'),
+        ('density', 'Density'),
+        ('magnetic_susceptibility', 'Magnetic susceptibility'),
+        ('p_wave_velocity', 'P-wave velocity'),
+        ('resistivity', 'Resistivity'),
+    ]
+    well = models.ForeignKey(Well, on_delete=models.CASCADE, related_name='curves')
+    # The sections move to the archive table with their id, the curve follows them by id
+    core = models.ForeignKey(Core, on_delete=models.DO_NOTHING, db_constraint=False, related_name='curves')
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    unit = models.CharField(max_length=20, blank=True)
+    data = models.FileField(upload_to='curves/', help_text="The .npy file with the (depth, value) pairs sorted by depth")
+
+    points = models.PositiveIntegerField(default=0)
+    # The extent of the curve, the depth windows only open the files of the curves they overlap
+    top_depth = models.FloatField(null=True, blank=True)
+    bottom_depth = models.FloatField(null=True, blank=True)
+    min_value = models.FloatField(null=True, blank=True)
+    max_value = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Measurement curve"
+        verbose_name_plural = "Measurement curves"
+        constraints = [
+            models.UniqueConstraint(fields=['core', 'kind'], name='unique_curve_kind_per_core'),
+        ]
+        indexes = [
+            models.Index(fields=['well', 'kind', 'top_depth']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} of core {self.core_id} ({self.points} points)"
+
+
+class CtVolume(models.Model):
+    ''' A CT scan of a core section, the voxels are stored in a tiled .npy file that is
+    memory mapped to serve the tiles of the slices, see crudapp/ct.py
+    '''
+    KIND_CHOICES = [
+        ('ct', 'CT'),
+        ('macroct', 'Macro CT'),
+    ]
+    well = models.ForeignKey(Well, on_delete=models.CASCADE, related_name='ct_volumes')
+    # The sections move to the archive table with their id, the volume follows them by id
+    core = models.ForeignKey(Core, on_delete=models.DO_NOTHING, db_constraint=False, related_name='ct_volumes')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='ct')
+    directory = models.CharField(max_length=255, help_text="The folder of the volume, relative to CT_VOLUME_ROOT")
+    source = models.CharField(max_length=500, blank=True, help_text="Where the stack was imported from")
+
+    slices = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    width = models.PositiveIntegerField()
+    dtype = models.CharField(max_length=10)
+    tile_size = models.PositiveIntegerField()
+    thumbnail_factor = models.PositiveIntegerField(default=1)
+    voxel_size = models.FloatField(null=True, blank=True, help_text="The size of a voxel in millimetres")
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "CT volume"
+        verbose_name_plural = "CT volumes"
+
+    def __str__(self):
+        return f"{self.kind} of core {self.core_id} ({self.slices}x{self.height}x{self.width})"
+
+
+class Photo(models.Model):
+    ''' A photo of a sample. The files are stored under their sha256, a photo imported twice
+    is stored once, see crudapp/photos.py
+    '''
+    MODEL_CHOICES = [
+        ('Core', 'Core'),
+        ('CoreChip', 'Core chip'),
+        ('MicroCore', 'Micro core'),
+    ]
+    well = models.ForeignKey(Well, on_delete=models.CASCADE, related_name='photos')
+    # The samples move to the archive tables with their id, the photo follows them by id
+    sample_model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    sample_id = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64, help_text="The sha256 of the original file, its name in PHOTO_ROOT")
+    extension = models.CharField(max_length=10)
+    filename = models.CharField(max_length=255, help_text="The name of the file that was imported")
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    size = models.PositiveBigIntegerField(help_text="The size of the original file in bytes")
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sample_model', 'sample_id', 'sha256'], name='unique_photo_per_sample'),
+        ]
+        indexes = [
+            models.Index(fields=['sample_model', 'sample_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} of {self.sample_model} {self.sample_id}"
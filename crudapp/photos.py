@@ -0,0 +1,221 @@
+''' Photos of the samples, imported from folders and served as small derivatives.
+
+The photos of the core boxes are tens of megabytes each, a page with the sections of
+a core would load hundreds of megabytes. Every photo is imported once with two
+derivatives, a thumbnail and a web sized copy, and the pages only show those.
+
+The files are content addressed, they are named after the sha256 of the original:
+
+    PHOTO_ROOT/original/ab/cd/abcd....jpg
+    PHOTO_ROOT/web/ab/cd/abcd....jpg
+    PHOTO_ROOT/thumbnail/ab/cd/abcd....jpg
+
+A photo imported twice is stored once, and a file never changes once it is written, so
+nginx serves PHOTO_ROOT at PHOTO_URL with a cache of a year (see nginx.conf).
+
+`import_folder` matches the files to the samples by name: DEL-GT-01-C3-1.jpg and
+DEL-GT-01-C3-1_wet.jpg are photos of the core section DEL-GT-01-C3-1. The images are
+hashed and resized in a process pool, the workers only write files, the rows are
+created by the main process at the end.
+
+Example:
+>>> import_folder('/mnt/photos/DEL-GT-01/', workers=4)
+{'imported': 120, 'duplicates': 3, 'not_matched': ['scale_bar.jpg'], 'errors': []}
+>>> photo_url(photo, 'thumbnail')
+'/photos/thumbnail/9f/86/9f86d08....jpg'
+'''
+import hashlib
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+
+from .archive import with_archive
+from .models import Core, CoreChip, MicroCore, Photo, Well
+from .signals import bump_well_version
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff')
+# The longest side of the derivatives in pixels
+SIZES = {
+    'thumbnail': 320,
+    'web': 1600,
+}
+JPEG_QUALITY = 82
+# The models with photos and the field with the names the files are matched with
+PHOTO_MODELS = {
+    'Core': (Core, 'core_section_name'),
+    'CoreChip': (CoreChip, 'corechip_name'),
+    'MicroCore': (MicroCore, 'micro_core_name'),
+}
+# What can follow the name of the sample in the name of a file, "<name>_wet.jpg", "<name> (2).jpg"
+SEPARATORS = '_ .('
+
+
+def photo_path(sha256, kind, extension='.jpg', root=None):
+    return os.path.join(root or settings.PHOTO_ROOT, kind, sha256[:2], sha256[2:4], sha256 + extension)
+
+
+def photo_url(photo, kind='thumbnail'):
+    extension = photo.extension if kind == 'original' else '.jpg'
+    return f'{settings.PHOTO_URL}{kind}/{photo.sha256[:2]}/{photo.sha256[2:4]}/{photo.sha256}{extension}'
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path, write):
+    # Written next to the final file and renamed, a reader never sees half a file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+    os.close(handle)
+    try:
+        write(temporary)
+        # mkstemp makes the file readable by its owner only, nginx serves the photos
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def process_photo(path, root):
+    ''' Store a photo and its derivatives, runs in the workers of the pool.
+    Returns what the Photo row needs, the derivatives that exist already are not made again.
+    '''
+    from PIL import Image
+
+    sha256 = file_sha256(path)
+    extension = os.path.splitext(path)[1].lower()
+    original = photo_path(sha256, 'original', extension, root)
+    if not os.path.exists(original):
+        _write_atomic(original, lambda temporary: shutil.copyfile(path, temporary))
+
+    missing = {kind: size for kind, size in SIZES.items() if not os.path.exists(photo_path(sha256, kind, root=root))}
+    with Image.open(original) as image:
+        width, height = image.size
+        if missing:
+            # draft lets the jpeg decoder skip the pixels that the largest derivative does not need,
+            # it only works once per opened image so the smaller derivatives are made from the larger ones
+            largest = max(missing.values())
+            image.draft('RGB', (largest, largest))
+            derivative = image.convert('RGB')
+            for kind, size in sorted(missing.items(), key=lambda item: -item[1]):
+                derivative.thumbnail((size, size))
+                _write_atomic(photo_path(sha256, kind, root=root), lambda temporary: derivative.save(
+                    temporary, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True))
+    return {'sha256': sha256, 'extension': extension, 'width': width, 'height': height,
+            'size': os.path.getsize(path)}
+
+
+def sample_names(names):
+    ''' {name: (model name, sample id, well id)} of the samples, hot and archived, with one of the names
+    '''
+    samples = {}
+    for model_name, (model, field) in PHOTO_MODELS.items():
+        for pk, well_id, name in with_archive(model, **{f'{field}__in': names}).values_list('pk', 'well', field):
+            samples.setdefault(name, (model_name, pk, well_id))
+    return samples
+
+
+def candidate_names(filename):
+    ''' The names of samples a file can be a photo of, the longest first
+    '''
+    stem = os.path.splitext(filename)[0]
+    return [stem] + [stem[:index] for index in range(len(stem) - 1, 0, -1)
+                     if stem[index] in SEPARATORS and stem[index - 1] not in SEPARATORS]
+
+
+def match_files(filenames):
+    ''' {filename: (model name, sample id, well id)} of the files whose name starts with the name of a sample
+    '''
+    candidates = {filename: candidate_names(filename) for filename in filenames}
+    samples = sample_names(sorted({name for names in candidates.values() for name in names}))
+    matches = {}
+    for filename, names in candidates.items():
+        for name in names:
+            if name in samples:
+                matches[filename] = samples[name]
+                break
+    return matches
+
+
+def import_folder(folder, workers=None, user=None):
+    ''' Import the photos of a folder, returns what happened to the files
+    '''
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        raise ValueError('Pillow is needed to import photos, install rockin[imaging]')
+    if not os.path.isdir(folder):
+        raise ValueError(f'{folder} is not a folder')
+
+    filenames = sorted(name for name in os.listdir(folder) if name.lower().endswith(IMAGE_EXTENSIONS))
+    matches = match_files(filenames)
+    report = {'imported': 0, 'duplicates': 0, 'not_matched': [name for name in filenames if name not in matches],
+              'errors': []}
+    if not matches:
+        return report
+
+    paths = [os.path.join(folder, filename) for filename in matches]
+    results = {}
+    if workers == 1:
+        for filename, path in zip(matches, paths):
+            results[filename] = _safe_process(path, settings.PHOTO_ROOT)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for filename, result in zip(matches, pool.map(
+                    _safe_process, paths, [settings.PHOTO_ROOT] * len(paths), chunksize=4)):
+                results[filename] = result
+
+    photos = []
+    for filename, result in results.items():
+        if 'error' in result:
+            report['errors'].append({'file': filename, 'msg': result['error']})
+            continue
+        model_name, sample_id, well_id = matches[filename]
+        photos.append(Photo(well_id=well_id, sample_model=model_name, sample_id=sample_id,
+                            filename=filename, created_by=user, **result))
+
+    with transaction.atomic():
+        existing = set(Photo.objects.filter(sha256__in=[photo.sha256 for photo in photos])
+                       .values_list('sample_model', 'sample_id', 'sha256'))
+        new = []
+        for photo in photos:
+            key = (photo.sample_model, photo.sample_id, photo.sha256)
+            # The same file can be in the folder twice, under two names
+            if key not in existing:
+                existing.add(key)
+                new.append(photo)
+        Photo.objects.bulk_create(new, ignore_conflicts=True)
+    report['imported'] = len(new)
+    report['duplicates'] = len(photos) - len(new)
+
+    # The pages of the wells are cached by their version
+    for well_id in {photo.well_id for photo in new}:
+        bump_well_version(Well, well_id)
+    return report
+
+
+def _safe_process(path, root):
+    # An unreadable file must not stop the other ones
+    try:
+        return process_photo(path, root)
+    except Exception as e:
+        return {'error': f'{type(e).__name__}: {e}'}
+
+
+def sample_photos(model_name, sample_ids):
+    ''' {sample id: [photos]} of samples of a model
+    '''
+    photos = {}
+    for photo in Photo.objects.filter(sample_model=model_name, sample_id__in=sample_ids).order_by('filename'):
+        photos.setdefault(photo.sample_id, []).append(photo)
+    return photos
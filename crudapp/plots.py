@@ -0,0 +1,139 @@
+''' The data of the depth plots of a well, downsampled on the server.
+
+A plot of a well is a strip of tracks along the depth: the cored intervals, the core
+chips, the cuttings and the measurement curves. A 3000 m well has thousands of samples
+and millions of curve points, far more than the few hundred pixels of the plot on a field
+laptop. `depth_tracks` reduces every track to the height of the plot in pixels:
+
+- the cored intervals become the runs of pixels that are covered by a section,
+- the core chips and the cuttings become one marker per pixel with the number of samples,
+- the curves are decimated with min/max buckets or LTTB, see crudapp/curves.py.
+
+The tracks are cached per version of the well and per window of the plot (top, bottom,
+height), every write to the samples or the curves of the well bumps its version.
+
+Example:
+>>> depth_tracks(well, top=1500, bottom=1600, height=800)
+{'top': 1500.0, 'bottom': 1600.0, 'height': 800, 'cores': [[1500.0, 1512.25], ...],
+ 'corechips': [[1501.125, 1], ...], 'cuttings': [...], 'curves': {'gamma_ray': {'depth': [...], 'value': [...]}}}
+'''
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from . import curves
+from .models import Core, CoreChip, Cuttings, MeasurementCurve, ARCHIVE_MODELS
+
+MAX_HEIGHT = 5000
+# The depth of the markers of the samples, the cores are drawn from their top to their bottom depth
+MARKER_DEPTHS = {
+    'corechips': (CoreChip, 'corechip_depth'),
+    'cuttings': (Cuttings, 'cuttings_depth'),
+}
+
+
+def read_column(model, well, *fields):
+    ''' The values of the fields of the samples of the well in the hot and in the archive table,
+    as a numpy array with one column per field, the missing values are nan
+    '''
+    rows = []
+    for table_model in (model, ARCHIVE_MODELS[model]):
+        rows.extend(table_model.objects.filter(well=well).values_list(*fields))
+    return np.array(rows, dtype=float).reshape(-1, len(fields))
+
+
+def extent(well):
+    ''' The top and the bottom depth of the samples and the curves of the well, None without depths
+    '''
+    depths = [read_column(Core, well, 'top_depth', 'bottom_depth').ravel()]
+    depths += [read_column(model, well, field).ravel() for model, field in MARKER_DEPTHS.values()]
+    depths.append(np.array(list(MeasurementCurve.objects.filter(well=well, points__gt=0)
+                                .values_list('top_depth', 'bottom_depth')), dtype=float).ravel())
+    depths = np.concatenate(depths)
+    depths = depths[~np.isnan(depths)]
+    if not len(depths):
+        return None
+    return float(depths.min()), float(depths.max())
+
+
+def to_pixels(depths, top, bottom, height):
+    # The row of the plot of every depth, the depths outside of the window are dropped by the callers
+    return np.floor((depths - top) / (bottom - top) * height).astype(np.int64)
+
+
+def pixel_depth(pixels, top, bottom, height):
+    return (top + pixels * (bottom - top) / height).tolist()
+
+
+def interval_track(intervals, top, bottom, height):
+    ''' The runs of pixels covered by at least one interval, as [top depth, bottom depth] pairs.
+    An interval without bottom covers a single pixel.
+    '''
+    tops, bottoms = intervals[:, 0], np.where(np.isnan(intervals[:, 1]), intervals[:, 0], intervals[:, 1])
+    inside = ~np.isnan(tops) & (bottoms >= top) & (tops <= bottom)
+    first = np.clip(to_pixels(tops[inside], top, bottom, height), 0, height - 1)
+    last = np.clip(to_pixels(bottoms[inside], top, bottom, height), 0, height - 1)
+
+    # +1 where an interval starts and -1 after it ends, the pixels with a positive sum are covered
+    coverage = np.zeros(height + 1, dtype=np.int64)
+    np.add.at(coverage, first, 1)
+    np.add.at(coverage, last + 1, -1)
+    covered = np.concatenate([[False], np.cumsum(coverage[:-1]) > 0, [False]])
+    changes = np.flatnonzero(covered[1:] != covered[:-1])
+    starts, ends = changes[::2], changes[1::2]
+    return [list(pair) for pair in zip(pixel_depth(starts, top, bottom, height), pixel_depth(ends, top, bottom, height))]
+
+
+def marker_track(depths, top, bottom, height):
+    ''' One [depth, count] marker per pixel with samples, at the top of the pixel
+    '''
+    depths = depths[(depths >= top) & (depths <= bottom)]
+    pixels, counts = np.unique(np.clip(to_pixels(depths, top, bottom, height), 0, height - 1), return_counts=True)
+    return [list(pair) for pair in zip(pixel_depth(pixels, top, bottom, height), counts.tolist())]
+
+
+def cache_key(well, top, bottom, height, method):
+    return f'depth-tracks-{well.pk}-{well.version}-{top}-{bottom}-{height}-{method}'
+
+
+def depth_tracks(well, top=None, bottom=None, height=800, method='minmax'):
+    ''' The tracks of the plot of a well between two depths, reduced to the height of the plot in pixels.
+    Without top or bottom the plot goes from the first to the last depth of the well.
+    '''
+    if method not in curves.DECIMATIONS:
+        raise ValueError(f"Unknown decimation {method}, use one of {', '.join(curves.DECIMATIONS)}")
+    if not 0 < height <= MAX_HEIGHT:
+        raise ValueError(f'The height must be between 1 and {MAX_HEIGHT} pixels')
+    if top is not None and bottom is not None and top >= bottom:
+        raise ValueError('The top must be above the bottom')
+
+    key = cache_key(well, top, bottom, height, method)
+    tracks = cache.get(key)
+    if tracks is None:
+        tracks = _depth_tracks(well, top, bottom, height, method)
+        cache.set(key, tracks, settings.FRAGMENT_CACHE_TIMEOUT)
+    return tracks
+
+
+def _depth_tracks(well, top, bottom, height, method):
+    if top is None or bottom is None:
+        well_extent = extent(well) or (0.0, 0.0)
+        top = well_extent[0] if top is None else top
+        bottom = well_extent[1] if bottom is None else bottom
+    top, bottom = float(top), float(bottom)
+    tracks = {'top': top, 'bottom': bottom, 'height': height,
+              'cores': [], 'corechips': [], 'cuttings': [], 'curves': {}}
+    if bottom <= top:
+        return tracks
+
+    tracks['cores'] = interval_track(read_column(Core, well, 'top_depth', 'bottom_depth'), top, bottom, height)
+    for name, (model, field) in MARKER_DEPTHS.items():
+        tracks[name] = marker_track(read_column(model, well, field)[:, 0], top, bottom, height)
+
+    kinds = MeasurementCurve.objects.filter(well=well, points__gt=0).values_list('kind', flat=True).distinct()
+    for kind in sorted(kinds):
+        depths, values = curves.well_curve(well, kind, top, bottom, buckets=height, method=method)
+        if len(depths):
+            tracks['curves'][kind] = {'depth': depths.tolist(), 'value': values.tolist()}
+    return tracks
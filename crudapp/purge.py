@@ -0,0 +1,114 @@
+''' Delete a lot of samples without loading them all.
+
+`queryset.delete()` lets the django collector load every object to delete, with their
+related objects, before sending the delete signals one object at a time. For a test
+well with a big import that is hundreds of thousands of objects in memory.
+
+`purge` deletes the rows of a queryset in chunks of primary keys instead, each chunk
+with a single DELETE in its own transaction. The work of the delete signals of the
+app is done once per chunk: the audit entries of the chunk are written with
+record_bulk, the curves, the scans and the photos of the chunk are deleted with
+delete_sample_files and the caches are told with samples_changed. When another receiver
+listens to the deletes of the model, or other rows point to it, the collector is
+still used, but only on one chunk at a time.
+
+Example:
+>>> purge_well(Well.objects.get(name='TEST-01'), progress=print)
+{'Core': 120000, 'CoreArchive': 0, 'CoreChip': 250000, ...}
+'''
+from django.db import transaction
+from django.db.models import deletion
+from django.db.models.signals import pre_delete, post_delete
+
+from .audit import audited_models, record_bulk
+from .models import ARCHIVE_MODELS
+from .sample_files import delete_sample_files
+from .signals import SAMPLE_MODELS, samples_changed
+
+CHUNK_SIZE = 5000
+
+
+def handled_receivers(model):
+    # The delete receivers of the app whose work purge does for the whole chunk
+    return {f'sample_deleted_{model.__name__}', f'audit_deleted_{model.__name__}'}
+
+
+def needs_collector(model):
+    ''' Whether the rows of the model have to go through the django collector:
+    a receiver that purge does not know listens to their deletes, or other rows point to them
+    '''
+    handled = handled_receivers(model)
+    for signal in (pre_delete, post_delete):
+        for entry in signal.receivers:
+            receiver_key, sender_key = entry[0]
+            if sender_key in (id(model), id(None)) and receiver_key not in handled:
+                return True
+    return any(relation.on_delete is not deletion.DO_NOTHING for relation in model._meta.related_objects)
+
+
+def chunks(queryset, chunk_size):
+    ''' Split the queryset in ranges of primary keys of at most chunk_size rows
+    '''
+    start = None
+    while True:
+        rows = queryset if start is None else queryset.filter(pk__gte=start)
+        # The first primary key of the next chunk, found on the index of the primary key
+        end = list(rows.order_by('pk').values_list('pk', flat=True)[chunk_size:chunk_size + 1])
+        if not end:
+            yield rows
+            return
+        yield rows.filter(pk__lt=end[0])
+        start = end[0]
+
+
+def purge(queryset, chunk_size=CHUNK_SIZE, progress=None):
+    ''' Delete the rows of the queryset a chunk at a time, returns the number of rows deleted
+    '''
+    model = queryset.model
+    using = queryset.db
+    fast = not needs_collector(model)
+    audited = model in audited_models()
+    has_well = any(field.name == 'well' for field in model._meta.concrete_fields)
+    # The receiver of the deletes of the hot samples deletes their files, one sample at a time
+    files_by_signal = not fast and model in SAMPLE_MODELS
+
+    total = queryset.count()
+    deleted, well_keys = 0, set()
+    if not total:
+        return deleted
+
+    for chunk in chunks(queryset, chunk_size):
+        with transaction.atomic(using=using):
+            if has_well:
+                well_keys.update(chunk.values_list('well', flat=True).distinct())
+            if not files_by_signal:
+                delete_sample_files(model, chunk.values_list('pk', flat=True), using=using)
+            if not fast:
+                deleted += chunk.delete()[0]
+            else:
+                if audited:
+                    record_bulk(model, list(chunk), 'delete')
+                deleted += chunk._raw_delete(using)
+        if progress is not None:
+            progress(model, deleted, total)
+
+    if fast and has_well:
+        # Without the signals, the caches of the samples have to be told
+        for well_key in well_keys:
+            samples_changed(model, well_key)
+    return deleted
+
+
+def purge_well(well, chunk_size=CHUNK_SIZE, progress=None, keep_well=False):
+    ''' Delete the samples of a well, hot and archived, then the well itself.
+    Returns the number of samples deleted for each model.
+    '''
+    deleted = {}
+    for model, archive in ARCHIVE_MODELS.items():
+        for table_model in (model, archive):
+            deleted[table_model.__name__] = purge(
+                table_model.objects.filter(well=well), chunk_size=chunk_size, progress=progress)
+    if not keep_well:
+        # Nothing points to the well anymore, the collector only checks the empty sample tables
+        well.delete()
+    return deleted
@@ -0,0 +1,131 @@
+''' Rename a well and every sample name derived from it.
+
+The names of the samples start with the name of their well, e.g. the core section
+'DEL-GT-01-C1-3' or the core chip 'DEL-GT-01-C1-3-CC1-top' (see CoreBase.save and
+CoreChipFormView.post). Renaming the well rewrites the prefix of those names with one
+UPDATE per table, hot and archive, in the same transaction as the rename of the well:
+
+    UPDATE crudapp_corechip SET core_section_name = CASE WHEN core_section_name LIKE 'old-%'
+        THEN CONCAT('new-', SUBSTRING(core_section_name, 5)) ELSE core_section_name END, ...
+    WHERE well_id = 12 AND (core_section_name LIKE 'old-%' OR ...)
+
+No row is loaded in python, the result is checked with a single aggregate query that
+compares the number and the total length of the names before and after the update.
+The samples point to the well by its id, their foreign keys do not change.
+
+Example:
+>>> rename_well(Well.objects.get(name='DEL-GT-01'), 'DEL-GT-01-S1')
+{'Core': 130, 'CoreArchive': 0, 'CoreChip': 260, ...}
+'''
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Case, CharField, Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Concat, Length, Substr
+
+from .archive import well_key
+from .models import Well, Core, CoreChip, Cuttings, MicroCore, ARCHIVE_MODELS
+from .signals import samples_changed
+
+# The fields of every sample that start with the name of the well
+DERIVED_NAMES = {
+    Core: ['core_section_name'],
+    CoreChip: ['core_section_name', 'corechip_name'],
+    Cuttings: ['cuttings_name'],
+    MicroCore: ['micro_core_name'],
+}
+
+
+def derived_tables():
+    for model, fields in DERIVED_NAMES.items():
+        for table_model in (model, ARCHIVE_MODELS[model]):
+            yield table_model, fields
+
+
+def _aggregate(model, expression):
+    # The aggregate over the samples of the well as a subquery of the well
+    rows = (model.objects.filter(well=OuterRef('pk')).order_by().values('well')
+            .annotate(value=expression).values('value'))
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def checksum(well, prefix, other=None, using=DEFAULT_DB_ALIAS):
+    ''' For every derived name of the well: the number of names that start with the
+    prefix, their total length and, when `other` is given, the number of names that
+    start with the other prefix but not with this one. A single query.
+    '''
+    annotations = {}
+    for model, fields in derived_tables():
+        for field in fields:
+            key = f'{model.__name__}_{field}'
+            starts = Q(**{f'{field}__startswith': prefix})
+            annotations[f'{key}_count'] = _aggregate(model, Count('pk', filter=starts))
+            annotations[f'{key}_length'] = _aggregate(model, Sum(Length(field), filter=starts))
+            if other is not None:
+                annotations[f'{key}_other'] = _aggregate(
+                    model, Count('pk', filter=Q(**{f'{field}__startswith': other}) & ~starts))
+    return Well.objects.using(using).filter(pk=well.pk).values(**annotations).get()
+
+
+def verify(before, after, difference):
+    ''' Every name that started with the old prefix starts with the new one and changed
+    its length by the difference of the prefixes, the other names did not change
+    '''
+    for key in after:
+        if not key.endswith('_count'):
+            continue
+        name = key[:-len('_count')]
+        expected_count = before[f'{name}_count'] + before[f'{name}_other']
+        # The names that already started with the new prefix keep their length, they are not known here
+        if after[key] != expected_count:
+            raise ValueError(f'{name}: {after[key]} names renamed, expected {expected_count}')
+        if not before[f'{name}_other']:
+            expected_length = before[f'{name}_length'] + before[f'{name}_count'] * difference
+            if after[f'{name}_length'] != expected_length:
+                raise ValueError(f'{name}: the names have a total length of {after[f"{name}_length"]}, expected {expected_length}')
+
+
+def rename_derived_names(model, fields, well, old, new, using=DEFAULT_DB_ALIAS):
+    ''' Replace the old prefix of the names of the samples of a well with a single UPDATE.
+    Returns the number of samples renamed.
+    '''
+    updates, renamed = {}, Q()
+    for field in fields:
+        starts = Q(**{f'{field}__startswith': old})
+        updates[field] = Case(
+            When(starts, then=Concat(Value(new), Substr(F(field), len(old) + 1), output_field=CharField())),
+            default=F(field))
+        renamed |= starts
+    return model.objects.using(using).filter(renamed, well=well).update(**updates)
+
+
+def rename_well(well, new_name, using=DEFAULT_DB_ALIAS):
+    ''' Rename a well and the names of its samples in one transaction.
+    Returns the number of samples renamed in every table.
+    '''
+    new_name = new_name.strip()
+    if not new_name:
+        raise ValueError('The new name of the well is empty')
+
+    renamed = {}
+    with transaction.atomic(using=using):
+        # Nobody can add samples with the old name while they are renamed
+        well = Well.objects.using(using).select_for_update().get(pk=well.pk)
+        if well.name == new_name:
+            return renamed
+        if Well.objects.using(using).filter(name=new_name).exists():
+            raise ValueError(f'A well with name {new_name} already exists')
+
+        old, new = f'{well.name}-', f'{new_name}-'
+        before = checksum(well, old, other=new, using=using)
+        for model, fields in derived_tables():
+            renamed[model.__name__] = rename_derived_names(model, fields, well, old, new, using=using)
+
+        # Saved through the model so that the rename is audited and the version of the well bumped
+        well.name = new_name
+        well.save(using=using, update_fields=['name'])
+
+        verify(before, checksum(well, new, using=using), len(new) - len(old))
+
+    # The updates are set based, the caches of the samples have to be told
+    for model in DERIVED_NAMES:
+        samples_changed(model, well_key(model, well))
+    return renamed
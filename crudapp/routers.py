@@ -0,0 +1,108 @@
+''' Send the reads of the read-only pages to a replica of the database.
+
+The lists, the search, the exports and the reports read a lot of rows and compete
+with the inserts of the rig teams on the primary. The views that only read set
+`replica_reads = True` (see ReplicaReadMixin), the GET requests to those views
+read from the REPLICA_DATABASE, everything else reads from and writes to the primary.
+
+The replica lags behind the primary, so a user that just wrote something reads from
+the primary for REPLICA_PIN_SECONDS afterwards, that way the list that follows a
+form shows the new sample. Inside a request, the reads that come after a write also
+go to the primary.
+
+Without a replica (REPLICA_DATABASE is None) the router does nothing. To try it
+locally, point DB_REPLICA_HOST at a second MySQL server, or use two sqlite files:
+>>> DATABASES = {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'db.sqlite3'},
+>>>              'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'db.sqlite3',
+>>>                          'TEST': {'MIRROR': 'default'}}}
+>>> REPLICA_DATABASE = 'replica'
+'''
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Set on the responses to the requests that wrote something, while it is there the user reads from the primary
+PIN_COOKIE = 'db_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingState:
+    def __init__(self, use_replica=False):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+# The state of the current request, None outside of requests (commands, the import worker, ...)
+_state = contextvars.ContextVar('db_routing', default=None)
+
+
+@contextmanager
+def replica_reads():
+    ''' Read from the replica inside the block, for the commands that export or
+    aggregate a lot of rows
+    '''
+    token = _state.set(RoutingState(use_replica=True))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+class ReplicaReadMixin:
+    ''' The GET requests of the view read from the replica
+    '''
+    replica_reads = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replica or state.wrote or not settings.REPLICA_DATABASE:
+            return None
+        # The sessions and the users are read from the primary, a session that was
+        # just created may not be on the replica yet
+        if model._meta.app_label != 'crudapp':
+            return None
+        return settings.REPLICA_DATABASE
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica has the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == settings.REPLICA_DATABASE:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        if state.wrote:
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        if (request.method in SAFE_METHODS and getattr(view_class, 'replica_reads', False)
+                and PIN_COOKIE not in request.COOKIES):
+            _state.get().use_replica = True
+        return None
@@ -0,0 +1,81 @@
+''' The rows and the files that belong to a sample without a foreign key the database follows.
+
+The measurement curves and the CT volumes point to their core section by id without a
+constraint, and the photos to any sample by its model and id: the samples move to the
+archive tables with their id and these rows follow them. The database does not delete
+them with the sample, `delete_sample_files` does, with one DELETE per table for a set
+of samples, and deletes their files once the transaction is committed.
+
+The photos are stored once per file content, their files are only deleted when no
+other sample has a photo with the same content.
+
+Example:
+>>> delete_sample_files(Core, [12, 13, 14])
+{'MeasurementCurve': 6, 'CtVolume': 1, 'Photo': 9}
+'''
+import os
+import shutil
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Core, CtVolume, MeasurementCurve, Photo, ARCHIVE_MODELS
+
+# The hot model of the archive models, the photos name the hot model
+HOT_MODELS = {archive: model for model, archive in ARCHIVE_MODELS.items()}
+PHOTO_MODELS = [name for name, _ in Photo.MODEL_CHOICES]
+
+
+def delete_sample_files(model, sample_ids, using=DEFAULT_DB_ALIAS):
+    ''' Delete the curves, the CT volumes and the photos of the samples and, after the commit,
+    their files. Returns the number of rows deleted for each model.
+    '''
+    model = HOT_MODELS.get(model, model)
+    deleted = {}
+    if model is not Core and model.__name__ not in PHOTO_MODELS:
+        return deleted
+    sample_ids = list(sample_ids)
+    if not sample_ids:
+        return deleted
+
+    curve_files, directories = [], []
+    if model is Core:
+        curves = MeasurementCurve.objects.using(using).filter(core_id__in=sample_ids)
+        curve_files = [name for name in curves.values_list('data', flat=True) if name]
+        # Not delete(), the collector would send a post_delete per curve
+        deleted['MeasurementCurve'] = curves._raw_delete(using)
+        volumes = CtVolume.objects.using(using).filter(core_id__in=sample_ids)
+        directories = list(volumes.values_list('directory', flat=True))
+        deleted['CtVolume'] = volumes._raw_delete(using)
+
+    photos = Photo.objects.using(using).filter(sample_model=model.__name__, sample_id__in=sample_ids)
+    photo_files = set(photos.values_list('sha256', 'extension'))
+    deleted['Photo'] = photos._raw_delete(using)
+
+    def delete_files():
+        storage = MeasurementCurve._meta.get_field('data').storage
+        for name in curve_files:
+            storage.delete(name)
+        for directory in directories:
+            if directory:
+                shutil.rmtree(os.path.join(settings.CT_VOLUME_ROOT, directory), ignore_errors=True)
+        delete_photo_files(photo_files, using)
+
+    transaction.on_commit(delete_files, using=using)
+    return deleted
+
+
+def delete_photo_files(photo_files, using=DEFAULT_DB_ALIAS):
+    ''' Delete the files of the (sha256, extension) photos that no sample has anymore
+    '''
+    from .photos import SIZES, photo_path
+
+    kept = set(Photo.objects.using(using).filter(sha256__in={sha256 for sha256, _ in photo_files})
+               .values_list('sha256', flat=True))
+    for sha256, extension in photo_files:
+        if sha256 in kept:
+            continue
+        paths = [photo_path(sha256, 'original', extension)] + [photo_path(sha256, kind) for kind in SIZES]
+        for path in paths:
+            if os.path.exists(path):
+                os.unlink(path)
@@ -0,0 +1,103 @@
+''' Helpers shared by the forms, the api and the importers that write samples.
+They only depend on the models, the forms can use them without importing the api.
+
+MySQL does not return the ids of the rows of a bulk insert, bulk_create leaves the pk of
+the instances empty. Every model that is created in bulk has a unique name, the ids are
+read back by those names so that the audit log and the responses get the real ids.
+
+Example:
+>>> sections = bulk_create(Core, sections)
+>>> [section.pk for section in sections]
+[1041, 1042, 1043]
+'''
+from django.db import connections, router
+
+from .models import Well, Core, CoreChip, Cuttings, MicroCore
+
+# The models that the csv files can be imported into
+IMPORT_MODELS = {
+    'Core': Core,
+    'CoreChip': CoreChip,
+    'Cuttings': Cuttings,
+    'MicroCore': MicroCore,
+}
+
+# The unique field of the models that are created in bulk
+NAME_FIELDS = {
+    Well: 'name',
+    Core: 'core_section_name',
+    CoreChip: 'corechip_name',
+    Cuttings: 'cuttings_name',
+    MicroCore: 'micro_core_name',
+}
+
+
+def bulk_create(model, instances, batch_size=None):
+    ''' bulk_create that sets the pk of the created instances on every database
+    '''
+    created = model.objects.bulk_create(instances, batch_size=batch_size)
+    using = router.db_for_write(model)
+    if not connections[using].features.can_return_rows_from_bulk_insert:
+        fill_pks(model, created, using)
+    return created
+
+
+def fill_pks(model, instances, using=None):
+    ''' Set the pk of the instances that do not have one from the row with the same name
+    '''
+    field = NAME_FIELDS[model]
+    missing = [instance for instance in instances if instance.pk is None]
+    if not missing:
+        return
+    # Read from the database that was written, not from a replica that may lag behind
+    pks = dict(model.objects.using(using or router.db_for_write(model))
+               .filter(**{f'{field}__in': [getattr(instance, field) for instance in missing]})
+               .values_list(field, 'pk'))
+    for instance in missing:
+        instance.pk = pks.get(getattr(instance, field))
+
+
+def validation_errors(error, index=None):
+    ''' Convert a pydantic ValidationError into a list of json friendly errors
+    '''
+    errors = []
+    for item in error.errors():
+        entry = {'field': item['loc'][0] if item['loc'] else None, 'msg': item['msg']}
+        if index is not None:
+            entry['index'] = index
+        errors.append(entry)
+    return errors
+
+
+def get_columns(model):
+    ''' The columns to select for each field of a model, the well is exposed by
+    its name as it is done in the forms and the importers, other relations by their id
+    '''
+    columns = {}
+    for field in model._meta.concrete_fields:
+        if field.name == 'well':
+            columns[field.name] = 'well__name'
+        else:
+            columns[field.name] = field.attname
+    return columns
+
+
+def add_derived_names(model, payload):
+    ''' Add the core section name to a new core when the client did not send it,
+    it is the same name that CoreFormView proposes to the users
+    '''
+    if model is Core and not payload.get('core_section_name'):
+        payload['core_section_name'] = f"{payload.get('well')}-{payload.get('core_number')}-{payload.get('core_section_number')}"
+    return payload
+
+
+def closed_well_message(well):
+    return f'The well {well.name} is closed, its samples are archived and can not be changed.'
+
+
+def closed_wells(well_ids):
+    ''' Lock the wells that samples are written to and return the ids of the closed ones.
+    A well can not be closed, and its samples moved to the archive, until the transaction ends.
+    '''
+    return {pk for pk, closed in Well.objects.select_for_update().filter(pk__in=well_ids)
+            .values_list('pk', 'closed') if closed}
@@ -0,0 +1,216 @@
+''' Search over the names, remarks, lithology and formation of all the samples.
+
+On MySQL the search uses the FULLTEXT indexes on the free text fields and the
+indexes on the sample names for prefix matches, the indexes are created after
+every migrate by `ensure_search_indexes`.
+Other databases (SQLite in the tests) use an in-process trigram index instead.
+
+Example:
+>>> search('TestWell-C3-12')
+[{'type': 'corechip', 'id': 12, 'name': 'TestWell-C3-12-4-Top', 'well': 'TestWell'}, ...]
+>>> search('sandstone', sample_type='core')
+'''
+import re
+import threading
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, connections, router
+
+from .models import Core, CoreChip, Cuttings, MicroCore, ARCHIVE_MODELS
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 200
+
+# Length of the indexed prefix of the name columns, enough to tell samples apart
+NAME_PREFIX_LENGTH = 32
+
+# The sample type, the field with the name of the sample and the free text fields
+SEARCH_TARGETS = {
+    'core': (Core, 'core_section_name', ['remarks', 'lithology', 'formation']),
+    'corechip': (CoreChip, 'corechip_name', ['remarks', 'lithology', 'formation']),
+    'cuttings': (Cuttings, 'cuttings_name', ['remarks', 'lithology']),
+    'microcore': (MicroCore, 'micro_core_name', ['remarks', 'lithology']),
+}
+
+# Name columns that are not unique, the unique ones already have an index that serves prefix matches
+PREFIX_INDEXES = [
+    (CoreChip, 'core_section_name'),
+    (ARCHIVE_MODELS[CoreChip], 'core_section_name'),
+]
+
+
+def tables(model):
+    # The samples of the closed wells are in the archive table, see crudapp/archive.py
+    return [model, ARCHIVE_MODELS[model]]
+
+
+def _index_exists(cursor, table, index_name):
+    cursor.execute(
+        'SELECT 1 FROM information_schema.statistics '
+        'WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1',
+        [table, index_name])
+    return cursor.fetchone() is not None
+
+
+def ensure_search_indexes(using='default', **kwargs):
+    ''' Create the FULLTEXT and the prefix indexes that django can not declare
+    in the models. It runs after every migrate and does nothing if they exist.
+    '''
+    connection = connections[using]
+    if connection.vendor != 'mysql':
+        return
+
+    with connection.cursor() as cursor:
+        for model, name_field, text_fields in SEARCH_TARGETS.values():
+            for table_model in tables(model):
+                table = table_model._meta.db_table
+                index_name = f'{table}_search_ft'
+                if not _index_exists(cursor, table, index_name):
+                    columns = ', '.join(connection.ops.quote_name(field) for field in text_fields)
+                    cursor.execute(f'CREATE FULLTEXT INDEX {index_name} ON {table} ({columns})')
+
+        for model, field in PREFIX_INDEXES:
+            table = model._meta.db_table
+            index_name = f'{table}_{field}_prefix'
+            if not _index_exists(cursor, table, index_name):
+                column = connection.ops.quote_name(field)
+                cursor.execute(
+                    f'CREATE INDEX {index_name} ON {table} ({column}({NAME_PREFIX_LENGTH}))')
+
+
+def trigrams(text):
+    ''' The trigrams of every word of a text, words are padded like in postgres pg_trgm
+    so that short words and the beginning of words also match
+    '''
+    grams = set()
+    for word in re.findall(r'\w+', (text or '').lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    ''' Inverted index from trigrams to the samples that contain them, it is built
+    from the database the first time it is used and it is thrown away when a sample changes
+    '''
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.postings = None
+        self.documents = None
+
+    def invalidate(self, **kwargs):
+        with self.lock:
+            self.postings = None
+            self.documents = None
+
+    def build(self):
+        postings = defaultdict(set)
+        documents = {}
+        for sample_type, (model, name_field, text_fields) in SEARCH_TARGETS.items():
+            for table_model in tables(model):
+                # From the primary, the index lives until the next write and the replica may lag behind
+                rows = table_model.objects.using(DEFAULT_DB_ALIAS).values_list(
+                    'pk', name_field, 'well__name', *text_fields)
+                for pk, name, well, *texts in rows.iterator():
+                    # Archived samples keep their id so the key does not change
+                    key = (sample_type, pk)
+                    documents[key] = (name, well)
+                    for gram in trigrams(' '.join([name or ''] + [text or '' for text in texts])):
+                        postings[gram].add(key)
+        return postings, documents
+
+    def search(self, query, sample_type=None, limit=DEFAULT_LIMIT):
+        with self.lock:
+            if self.postings is None:
+                self.postings, self.documents = self.build()
+            postings, documents = self.postings, self.documents
+
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        scores = defaultdict(int)
+        for gram in query_grams:
+            for key in postings.get(gram, ()):
+                if sample_type is None or key[0] == sample_type:
+                    scores[key] += 1
+
+        # Like pg_trgm similarity, at least half of the trigrams of the query have to match
+        threshold = len(query_grams) / 2
+        prefix = query.lower()
+        ranked = sorted(
+            (key for key, score in scores.items() if score >= threshold),
+            key=lambda key: (not documents[key][0].lower().startswith(prefix), -scores[key], key))
+        return [_result(key[0], key[1], *documents[key]) for key in ranked[:limit]]
+
+
+trigram_index = TrigramIndex()
+
+
+def _result(sample_type, pk, name, well):
+    return {'type': sample_type, 'id': pk, 'name': name, 'well': well}
+
+
+def _boolean_query(query):
+    # Every word is required and matches as a prefix, for example "sand" finds "sandstone"
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'+{word}*' for word in words)
+
+
+def _mysql_search(model, sample_type, name_field, text_fields, query, limit):
+    ''' Prefix matches on the name first, then full text matches on the free text fields,
+    both are answered by an index so the cost does not depend on the size of the table.
+
+    The prefix match is istartswith: MySQL runs startswith as LIKE BINARY, which the index
+    on a case insensitive column can not serve. EXPLAIN of the query must show a range scan on
+    the index of the name (type range, key the name index), not a full scan of the table.
+    '''
+    results = []
+    seen = set()
+    names = model.objects.filter(**{f'{name_field}__istartswith': query}).order_by(name_field)
+    for pk, name, well in names.values_list('pk', name_field, 'well__name')[:limit]:
+        seen.add(pk)
+        results.append(_result(sample_type, pk, name, well))
+
+    boolean_query = _boolean_query(query)
+    if boolean_query and len(results) < limit:
+        table = model._meta.db_table
+        columns = ', '.join(f'{table}.{field}' for field in text_fields)
+        texts = model.objects.extra(
+            where=[f'MATCH ({columns}) AGAINST (%s IN BOOLEAN MODE)'], params=[boolean_query])
+        for pk, name, well in texts.values_list('pk', name_field, 'well__name')[:limit]:
+            if pk not in seen:
+                results.append(_result(sample_type, pk, name, well))
+    return results[:limit]
+
+
+def search(query, sample_type=None, limit=DEFAULT_LIMIT):
+    ''' Search samples by the beginning of their name or by words in their
+    remarks, lithology and formation.
+
+    Args:
+        query (str): the text typed by the user
+        sample_type (str): one of the keys of SEARCH_TARGETS to search only one type of sample
+        limit (int): the maximum number of results
+
+    Returns:
+        list of dict: the type, id, name and well of every sample found
+    '''
+    query = (query or '').strip()
+    if not query:
+        return []
+    limit = min(limit, MAX_LIMIT)
+
+    if sample_type is not None and sample_type not in SEARCH_TARGETS:
+        raise ValueError(f'Unknown sample type {sample_type}')
+
+    using = router.db_for_read(Core)
+    if connections[using].vendor != 'mysql':
+        return trigram_index.search(query, sample_type=sample_type, limit=limit)
+
+    results = []
+    for target_type, (model, name_field, text_fields) in SEARCH_TARGETS.items():
+        if sample_type is None or sample_type == target_type:
+            for table_model in tables(model):
+                results.extend(_mysql_search(table_model, target_type, name_field, text_fields, query, limit))
+    return results[:limit]
@@ -0,0 +1,78 @@
+''' Keep the derived data of the app up to date when samples are written.
+
+Saves and deletes of single objects arrive through the django signals, the bulk
+operations (bulk_create, QuerySet.update, ...) do not send signals so they have
+to call `samples_changed` themselves.
+'''
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+
+from .models import Well, Core, CoreChip, Cuttings, MicroCore, MeasurementCurve
+from .search import trigram_index
+from .autocomplete import name_index
+from .sample_files import delete_sample_files
+
+SAMPLE_MODELS = [Core, CoreChip, Cuttings, MicroCore]
+
+
+def samples_changed(model, well_key=None, instances=None):
+    ''' Called after any write to the samples of a well, well_key is the value that
+    the samples store in their well foreign key.
+    The bulk operations do not pass the instances, then the name index of every process is
+    rebuilt on its next use.
+    '''
+    if well_key is not None:
+        bump_well_version(model, well_key)
+    trigram_index.invalidate()
+    if instances is None:
+        name_index.changed()
+
+
+def bump_well_version(model, well_key):
+    ''' Increment the version of the well, it is a single row update so it is cheap
+    compared with the write to the samples that triggers it
+    '''
+    if model is Well:
+        lookup = {'pk': well_key}
+    else:
+        # The lookup follows the foreign key definition of the samples
+        lookup = {model._meta.get_field('well').target_field.attname: well_key}
+    Well.objects.filter(**lookup).update(version=F('version') + 1, modified_at=timezone.now())
+
+
+def sample_saved(sender, instance, **kwargs):
+    name_index.update(instance, kwargs['using'])
+    samples_changed(sender, instance.well_id, instances=[instance])
+
+
+def sample_deleted(sender, instance, **kwargs):
+    name_index.remove(instance, kwargs['using'])
+    # The curves, the scans and the photos point to the sample without a foreign key
+    delete_sample_files(sender, [instance.pk], using=kwargs['using'])
+    samples_changed(sender, instance.well_id, instances=[instance])
+
+
+def well_saved(sender, instance, **kwargs):
+    name_index.update(instance, kwargs['using'])
+    bump_well_version(Well, instance.pk)
+
+
+def well_deleted(sender, instance, **kwargs):
+    name_index.remove(instance, kwargs['using'])
+
+
+def curve_deleted(sender, instance, **kwargs):
+    # The files are not deleted with the rows by django, here and not in curves.py that needs numpy
+    if instance.data:
+        instance.data.storage.delete(instance.data.name)
+    bump_well_version(Well, instance.well_id)
+
+
+def connect_signals():
+    post_save.connect(well_saved, sender=Well, dispatch_uid='well_saved')
+    post_delete.connect(well_deleted, sender=Well, dispatch_uid='well_deleted')
+    post_delete.connect(curve_deleted, sender=MeasurementCurve, dispatch_uid='curve_deleted')
+    for model in SAMPLE_MODELS:
+        post_save.connect(sample_saved, sender=model, dispatch_uid=f'sample_saved_{model.__name__}')
+        post_delete.connect(sample_deleted, sender=model, dispatch_uid=f'sample_deleted_{model.__name__}')
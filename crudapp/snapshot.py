@@ -0,0 +1,224 @@
+''' Columnar snapshot of the samples for offline analytics.
+
+The geologists analyse the samples in notebooks, instead of querying the production
+database they read a Parquet dataset that `python manage.py snapshot_samples` writes:
+
+    <output>/manifest.json
+    <output>/core/well=<well name>/part-00001-hot.parquet
+    <output>/core/well=<well name>/part-00002-archive.parquet
+    <output>/corechip/...
+
+Every run is a new version, it only appends the samples registered after the
+watermark of the previous run, the manifest keeps the watermark and the files of
+every version. The registration date is set when a sample is saved, not when its
+transaction commits: a sample of a long transaction, or one that reaches the replica
+late, can become visible with a date below the watermark. Every run reads again the
+samples registered in the SAFETY_LAG before the watermark and skips the ones it
+already wrote, the manifest keeps their ids. The fields with choices (drilling_mud, core_type, sample_state, ...)
+are dictionary encoded. The dataset is read without any load on the database:
+>>> import pyarrow.dataset as ds
+>>> cores = ds.dataset('snapshot/core', format='parquet', partitioning='hive').to_table()
+
+The runs only append: the samples that are edited or deleted after they were
+written only change in the snapshot with a --full run.
+'''
+import json
+import os
+import shutil
+from datetime import timedelta
+from urllib.parse import quote
+
+from django.db import models
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .samples import get_columns
+from .models import Core, CoreChip, Cuttings, MicroCore, ARCHIVE_MODELS
+from .routers import replica_reads
+
+SNAPSHOT_MODELS = {
+    'core': Core,
+    'corechip': CoreChip,
+    'cuttings': Cuttings,
+    'microcore': MicroCore,
+}
+MANIFEST = 'manifest.json'
+BATCH_SIZE = 10000
+# How late a sample can become visible after its registration date
+SAFETY_LAG = timedelta(hours=1)
+
+
+def _arrow():
+    # pyarrow is an optional dependency, only the snapshots need it
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('The snapshots need pyarrow, install it with: pip install .[analytics]')
+    return pyarrow, pyarrow.parquet
+
+
+def arrow_type(pa, field):
+    if field.is_relation:
+        return pa.int64()
+    if field.choices:
+        # Few distinct values repeated in every row
+        return pa.dictionary(pa.int32(), pa.string())
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, models.IntegerField):
+        return pa.int64()
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    return pa.string()
+
+
+def snapshot_fields(model):
+    # The well is the partition of the dataset, it is not repeated in the files
+    return [field for field in model._meta.concrete_fields if field.name != 'well']
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {'version': 0, 'tables': {}}
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_manifest(output_dir, manifest):
+    # Written last and replaced atomically, the readers of the manifest never see a half written version
+    path = os.path.join(output_dir, MANIFEST)
+    with open(path + '.tmp', 'w') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+class PartitionWriter:
+    ''' Writes the rows of a queryset ordered by well, one parquet file per well
+    '''
+    def __init__(self, pa, pq, model, directory, file_name):
+        self.pa, self.pq = pa, pq
+        self.fields = snapshot_fields(model)
+        self.schema = pa.schema([(field.name, arrow_type(pa, field)) for field in self.fields])
+        self.directory = directory
+        self.file_name = file_name
+        self.writer = None
+        self.well = None
+        self.rows = []
+        self.files = []
+
+    def open(self, well):
+        self.close()
+        directory = os.path.join(self.directory, f'well={quote(str(well), safe="")}')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.file_name)
+        self.writer = self.pq.ParquetWriter(path, self.schema, compression='zstd')
+        self.files.append(os.path.relpath(path, os.path.dirname(self.directory)))
+
+    def flush(self):
+        if not self.rows:
+            return
+        arrays = []
+        for index, (field, arrow_field) in enumerate(zip(self.fields, self.schema)):
+            values = [row[index] for row in self.rows]
+            if self.pa.types.is_dictionary(arrow_field.type):
+                arrays.append(self.pa.array(values, self.pa.string()).dictionary_encode())
+            else:
+                arrays.append(self.pa.array(values, arrow_field.type))
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+        self.rows = []
+
+    def write(self, well, row):
+        if self.writer is None or well != self.well:
+            self.flush()
+            self.open(well)
+            self.well = well
+        self.rows.append(row)
+        if len(self.rows) >= BATCH_SIZE:
+            self.flush()
+
+    def close(self):
+        if self.writer is not None:
+            self.flush()
+            self.writer.close()
+            self.writer = None
+
+
+def snapshot_table(pa, pq, model, directory, version, watermark, recent=(), lag=SAFETY_LAG):
+    ''' Append the samples of a model registered after the watermark - lag, from the hot and the archive
+    table, except the recent ones (ids) that were already written.
+    Returns the number of rows, the new watermark, the files written and the recent samples of the new
+    watermark as [id, registration date] pairs.
+    '''
+    columns = get_columns(model)
+    since = watermark - lag if watermark is not None else None
+    written = {pk: registered for pk, registered in recent}
+    rows_written, files = 0, []
+    for label, table_model in [('hot', model), ('archive', ARCHIVE_MODELS[model])]:
+        writer = PartitionWriter(pa, pq, model, directory, f'part-{version:05d}-{label}.parquet')
+        values = ['well__name'] + [columns[field.name] for field in writer.fields]
+        queryset = table_model.objects.all()
+        if since is not None:
+            queryset = queryset.filter(registration_date__gt=since)
+
+        pk_index = values.index(columns['id']) - 1
+        registration_index = values.index('registration_date') - 1
+        # Streamed from the database, only a batch of rows is in memory
+        for well, *row in queryset.order_by('well__name', 'pk').values_list(*values).iterator(chunk_size=BATCH_SIZE):
+            # The archived samples keep their id, a sample is written once whatever its table
+            if row[pk_index] in written:
+                continue
+            writer.write(well, row)
+            rows_written += 1
+            registered = row[registration_index]
+            written[row[pk_index]] = registered.isoformat() if registered is not None else None
+            if registered is not None and (watermark is None or registered > watermark):
+                watermark = registered
+        writer.close()
+        files.extend(writer.files)
+
+    if watermark is None:
+        return rows_written, watermark, files, []
+    recent = [[pk, registered] for pk, registered in written.items()
+              if registered is not None and parse_datetime(registered) > watermark - lag]
+    return rows_written, watermark, files, recent
+
+
+def snapshot(output_dir, full=False, tables=None):
+    ''' Write a new version of the snapshot, returns the number of rows added to every table
+    '''
+    pa, pq = _arrow()
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    names = [name for name in SNAPSHOT_MODELS if not tables or name in tables]
+    if full:
+        for name in names:
+            shutil.rmtree(os.path.join(output_dir, name), ignore_errors=True)
+            manifest['tables'].pop(name, None)
+
+    version = manifest['version'] + 1
+    added = {}
+    # The snapshot reads every sample, it should not compete with the forms on the primary
+    with replica_reads():
+        for name in names:
+            model = SNAPSHOT_MODELS[name]
+            table = manifest['tables'].setdefault(name, {'watermark': None, 'rows': 0, 'versions': []})
+            watermark = parse_datetime(table['watermark']) if table['watermark'] else None
+
+            rows, watermark, files, recent = snapshot_table(
+                pa, pq, model, os.path.join(output_dir, name), version, watermark, table.get('recent', []))
+
+            added[name] = rows
+            table['rows'] += rows
+            table['watermark'] = watermark.isoformat() if watermark else None
+            table['recent'] = recent
+            if files:
+                table['versions'].append({'version': version, 'files': files, 'rows': rows})
+
+    manifest['version'] = version
+    manifest['created_at'] = timezone.now().isoformat()
+    save_manifest(output_dir, manifest)
+    return added
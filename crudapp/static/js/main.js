@@ -0,0 +1,139 @@
+/*
+  * This file contains the main javascript code for the crudapp.
+*/
+
+/**
+  * This function is used to generate names in forms for different data entry forms such as
+  * core, core_chip, cuttings, etc.
+  * @param {array of strings} components - the components of the name to be joined
+  * @return {string} - the joined name 
+  * 
+  */
+function joinNameComponents(components) {
+  return components.join('-');
+}
+
+/**
+  * This function creates a factory for DOM elements based on a list of field names.
+  * @param {array of strings} fieldNames - the names of the fields to be used in the factory 
+  * return {object of DOM elements} - the DOM elements created by the factory
+  * Usage example:
+  * const coreElements = createDOMElementsFactory(['core_id', 'well_id', 'core_section_number']);
+  * 
+  */
+function createDOMElementsFactory(fieldNames) {
+  const elements = {};
+
+  fieldNames.forEach((fieldName) => {
+    elements[fieldName] = document.getElementById(fieldName);
+  });
+
+  return elements;
+}
+
+/**
+ * 
+ * @param {string} fieldName - the name of the field to be used in the factory
+ * @param {object of DOM element} domElement - the Dome element to be updated
+ */
+function setValue(domElement, initialValue) {
+  domElement.value = initialValue;
+}
+
+/**
+ * @param {array of strings} fields - the names of the fields to be used in the factory
+ * @param {object of DOM elements} domElements - the DOM elements to be updated
+ * @param {object of initial values} initialValues - the initial values to be used in the form
+ */
+function setFormValues(fields, domElements, initialValues) {
+  fields.forEach((fieldName) => {
+    setValue(domElements[fieldName], initialValues[fieldName]);
+  })
+};
+
+/**
+  * Fill the options of an input from the autocomplete endpoint while the user types,
+  * the input needs the data-autocomplete-url, data-autocomplete-kind and list attributes.
+  * @param {DOM element} input - the input that gets the suggestions
+  */
+function attachAutocomplete(input) {
+  // main.js is loaded twice on the pages whose inline scripts need it before base.html loads it
+  if (input.dataset.autocompleteAttached) {
+    return;
+  }
+  input.dataset.autocompleteAttached = 'true';
+
+  let datalist = document.getElementById(input.getAttribute('list'));
+  if (datalist === null) {
+    datalist = document.createElement('datalist');
+    datalist.id = input.getAttribute('list');
+    input.insertAdjacentElement('afterend', datalist);
+  }
+
+  let lastQuery = null;
+  input.addEventListener('input', () => {
+    const query = input.value;
+    if (query === lastQuery) {
+      return;
+    }
+    lastQuery = query;
+
+    const url = `${input.dataset.autocompleteUrl}?kind=${input.dataset.autocompleteKind}&q=${encodeURIComponent(query)}`;
+    fetch(url, { credentials: 'same-origin' })
+      .then((response) => response.json())
+      .then((data) => {
+        // Ignore the answers to queries that the user already typed over
+        if (query !== lastQuery) {
+          return;
+        }
+        datalist.replaceChildren(...data.results.map((result) => {
+          const option = document.createElement('option');
+          option.value = result.value;
+          option.label = result.label;
+          return option;
+        }));
+      });
+  });
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+  document.querySelectorAll('input[data-autocomplete-url]').forEach(attachAutocomplete);
+});
+
+/**
+  * Refresh the progress of an import until it is done or failed.
+  * @param {DOM element} element - the element with the data-progress-url attribute,
+  *   its children with a data-progress attribute show the field of the same name
+  */
+function pollImportProgress(element) {
+  fetch(element.dataset.progressUrl, { credentials: 'same-origin' })
+    .then((response) => response.json())
+    .then((progress) => {
+      element.querySelectorAll('[data-progress]').forEach((field) => {
+        field.textContent = progress[field.dataset.progress];
+      });
+      const errors = document.querySelector('[data-progress-errors]');
+      if (errors !== null) {
+        errors.replaceChildren(...progress.errors.map((error) => {
+          const row = document.createElement('tr');
+          [error.row, error.field || '', error.msg].forEach((value) => {
+            const cell = document.createElement('td');
+            cell.textContent = value;
+            row.appendChild(cell);
+          });
+          return row;
+        }));
+      }
+      if (progress.status === 'queued' || progress.status === 'running') {
+        setTimeout(() => pollImportProgress(element), 2000);
+      }
+    });
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+  // The same guard as attachAutocomplete, a second poll would double the requests
+  document.querySelectorAll('[data-progress-url]:not([data-progress-polled])').forEach((element) => {
+    element.dataset.progressPolled = 'true';
+    pollImportProgress(element);
+  });
+});
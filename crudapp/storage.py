@@ -0,0 +1,50 @@
+''' Storage of the static files collected for production.
+
+collectstatic writes every file with the hash of its content in the name (for example
+js/main.3b5d2e8f1a2c.js) together with a gzip and, when the brotli package is installed,
+a brotli compressed copy. nginx serves them straight from the static volume with
+gzip_static / brotli_static so the python workers never see asset requests.
+'''
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Formats that are already compressed (images, fonts) do not get smaller
+COMPRESSIBLE_EXTENSIONS = ('.js', '.css', '.map', '.svg', '.html', '.txt', '.json', '.xml')
+
+# Do not bother with files that fit in a single network packet
+MIN_COMPRESS_SIZE = 256
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+        if dry_run:
+            return
+        for hashed_name in set(self.hashed_files.values()):
+            if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(hashed_name)
+
+    def compress(self, name):
+        ''' Write name.gz and name.br next to the file if they are smaller than the file
+        '''
+        path = self.path(name)
+        with open(path, 'rb') as file:
+            content = file.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content, quality=11)))
+
+        for extension, compressed in variants:
+            if len(compressed) < len(content):
+                with open(path + extension, 'wb') as file:
+                    file.write(compressed)
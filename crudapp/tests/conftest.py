@@ -3,10 +3,17 @@ import pytest
 from django.test import Client, RequestFactory
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 
 from crudapp.models import Well, Core, CoreChip
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # The cached fragments are keyed by well pk and version, which repeat from one test database to the next
+    cache.clear()
+
+
 @pytest.fixture
 def generic_data():
     return {"date_time": '2021-06-22 13:00:00',
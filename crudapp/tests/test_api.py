@@ -0,0 +1,122 @@
+import base64
+import json
+
+import pytest
+
+from django.urls import reverse
+
+from crudapp.models import Core
+
+
+@pytest.fixture
+def basic_auth(user):
+    credentials = base64.b64encode(b'testuser:testpassword').decode('ascii')
+    return {'HTTP_AUTHORIZATION': f'Basic {credentials}'}
+
+
+@pytest.mark.django_db
+def test_api_requires_authentication(non_auth_client):
+    response = non_auth_client.get(reverse('api_list', kwargs={'resource': 'cores'}))
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_api_list_keyset_pagination(non_auth_client, basic_auth, core, well, user):
+    Core.objects.create(well=well, registered_by=user, remarks="Test Remarks",
+                        core_number="C1", planned_core_number="C1",
+                        core_section_number=2, top_depth=101.0)
+
+    url = reverse('api_list', kwargs={'resource': 'cores'})
+    response = non_auth_client.get(url, {'fields': 'core_section_name,well', 'limit': 1}, **basic_auth)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data['results'] == [{'id': core.pk, 'core_section_name': 'Test Well-C1-1', 'well': well.name}]
+    assert data['next'] == core.pk
+
+    response = non_auth_client.get(url, {'fields': 'core_section_name', 'after': data['next'],
+                                         'format': 'rows'}, **basic_auth)
+    data = response.json()
+    assert data['fields'] == ['id', 'core_section_name']
+    assert data['rows'][0][1] == 'Test Well-C1-2'
+    assert data['next'] is None
+
+
+@pytest.mark.django_db
+def test_api_bulk_create_and_update(non_auth_client, basic_auth, well):
+    url = reverse('api_list', kwargs={'resource': 'cores'})
+    payload = [{
+        'well': well.name,
+        'remarks': 'Test Remarks',
+        'core_number': 'C2',
+        'planned_core_number': 'C2',
+        'core_section_number': number,
+        'top_depth': 200.0 + number,
+    } for number in range(1, 4)]
+
+    response = non_auth_client.post(url, data=json.dumps(payload),
+                                    content_type='application/json', **basic_auth)
+
+    assert response.status_code == 201
+    assert response.json()['created'] == 3
+    assert Core.objects.filter(well=well, core_number='C2').count() == 3
+    assert Core.objects.filter(core_section_name='Test Well-C2-3').exists()
+
+    updates = [{'id': pk, 'core_recovery': 0.9}
+               for pk in Core.objects.filter(core_number='C2').values_list('pk', flat=True)]
+    response = non_auth_client.patch(url, data=json.dumps(updates),
+                                     content_type='application/json', **basic_auth)
+
+    assert response.status_code == 200
+    assert response.json()['updated'] == 3
+    assert set(Core.objects.values_list('core_recovery', flat=True)) == {0.9}
+
+
+@pytest.mark.django_db
+def test_api_create_returns_the_ids_on_mysql(non_auth_client, basic_auth, well, monkeypatch):
+    '''
+    AC: The ids of the created objects are returned also when the database does not return the ids of bulk inserts
+    '''
+    from django.db import connection
+
+    monkeypatch.setattr(type(connection.features), 'can_return_rows_from_bulk_insert', False)
+    payload = [{'well': well.name, 'core_number': 'C3', 'planned_core_number': 'C3',
+                'core_section_number': number, 'top_depth': 300.0 + number} for number in (1, 2)]
+    response = non_auth_client.post(reverse('api_list', kwargs={'resource': 'cores'}), data=json.dumps(payload),
+                                    content_type='application/json', **basic_auth)
+
+    assert response.status_code == 201
+    assert response.json()['ids'] == list(Core.objects.filter(core_number='C3').order_by('core_section_number')
+                                          .values_list('pk', flat=True))
+
+
+@pytest.mark.django_db
+def test_api_list_next_page_is_the_id_when_it_is_not_the_first_field(non_auth_client, basic_auth, core, well, user):
+    '''
+    AC: The next page follows the id of the last object whatever the order of the requested fields
+    '''
+    second = Core.objects.create(well=well, registered_by=user, core_number="C1", planned_core_number="C1",
+                                 core_section_number=2, top_depth=101.0)
+
+    url = reverse('api_list', kwargs={'resource': 'cores'})
+    response = non_auth_client.get(url, {'fields': 'core_section_name,id', 'limit': 1, 'format': 'rows'},
+                                   **basic_auth)
+    data = response.json()
+    assert data['fields'] == ['id', 'core_section_name']
+    assert data['next'] == core.pk
+
+    response = non_auth_client.get(url, {'fields': 'core_section_name,id', 'limit': 1, 'after': data['next']},
+                                   **basic_auth)
+    assert response.json()['results'] == [{'id': second.pk, 'core_section_name': 'Test Well-C1-2'}]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('limit', [0, -5])
+def test_api_list_limit_is_at_least_one(non_auth_client, basic_auth, core, limit):
+    '''
+    AC: A limit below 1 returns a page of one object instead of an error
+    '''
+    response = non_auth_client.get(reverse('api_list', kwargs={'resource': 'cores'}), {'limit': limit}, **basic_auth)
+
+    assert response.status_code == 200
+    assert [row['id'] for row in response.json()['results']] == [core.pk]
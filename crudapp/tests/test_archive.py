@@ -0,0 +1,120 @@
+import base64
+import json
+
+import pytest
+
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+from crudapp.archive import archive_well, reopen_well, with_archive
+from crudapp.models import Core, CoreArchive, Well
+
+
+@pytest.mark.django_db
+def test_archive_well_moves_the_samples(core, well):
+    '''
+    AC: Closing a well moves its samples to the archive tables, they keep their ids
+    AC: The reads union the hot and the archive tables
+    '''
+    version = well.version
+
+    moved = archive_well(well)
+
+    well.refresh_from_db()
+    assert moved['Core'] == 1
+    assert well.closed
+    assert well.version > version
+    assert not Core.objects.exists()
+    assert CoreArchive.objects.get().core_section_name == core.core_section_name
+
+    archived = list(with_archive(Core, well=well))
+    assert [(type(sample), sample.pk) for sample in archived] == [(Core, core.pk)]
+
+    # Closing it again does nothing
+    assert archive_well(well) == {}
+
+
+@pytest.mark.django_db
+def test_reopen_well_moves_the_samples_back(core, well):
+    archive_well(well)
+    moved = reopen_well(well)
+
+    well.refresh_from_db()
+    assert moved['Core'] == 1
+    assert not well.closed
+    assert Core.objects.get().pk == core.pk
+    assert not CoreArchive.objects.exists()
+
+
+@pytest.mark.django_db
+def test_archived_samples_are_listed(non_auth_client, user, core, well):
+    '''
+    AC: The pages and the api still show the samples of a closed well
+    '''
+    Core.objects.create(well=Well.objects.create(name="Open Well"), registered_by=user,
+                        remarks="Test Remarks", core_number="C1", planned_core_number="C1",
+                        core_section_number=1, top_depth=10.0)
+    archive_well(well)
+
+    non_auth_client.force_login(user)
+    response = non_auth_client.get(reverse('select_core_number', kwargs={'pk': well.pk}))
+    assert core.core_section_name in response.content.decode()
+
+    credentials = base64.b64encode(b'testuser:testpassword').decode('ascii')
+    response = non_auth_client.get(reverse('api_list', kwargs={'resource': 'cores'}),
+                                   {'fields': 'core_section_name'}, HTTP_AUTHORIZATION=f'Basic {credentials}')
+    assert [row['core_section_name'] for row in response.json()['results']] == [
+        'Test Well-C1-1', 'Open Well-C1-1']
+
+
+@pytest.mark.django_db
+def test_closed_wells_reject_new_samples(non_auth_client, user, core, well):
+    '''
+    AC: The forms, the api and the imports do not add samples to a closed well
+    '''
+    from crudapp.forms import WellNameField
+    from crudapp.jobs import import_chunk
+
+    archive_well(well)
+    well.refresh_from_db()
+
+    field = WellNameField(queryset=Well.objects.all())
+    with pytest.raises(ValidationError, match='closed'):
+        field.clean(well.name)
+
+    non_auth_client.force_login(user)
+    response = non_auth_client.post(reverse('core_batch', kwargs={'pk': well.pk}), data={
+        'core_number': 'C2', 'planned_core_number': 'C2', 'core_type': 'Core',
+        'collection_date': '2021-06-22 12:00:00', 'sections-TOTAL_FORMS': 1, 'sections-INITIAL_FORMS': 0,
+        'sections-0-top_depth': 100.0, 'sections-0-remarks': 'Test Remarks'})
+    assert 'is closed' in response.content.decode()
+
+    payload = {'well': well.name, 'core_number': 'C2', 'planned_core_number': 'C2', 'core_section_number': 1,
+               'top_depth': 200.0, 'remarks': 'Test Remarks'}
+    response = non_auth_client.post(reverse('api_list', kwargs={'resource': 'cores'}), data=json.dumps(payload),
+                                    content_type='application/json')
+    assert response.status_code == 400
+    assert 'is closed' in response.json()['errors'][0]
+
+    imported, errors = import_chunk(Core, [(2, dict(payload))], user)
+    assert imported == 0
+    assert 'is closed' in errors[0]['msg']
+    assert not Core.objects.exists()
+    assert CoreArchive.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_api_pages_span_both_tables(non_auth_client, user, core, well):
+    '''
+    AC: The keyset pages of the api go through the hot and the archive table in id order
+    '''
+    other = Core.objects.create(well=Well.objects.create(name="Open Well"), registered_by=user,
+                                remarks="Test Remarks", core_number="C1", planned_core_number="C1",
+                                core_section_number=1, top_depth=10.0)
+    archive_well(well)
+
+    non_auth_client.force_login(user)
+    url = reverse('api_list', kwargs={'resource': 'cores'})
+    first = non_auth_client.get(url, {'fields': 'id', 'limit': 1}).json()
+    second = non_auth_client.get(url, {'fields': 'id', 'limit': 1, 'after': first['next']}).json()
+    assert [first['results'], second['results']] == [[{'id': core.pk}], [{'id': other.pk}]]
@@ -0,0 +1,122 @@
+import json
+import os
+
+import pytest
+
+from crudapp.audit import audit_log, acting_as, recover_spool, _flush_at_exit
+from crudapp.models import AuditEntry, Core
+
+
+@pytest.fixture
+def spool(settings, tmp_path):
+    settings.AUDIT_SPOOL_DIR = tmp_path
+    # Flush only when the test asks for it
+    settings.AUDIT_FLUSH_INTERVAL = 0
+    settings.AUDIT_BUFFER_SIZE = 1000
+    yield tmp_path
+    audit_log.flush()
+
+
+@pytest.mark.django_db
+def test_changes_are_buffered_and_flushed_in_batches(spool, core, user, django_capture_on_commit_callbacks):
+    '''
+    AC: The field level changes of a save are recorded with the user that made them
+    AC: Nothing is written to the database until the buffer is flushed, a spool segment keeps the entries meanwhile
+    '''
+    with django_capture_on_commit_callbacks(execute=True), acting_as(user):
+        core = Core.objects.get(pk=core.pk)
+        core.remarks = 'Broken liner'
+        core.top_depth = 100.5
+        core.save()
+        core.delete()
+
+    assert not AuditEntry.objects.exists()
+    assert len(os.listdir(spool)) == 1
+
+    audit_log.flush()
+
+    update, delete = AuditEntry.objects.filter(model='crudapp.core').order_by('timestamp', 'id')
+    assert update.action == 'update'
+    assert update.changes == {'remarks': ['Test Remarks', 'Broken liner'], 'top_depth': [100.0, 100.5]}
+    assert update.user == user
+    assert delete.action == 'delete'
+    assert delete.changes['core_section_name'] == ['Test Well-C1-1', None]
+    assert os.listdir(spool) == []
+
+
+@pytest.mark.django_db
+def test_spool_of_a_crashed_process_is_recovered_once(spool):
+    '''
+    AC: The entries that a crashed process left in the spool are written by the next flush, only once
+    '''
+    entry = {'entry_id': 'a' * 32, 'model': 'crudapp.well', 'object_pk': '1', 'action': 'update',
+             'changes': {'name': ['Old', 'New']}, 'user_id': None,
+             'timestamp': '2024-01-01T10:00:00+00:00'}
+    segment = spool / 'pending-12345-1.jsonl'
+    # The crash cut the last line in half
+    segment.write_text(json.dumps(entry) + '\n' + '{"entry_id": "b')
+
+    recover_spool(str(spool))
+    segment.write_text(json.dumps(entry) + '\n')
+    recover_spool(str(spool))
+
+    assert AuditEntry.objects.get().changes == {'name': ['Old', 'New']}
+    assert os.listdir(spool) == []
+
+
+@pytest.mark.django_db
+def test_a_process_that_audited_nothing_leaves_the_spool_at_exit(spool):
+    '''
+    AC: The exit of a process without audit entries, a management command for example, does not recover the spool
+    '''
+    segment = spool / 'left-by-another-process.jsonl'
+    segment.write_text('')
+    _flush_at_exit()
+    assert os.listdir(spool) == [segment.name]
+
+
+@pytest.mark.django_db
+def test_locked_segments_are_not_recovered(spool):
+    '''
+    AC: A segment is only recovered when no process holds its lock, whatever the pid in its name
+    '''
+    import fcntl
+
+    entry = {'entry_id': 'c' * 32, 'model': 'crudapp.well', 'object_pk': '1', 'action': 'update',
+             'changes': {'name': ['Old', 'New']}, 'user_id': None,
+             'timestamp': '2024-01-01T10:00:00+00:00'}
+    segment = spool / f'{os.getpid()}-1.jsonl'
+    segment.write_text(json.dumps(entry) + '\n')
+
+    with open(segment) as locked:
+        fcntl.flock(locked, fcntl.LOCK_EX)
+        recover_spool(str(spool))
+        assert not AuditEntry.objects.exists()
+
+    # The pid in the name is the pid of this running process, the segment is recovered anyway
+    recover_spool(str(spool))
+    assert AuditEntry.objects.get().entry_id == 'c' * 32
+    assert os.listdir(spool) == []
+
+
+@pytest.mark.django_db
+def test_bulk_creates_are_audited_with_their_ids(spool, well, user, monkeypatch, django_capture_on_commit_callbacks):
+    '''
+    AC: On a database that does not return the ids of bulk inserts (MySQL) the entries have the ids of the new rows
+    '''
+    from django.db import connection
+    from crudapp.audit import record_bulk
+    from crudapp.samples import bulk_create
+
+    monkeypatch.setattr(type(connection.features), 'can_return_rows_from_bulk_insert', False)
+    sections = [Core(well=well, core_number='C1', core_section_number=number,
+                     core_section_name=f'Test Well-C1-{number}', top_depth=number, bottom_depth=number + 1,
+                     registered_by=user) for number in (1, 2)]
+    with django_capture_on_commit_callbacks(execute=True):
+        bulk_create(Core, sections)
+        record_bulk(Core, sections, 'create', user=user)
+    audit_log.flush()
+
+    ids = set(Core.objects.values_list('pk', flat=True))
+    assert {section.pk for section in sections} == ids
+    assert set(AuditEntry.objects.values_list('object_pk', flat=True)) == {str(pk) for pk in ids}
@@ -0,0 +1,75 @@
+import pytest
+
+from django.db import transaction
+from django.urls import reverse
+
+from crudapp.autocomplete import NameIndex, PrefixTrie, name_index
+from crudapp.forms import CoreForm
+from crudapp.models import Well
+
+
+def test_prefix_trie():
+    trie = PrefixTrie()
+    for name in ['DEL-GT-01', 'DEL-GT-02', 'DAP', 'del-gt-01']:
+        trie.add(name)
+
+    assert trie.starting_with('del') == ['DEL-GT-01', 'del-gt-01', 'DEL-GT-02']
+    assert trie.starting_with('D', limit=1) == ['DAP']
+
+    trie.remove('DEL-GT-02')
+    assert trie.starting_with('DEL-GT-0') == ['DEL-GT-01', 'del-gt-01']
+    assert trie.size == 3
+
+
+@pytest.mark.django_db
+def test_name_index_follows_signals(well, django_capture_on_commit_callbacks):
+    name_index.invalidate()
+    assert name_index.suggest('well', 'test') == [{'value': 'Test Well', 'label': 'Test Well'}]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        well.name = 'Renamed Well'
+        well.save()
+        Well.objects.create(name='Test Well 2')
+
+    assert [result['value'] for result in name_index.suggest('well', 'test')] == ['Test Well 2']
+    assert [result['value'] for result in name_index.suggest('well', 're')] == ['Renamed Well']
+
+
+@pytest.mark.django_db
+def test_name_index_of_every_process_follows_the_commits(well, django_capture_on_commit_callbacks):
+    '''
+    AC: A name written by another process is suggested once it is committed, through the shared version
+    AC: A save that is rolled back leaves no name behind
+    '''
+    other_worker = NameIndex()
+    assert other_worker.suggest('well', 'new') == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Well.objects.create(name='New Well')
+    assert other_worker.suggest('well', 'new') == [{'value': 'New Well', 'label': 'New Well'}]
+    assert name_index.suggest('well', 'new') == [{'value': 'New Well', 'label': 'New Well'}]
+
+    with pytest.raises(RuntimeError):
+        with django_capture_on_commit_callbacks(execute=True), transaction.atomic():
+            Well.objects.create(name='Never Committed')
+            raise RuntimeError
+    assert other_worker.suggest('well', 'never') == []
+    assert name_index.suggest('well', 'never') == []
+
+
+@pytest.mark.django_db
+def test_autocomplete_view(auth_client, user, core):
+    name_index.invalidate()
+    auth_client.force_login(user)
+    response = auth_client.get(reverse('autocomplete'), {'kind': 'sample', 'q': 'Test Well-C1'})
+
+    assert response.status_code == 200
+    assert response.json()['results'] == [{'value': core.core_section_name, 'label': core.core_section_name}]
+
+
+@pytest.mark.django_db
+def test_core_form_does_not_render_wells(well):
+    html = CoreForm(initial={'well': well.name}).as_p()
+
+    assert '<option value="Test Well"' not in html
+    assert 'data-autocomplete-kind="well"' in html
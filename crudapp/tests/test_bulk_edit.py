@@ -0,0 +1,119 @@
+import base64
+import json
+
+import pytest
+
+from django.urls import reverse
+
+from crudapp.archive import archive_well
+from crudapp.audit import audit_log
+from crudapp.bulk_edit import bulk_edit
+from crudapp.models import AuditEntry, Core, CoreArchive, Well
+from crudapp.samples import closed_well_message
+
+
+@pytest.fixture
+def sections(well, user):
+    return [Core.objects.create(well=well, registered_by=user, core_number=core_number, planned_core_number=core_number,
+                                core_section_number=number, top_depth=depth)
+            for core_number, number, depth in [('C1', 1, 1400.0), ('C3', 1, 1500.0), ('C3', 2, 1501.0)]]
+
+
+@pytest.mark.django_db
+def test_bulk_edit_updates_the_matching_samples(settings, tmp_path, sections, well, django_capture_on_commit_callbacks):
+    '''
+    AC: One assignment is applied to every sample that matches the filter, the count is returned
+    AC: The changes are recorded in the audit trail and the version of the well is bumped
+    '''
+    settings.AUDIT_SPOOL_DIR = tmp_path
+    version = Well.objects.get(pk=well.pk).version
+
+    with django_capture_on_commit_callbacks(execute=True):
+        updated, errors = bulk_edit(Core, {'well': well.name, 'core_number': 'C3'}, {'ct_scanned': True})
+
+    assert (updated, errors) == (2, [])
+    assert list(Core.objects.filter(ct_scanned=True).values_list('pk', flat=True).order_by('pk')) == [
+        sections[1].pk, sections[2].pk]
+    assert Well.objects.get(pk=well.pk).version > version
+
+    audit_log.flush()
+    entry = AuditEntry.objects.filter(model='crudapp.core', object_pk=str(sections[1].pk)).get()
+    assert entry.changes == {'ct_scanned': [None, True]}
+
+
+@pytest.mark.django_db
+def test_bulk_edit_depth_range(sections, well):
+    updated, errors = bulk_edit(Core, {'well': well.name, 'min_depth': 1500}, {'preservation': 'Core rack at room temperature'})
+    assert (updated, errors) == (2, [])
+
+
+@pytest.mark.django_db
+def test_bulk_edit_leaves_the_closed_wells_alone(sections, well, user):
+    '''
+    AC: The archived samples of a closed well are not changed, an edit of a closed well is rejected
+    '''
+    open_well = Well.objects.create(name='Open Well')
+    other = Core.objects.create(well=open_well, registered_by=user, core_number='C1', planned_core_number='C1',
+                                core_section_number=1, top_depth=1600.0)
+    archive_well(well)
+
+    updated, errors = bulk_edit(Core, {'well': well.name}, {'ct_scanned': True})
+    assert updated == 0
+    assert errors == [{'field': 'well', 'msg': closed_well_message(well)}]
+
+    updated, errors = bulk_edit(Core, {'min_depth': 1000}, {'ct_scanned': True})
+    assert (updated, errors) == (1, [])
+    assert Core.objects.get(pk=other.pk).ct_scanned
+    assert not CoreArchive.objects.filter(ct_scanned=True).exists()
+
+
+@pytest.mark.django_db
+def test_bulk_edit_rejects_invalid_assignments(sections, well):
+    '''
+    AC: Nothing is updated when an assignment is not valid
+    '''
+    updated, errors = bulk_edit(Core, {'well': well.name}, {'top_depth': 'deep'})
+    assert updated == 0
+    assert errors[0]['field'] == 'top_depth'
+
+    updated, errors = bulk_edit(Core, {'well': well.name}, {'core_section_name': 'Same name'})
+    assert updated == 0
+    assert errors[0]['field'] == 'core_section_name'
+
+    with pytest.raises(ValueError):
+        bulk_edit(Core, {}, {'ct_scanned': True})
+
+
+@pytest.mark.django_db
+def test_bulk_edit_api_and_view(non_auth_client, sections, well, user):
+    credentials = base64.b64encode(b'testuser:testpassword').decode('ascii')
+    url = reverse('api_bulk_edit', kwargs={'resource': 'cores'})
+    body = {'filter': {'well': well.name, 'max_depth': 1450}, 'set': {'remarks': 'Broken liner'}}
+    response = non_auth_client.post(url, json.dumps(body), content_type='application/json',
+                                    HTTP_AUTHORIZATION=f'Basic {credentials}')
+    assert response.json() == {'updated': 1}
+    assert Core.objects.get(pk=sections[0].pk).remarks == 'Broken liner'
+
+    non_auth_client.force_login(user)
+    response = non_auth_client.post(reverse('bulk_edit'), {
+        'sample_type': 'core', 'well': well.name, 'core_number': 'C1', 'field': 'ct_scanned', 'value': 'true'})
+    assert '1 samples updated' in response.content.decode()
+    assert Core.objects.get(pk=sections[0].pk).ct_scanned
+
+
+@pytest.mark.django_db
+def test_bulk_edit_needs_a_user(non_auth_client, sections, well):
+    '''
+    AC: Anonymous bulk edits are sent to the login by the view and answered with a 401 by the api, nothing changes
+    '''
+    response = non_auth_client.post(reverse('bulk_edit'), {
+        'sample_type': 'core', 'well': well.name, 'core_number': 'C1', 'field': 'ct_scanned', 'value': 'true'})
+    assert response.status_code == 302
+    assert response.url.startswith(reverse('login'))
+
+    body = {'filter': {'well': well.name}, 'set': {'remarks': 'Broken liner'}}
+    response = non_auth_client.post(reverse('api_bulk_edit', kwargs={'resource': 'cores'}), json.dumps(body),
+                                    content_type='application/json')
+    assert response.status_code == 401
+    assert not Core.objects.filter(ct_scanned=True).exists()
+    assert not Core.objects.filter(remarks='Broken liner').exists()
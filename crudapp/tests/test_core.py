@@ -11,7 +11,7 @@ from django.urls import reverse_lazy
 from django.db import connection
 from django.urls import reverse
 from django.test import Client
-from crudapp.models import Core, Well   
+from crudapp.models import Core, CoreArchive, Well, next_core_section_number   
 from crudapp.forms import CoreForm
 from crudapp.views import CoreFormView
 
@@ -170,3 +170,122 @@ def test_core_section_number_counter(core_data):
     
     # AC: Check that the core last number is one more than the last core catcher number
     pass
+
+
+@pytest.mark.django_db
+def test_core_batch_form_view_post(auth_client, well, user):
+    '''
+    AC: All the sections of a core run are registered with a single POST
+    AC: The core section numbers are consecutive and continue the existing ones
+    '''
+    Core.objects.create(well=well, registered_by=user, remarks="Test Remarks",
+                        core_number="C1", planned_core_number="C1",
+                        core_section_number=1, top_depth=99.0)
+
+    data = {
+        'core_number': 'C1',
+        'planned_core_number': 'C1',
+        'core_type': 'Core',
+        'collection_date': '2021-06-22 12:00:00',
+        'drilling_mud': 'Water-based mud',
+        'sections-TOTAL_FORMS': 3,
+        'sections-INITIAL_FORMS': 0,
+    }
+    for index in range(3):
+        data[f'sections-{index}-top_depth'] = 100.0 + index
+        data[f'sections-{index}-bottom_depth'] = 101.0 + index
+        data[f'sections-{index}-remarks'] = 'Test Remarks'
+
+    auth_client.force_login(user)
+    response = auth_client.post(reverse('core_batch', kwargs={'pk': well.pk}), data=data)
+
+    assert response.status_code == 302
+    cores = Core.objects.filter(well=well, core_number='C1').order_by('core_section_number')
+    assert [core.core_section_number for core in cores] == [1, 2, 3, 4]
+    assert cores.last().core_section_name == 'Test Well-C1-4'
+    assert cores.last().registered_by == user
+
+
+@pytest.mark.django_db
+def test_core_batch_form_view_sections(auth_client, well, user):
+    '''
+    AC: The number of sections of the batch form is a number between 1 and max_sections
+    '''
+    auth_client.force_login(user)
+    url = reverse('core_batch', kwargs={'pk': well.pk})
+    for sections, forms in (('abc', 1), ('-3', 1), ('4', 4), ('100000', 30)):
+        response = auth_client.get(url, {'core_number': 'C1', 'sections': sections})
+        assert response.status_code == 200
+        assert response.context['formset'].total_form_count() == forms
+
+
+@pytest.mark.django_db
+def test_core_batch_form_view_rejects_too_many_sections(auth_client, well, user):
+    '''
+    AC: A POST with more than max_sections sections registers nothing
+    '''
+    data = {
+        'core_number': 'C1',
+        'planned_core_number': 'C1',
+        'core_type': 'Core',
+        'collection_date': '2021-06-22 12:00:00',
+        'drilling_mud': 'Water-based mud',
+        'sections-TOTAL_FORMS': 100000,
+        'sections-INITIAL_FORMS': 0,
+    }
+    for index in range(31):
+        data[f'sections-{index}-top_depth'] = 100.0 + index
+
+    auth_client.force_login(user)
+    response = auth_client.post(reverse('core_batch', kwargs={'pk': well.pk}), data=data)
+
+    assert response.status_code == 200
+    assert len(response.context['formset'].forms) == 30
+    assert response.context['formset'].non_form_errors()
+    assert not Core.objects.filter(well=well).exists()
+
+
+@pytest.mark.django_db
+def test_core_section_numbers_follow_the_run_of_the_well(well, user):
+    '''
+    AC: The next section number is one more than the largest one of the same core run of the well,
+    archived sections included, whatever the other wells and the other core runs have
+    '''
+    other = Well.objects.create(name='Other Well')
+    Core.objects.create(well=other, registered_by=user, core_number='C1', planned_core_number='C1',
+                        core_section_number=7, top_depth=10.0)
+    Core.objects.create(well=well, registered_by=user, core_number='C2', planned_core_number='C2',
+                        core_section_number=5, top_depth=20.0)
+    assert next_core_section_number(well, 'C1') == 1
+
+    CoreArchive.objects.create(well=well, registered_by=user, core_number='C1', planned_core_number='C1',
+                               core_section_number=2, core_section_name='Test Well-C1-2', top_depth=30.0)
+    assert next_core_section_number(well.name, 'C1') == 3
+
+    core = Core(well=well, registered_by=user, core_number='C1', planned_core_number='C1', top_depth=31.0)
+    core.save()
+    assert (core.core_section_number, core.core_section_name) == (3, 'Test Well-C1-3')
+
+    core = Core(well=well, registered_by=user, core_number='C1', planned_core_number='C1',
+                core_section_number=1, top_depth=32.0)
+    core.save()
+    assert core.core_section_name == 'Test Well-C1-1'
+    core = Core(well=well, registered_by=user, core_number='C1', planned_core_number='C1',
+                core_section_number=2, top_depth=33.0)
+    core.save()
+    assert core.core_section_name == 'Test Well-C1-4'
+
+
+@pytest.mark.django_db
+def test_well_cores_table_is_cached_until_the_well_changes(auth_client, user, well, core):
+    auth_client.force_login(user)
+    url = reverse('select_core_number', kwargs={'pk': well.pk})
+    assert core.core_section_name in auth_client.get(url).content.decode()
+
+    # update() does not send signals so the well version stays the same and the cached table is served
+    Core.objects.filter(pk=core.pk).update(core_section_name='Test Well-C1-99')
+    assert 'Test Well-C1-99' not in auth_client.get(url).content.decode()
+
+    core.refresh_from_db()
+    core.save()
+    assert 'Test Well-C1-99' in auth_client.get(url).content.decode()
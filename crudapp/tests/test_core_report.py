@@ -0,0 +1,74 @@
+import pytest
+
+from django.urls import reverse
+
+from crudapp import core_report as report_module
+from crudapp.archive import archive_well
+from crudapp.core_report import core_report
+from crudapp.models import Core, Well
+
+pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def sections(well, user):
+    rows = [
+        # core number, section number, top, bottom, length, recovery, weight
+        ('C1', 1, 1000.0, 1001.0, None, None, 10.0),
+        ('C1', 2, 1001.0, 1002.0, None, 0.5, None),
+        ('C2', 1, 1005.0, None, 1.0, None, 12.0),
+        ('C2', 2, 1006.0, 1007.0, None, None, 11.0),
+    ]
+    return [Core.objects.create(well=well, registered_by=user, core_number=number, planned_core_number=number,
+                                core_section_number=section, top_depth=top, bottom_depth=bottom,
+                                core_section_length=length, core_recovery=recovery, core_weight=weight)
+            for number, section, top, bottom, length, recovery, weight in rows]
+
+
+@pytest.mark.django_db
+def test_core_report_per_run_and_well(sections, well):
+    '''
+    AC: The recovery, the cumulative recovered length, the gaps and the weights are computed per core run
+    AC: The section length falls back to bottom - top and the recovery to the section length
+    '''
+    archive_well(well)
+    report = core_report(Well.objects.get(pk=well.pk))
+
+    first, second = report['runs']
+    assert (first['core_number'], first['cored'], first['recovered'], first['recovery']) == ('C1', 2.0, 1.5, 75.0)
+    assert (first['weight'], first['weighed_sections']) == (10.0, 1)
+    assert (second['cored'], second['recovered'], second['recovery']) == (2.0, 2.0, 100.0)
+    assert second['cumulative_recovered'] == 3.5
+    assert report['gaps'] == [[1002.0, 1005.0]]
+    assert report['totals'] == {'runs': 2, 'sections': 4, 'cored': 4.0, 'recovered': 3.5, 'recovery': 87.5,
+                                'weight': 33.0}
+
+
+@pytest.mark.django_db
+def test_core_report_is_cached_by_the_well_version(sections, well, monkeypatch):
+    '''
+    AC: The report is cached by the version of the well, all the runs are computed again when it changes
+    '''
+    core_report(Well.objects.get(pk=well.pk))
+
+    computed = []
+    run_stats = report_module.run_stats
+    monkeypatch.setattr(report_module, 'run_stats', lambda runs, count, values: computed.append(count) or
+                        run_stats(runs, count, values))
+    assert core_report(Well.objects.get(pk=well.pk))['runs'][0]['recovered'] == 1.5
+    assert computed == []
+
+    Core.objects.filter(pk=sections[0].pk).update(core_recovery=0.9)
+    Well.objects.filter(pk=well.pk).update(version=well.version + 100)
+    report = core_report(Well.objects.get(pk=well.pk))
+    assert computed == [2]
+    assert report['runs'][0]['recovered'] == 1.4
+    assert report['runs'][1]['cumulative_recovered'] == 3.4
+
+
+@pytest.mark.django_db
+def test_core_report_view(sections, well, user, non_auth_client):
+    non_auth_client.force_login(user)
+    url = reverse('core_report', kwargs={'pk': well.pk})
+    assert non_auth_client.get(url, {'format': 'json'}).json()['totals']['recovery'] == 87.5
+    assert '1002.0 m to 1005.0 m' in non_auth_client.get(url).content.decode()
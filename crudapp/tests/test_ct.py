@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from crudapp.ct import byte_range, import_stack, tile, tile_cache, TileCache
+from crudapp.models import Core, CtVolume
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.fixture(autouse=True)
+def ct_root(settings, tmp_path):
+    settings.CT_VOLUME_ROOT = str(tmp_path / 'ct')
+    tile_cache.clear()
+
+
+@pytest.fixture
+def section(well, user):
+    return Core.objects.create(well=well, registered_by=user, core_number='C1', planned_core_number='C1',
+                               core_section_number=1, top_depth=1000.0)
+
+
+@pytest.fixture
+def stack(tmp_path):
+    stack = np.arange(3 * 5 * 7, dtype=np.uint16).reshape(3, 5, 7)
+    path = tmp_path / 'scan.npy'
+    np.save(path, stack)
+    return stack, str(path)
+
+
+@pytest.mark.django_db
+def test_import_ct_writes_the_tiles(section, stack, capsys):
+    '''
+    AC: A CT stack is imported in tiles linked to the core section, the core is marked as scanned
+    AC: A tile of a slice is the same as the part of the slice it covers, padded with zeros
+    '''
+    voxels, path = stack
+    call_command('import_ct', section.core_section_name, path, '--tile-size', '4', '--voxel-size', '0.2')
+    assert 'CT volume' in capsys.readouterr().out
+
+    volume = CtVolume.objects.get(core_id=section.pk)
+    assert (volume.slices, volume.height, volume.width, volume.dtype) == (3, 5, 7, '<u2')
+    assert Core.objects.get(pk=section.pk).ct_scanned
+
+    data = np.frombuffer(tile(volume, 1, 1, 1), dtype=volume.dtype).reshape(4, 4)
+    assert (data[:1, :3] == voxels[1, 4:, 4:]).all()
+    assert not data[1:].any() and not data[:, 3:].any()
+    with pytest.raises(IndexError):
+        tile(volume, 3, 0, 0)
+
+
+@pytest.mark.django_db
+def test_import_ct_leaves_no_folder_behind(section, stack, settings, tmp_path, monkeypatch):
+    '''
+    AC: The tiles are written before the transaction and the folder only gets its final name in it
+    AC: A stack that can not be imported leaves neither a volume nor a folder
+    '''
+    voxels, path = stack
+    volume = import_stack(section, path, tile_size=4)
+    assert os.listdir(os.path.join(settings.CT_VOLUME_ROOT, str(section.well_id))) == [os.path.basename(volume.directory)]
+
+    bad = tmp_path / 'bad.npy'
+    np.save(bad, np.zeros((2, 5), dtype=np.uint16))
+    with pytest.raises(ValueError):
+        import_stack(section, str(bad))
+
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+    monkeypatch.setattr(os, 'rename', fail)
+    with pytest.raises(OSError):
+        import_stack(section, path, tile_size=4)
+    assert CtVolume.objects.filter(core_id=section.pk).count() == 1
+    assert os.listdir(os.path.join(settings.CT_VOLUME_ROOT, str(section.well_id))) == [os.path.basename(volume.directory)]
+
+
+@pytest.mark.django_db
+def test_tiles_are_served_with_ranges(section, stack, user, non_auth_client):
+    voxels, path = stack
+    call_command('import_ct', section.core_section_name, path, '--tile-size', '4')
+    volume = CtVolume.objects.get(core_id=section.pk)
+    non_auth_client.force_login(user)
+
+    assert non_auth_client.get(reverse('ct_volume', kwargs={'pk': volume.pk})).json()['tiles'] == [3, 2, 2]
+
+    url = reverse('ct_tile', kwargs={'pk': volume.pk, 'z': 2, 'row': 0, 'column': 0})
+    response = non_auth_client.get(url)
+    assert response['X-Shape'] == '4,4'
+    assert np.frombuffer(response.content, dtype='<u2').reshape(4, 4)[0].tolist() == voxels[2, 0, :4].tolist()
+
+    response = non_auth_client.get(url, HTTP_RANGE='bytes=8-15')
+    assert response.status_code == 206
+    assert response['Content-Range'] == 'bytes 8-15/32'
+    assert np.frombuffer(response.content, dtype='<u2').tolist() == voxels[2, 1, :4].tolist()
+    assert non_auth_client.get(url, HTTP_RANGE='bytes=40-').status_code == 416
+
+    response = non_auth_client.get(reverse('ct_thumbnail', kwargs={'pk': volume.pk, 'z': 0}))
+    assert len(response.content) == 5 * 7 * 2
+    assert non_auth_client.get(reverse('ct_thumbnail', kwargs={'pk': volume.pk, 'z': 3})).status_code == 404
+
+
+def test_tile_cache_drops_the_least_recently_used():
+    cache = TileCache(max_bytes=10)
+    cache.put('a', b'1234')
+    cache.put('b', b'1234')
+    cache.get('a')
+    cache.put('c', b'1234')
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (b'1234', None, b'1234')
+
+
+def test_byte_range():
+    assert byte_range(None, 10) is None
+    assert byte_range('bytes=2-', 10) == (2, 9)
+    assert byte_range('bytes=-3', 10) == (7, 9)
+    with pytest.raises(ValueError):
+        byte_range('bytes=0-1,4-5', 10)
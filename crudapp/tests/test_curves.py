@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from crudapp.archive import archive_well
+from crudapp.curves import decimate, save_curve, well_curve, window
+from crudapp.models import Core, MeasurementCurve
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.AUDIT_SPOOL_DIR = tmp_path
+
+
+@pytest.fixture
+def sections(well, user):
+    return [Core.objects.create(well=well, registered_by=user, core_number='C1', planned_core_number='C1',
+                                core_section_number=number, top_depth=top)
+            for number, top in [(1, 1000.0), (2, 1001.0)]]
+
+
+@pytest.mark.django_db
+def test_curve_is_stored_as_npy_and_sliced_by_depth(sections, django_capture_on_commit_callbacks):
+    '''
+    AC: The points of a curve are stored in a .npy file, sorted by depth without the missing values
+    AC: A depth window only returns the points between its depths
+    '''
+    depths = np.round(np.arange(1000.0, 1001.0, 0.01), 2)
+    values = np.sin(depths)
+    values[5] = np.nan
+    curve = save_curve(sections[0], 'gamma_ray', depths[::-1], values[::-1], unit='API')
+
+    assert curve.data.name.endswith('.npy')
+    assert curve.points == 99
+    assert (curve.top_depth, curve.bottom_depth) == (1000.0, depths[-1])
+
+    top, bottom = window(curve, 1000.2, 1000.3)
+    assert top[0] == pytest.approx(1000.2) and top[-1] == pytest.approx(1000.3)
+    assert np.all(np.diff(top) > 0)
+    assert bottom == pytest.approx(np.sin(top))
+
+    # Storing it again replaces the curve and its file, the old file is deleted once the transaction commits
+    old_file = curve.data.path
+    with django_capture_on_commit_callbacks() as callbacks:
+        curve = save_curve(sections[0], 'gamma_ray', [1000.0, 1000.5], [1.0, 2.0])
+    assert MeasurementCurve.objects.count() == 1
+    assert curve.points == 2
+    assert os.path.exists(curve.data.path) and os.path.exists(old_file)
+    for callback in callbacks:
+        callback()
+    assert not os.path.exists(old_file)
+
+
+def test_decimate_keeps_the_peaks():
+    '''
+    AC: The decimation keeps the minimum and the maximum of every bucket
+    '''
+    depths = np.arange(100000, dtype=float)
+    values = np.zeros(100000)
+    values[12345], values[67890] = 10.0, -10.0
+
+    kept_depths, kept_values = decimate(depths, values, 100)
+    assert len(kept_depths) <= 200
+    assert 10.0 in kept_values and -10.0 in kept_values
+    assert np.all(np.diff(kept_depths) > 0)
+
+
+@pytest.mark.django_db
+def test_well_curve_joins_the_sections_and_follows_the_archive(sections, well, user, non_auth_client):
+    save_curve(sections[0], 'density', [1000.0, 1000.5], [2.1, 2.2])
+    save_curve(sections[1], 'density', [1001.0, 1001.5], [2.3, 2.4])
+    archive_well(well)
+
+    depths, values = well_curve(well, 'density', top=1000.4, bottom=1001.2)
+    assert depths.tolist() == [1000.5, 1001.0]
+    assert values.tolist() == [2.2, 2.3]
+
+    non_auth_client.force_login(user)
+    response = non_auth_client.get(reverse('well_curve', kwargs={'pk': well.pk, 'kind': 'density'}), {'bottom': 1000.6})
+    assert response.json() == {'kind': 'density', 'depth': [1000.0, 1000.5], 'value': [2.1, 2.2]}
+    response = non_auth_client.get(reverse('well_curve', kwargs={'pk': well.pk, 'kind': 'density'}), {'top': 'deep'})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_import_curves_command(sections, tmp_path, capsys):
+    '''
+    AC: A csv export of a logger with the rows of many sections is stored as one curve per section and kind
+    '''
+    path = tmp_path / 'mscl.csv'
+    path.write_text('SECTION,DEPTH,NGR,DEN\n'
+                    f'{sections[0].core_section_name},1000.0,30,2.1\n'
+                    f'{sections[0].core_section_name},1000.1,31,\n'
+                    f'{sections[1].core_section_name},1001.0,40,2.3\n'
+                    'Unknown section,1002.0,50,2.4\n')
+
+    call_command('import_curves', str(path), '--section-column', 'SECTION', '--depth-column', 'DEPTH',
+                 '--curve', 'gamma_ray=NGR', '--curve', 'density=DEN', '--unit', 'density=g/cc')
+
+    assert '4 curves stored' in capsys.readouterr().out
+    density = MeasurementCurve.objects.get(core=sections[0], kind='density')
+    assert (density.points, density.unit) == (1, 'g/cc')
+    assert MeasurementCurve.objects.get(core=sections[0], kind='gamma_ray').points == 2
@@ -0,0 +1,131 @@
+import pytest
+
+from django.core.management import call_command
+
+from crudapp.archive import archive_well, reopen_well
+from crudapp.depths import correct_depths, undo_correction, diff, FEET_TO_METRES
+from crudapp.models import Core, CoreArchive, Cuttings, DepthCorrection, MeasurementCurve, Well
+
+pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def sections(well, user):
+    return [Core.objects.create(well=well, registered_by=user, core_number='C1', planned_core_number='C1',
+                                core_section_number=number, top_depth=top, bottom_depth=bottom)
+            for number, top, bottom in [(1, 1000.0, 1001.0), (2, 2000.0, None)]]
+
+
+@pytest.mark.django_db
+def test_shift_table_is_interpolated(sections, well, user):
+    '''
+    AC: The depths of the well are shifted with a piecewise linear shift table, the missing depths stay missing
+    AC: The depths from before are kept with the correction
+    '''
+    cuttings = Cuttings.objects.create(well=well, registered_by=user, cuttings_number=1,
+                                       cuttings_name='Test Well-CU-1', cuttings_depth=1500.0)
+    version = Well.objects.get(pk=well.pk).version
+
+    correction = correct_depths(well, shifts=[(1000, 1.0), (2000, 3.0)], user=user)
+
+    first, second = [Core.objects.get(pk=core.pk) for core in sections]
+    assert (first.top_depth, first.bottom_depth) == (1001.0, 1002.002)
+    assert (second.top_depth, second.bottom_depth) == (2003.0, None)
+    assert Cuttings.objects.get(pk=cuttings.pk).cuttings_depth == 1502.0
+    assert correction.samples == 3
+    assert correction.previous['Core']['bottom_depth'] == [1001.0, None]
+    assert Well.objects.get(pk=well.pk).version > version
+
+
+@pytest.mark.django_db
+def test_dry_run_changes_nothing(sections, well):
+    changes = correct_depths(well, factor=FEET_TO_METRES, dry_run=True)
+
+    assert diff(changes)[0] == ('Core', sections[0].pk, 'top_depth', 1000.0, 304.8)
+    assert Core.objects.get(pk=sections[0].pk).top_depth == 1000.0
+    assert not DepthCorrection.objects.exists()
+
+
+@pytest.mark.django_db
+def test_undo_restores_the_depths(sections, well):
+    '''
+    AC: The last correction of a well can be undone
+    '''
+    first = correct_depths(well, factor=FEET_TO_METRES)
+    second = correct_depths(well, shifts=[(0, 2.0)])
+    with pytest.raises(ValueError):
+        undo_correction(first)
+
+    undo_correction(second)
+    undo_correction(first)
+
+    assert sorted(Core.objects.values_list('top_depth', 'bottom_depth')) == [(1000.0, 1001.0), (2000.0, None)]
+
+
+@pytest.mark.django_db
+def test_closed_well_is_not_corrected(sections, well):
+    '''
+    AC: The archived samples of a closed well are not corrected, its last correction is undone once it is opened again
+    '''
+    correction = correct_depths(well, factor=FEET_TO_METRES)
+    archive_well(well)
+
+    with pytest.raises(ValueError, match='is closed'):
+        correct_depths(well, shifts=[(0, 2.0)])
+    with pytest.raises(ValueError, match='is closed'):
+        undo_correction(correction)
+    assert sorted(CoreArchive.objects.values_list('top_depth', flat=True)) == [304.8, 609.6]
+
+    reopen_well(Well.objects.get(pk=well.pk))
+    undo_correction(correction)
+    assert sorted(Core.objects.values_list('top_depth', flat=True)) == [1000.0, 2000.0]
+
+
+@pytest.mark.django_db
+def test_correct_depths_command(sections, well):
+    with pytest.raises(ValueError):
+        correct_depths(well, shifts=[(0, -5000.0)])
+
+    call_command('correct_depths', 'Test Well', '--shift', '0:0.5')
+    assert Core.objects.get(pk=sections[0].pk).top_depth == 1000.5
+
+    call_command('correct_depths', 'Test Well', '--undo')
+    assert Core.objects.get(pk=sections[0].pk).top_depth == 1000.0
+
+
+@pytest.mark.django_db
+def test_lengths_and_curves_follow_the_depths(well, user, settings, tmp_path):
+    '''
+    AC: A unit conversion also converts the section length and the recovery, the undo restores them
+    AC: A shift table changes the lengths by how much it stretches the section
+    AC: The points and the extent of the curves are corrected with the samples, the undo restores them
+    '''
+    from crudapp.curves import save_curve, window
+    np = pytest.importorskip('numpy')
+    settings.MEDIA_ROOT = tmp_path
+    core = Core.objects.create(well=well, registered_by=user, core_number='C1', planned_core_number='C1',
+                               core_section_number=1, top_depth=1000.0, bottom_depth=1010.0,
+                               core_section_length=10.0, core_recovery=9.0)
+    curve = save_curve(core, 'gamma_ray', [1000.0, 1005.0, 1010.0], [1.0, 2.0, 3.0])
+    original = curve.data.name
+
+    correction = correct_depths(well, factor=FEET_TO_METRES)
+
+    core = Core.objects.get(pk=core.pk)
+    assert (core.core_section_length, core.core_recovery) == (3.048, 2.7432)
+    assert correction.previous['Core']['core_recovery'] == [9.0]
+    curve = MeasurementCurve.objects.get(pk=curve.pk)
+    assert (curve.top_depth, curve.bottom_depth) == (304.8, 307.848)
+    assert window(curve)[0].tolist() == [304.8, 306.324, 307.848]
+
+    undo_correction(correction)
+    core = Core.objects.get(pk=core.pk)
+    assert (core.core_section_length, core.core_recovery) == (10.0, 9.0)
+    curve = MeasurementCurve.objects.get(pk=curve.pk)
+    assert curve.data.name == original
+    assert window(curve)[0].tolist() == [1000.0, 1005.0, 1010.0]
+
+    correct_depths(well, shifts=[(1000, 0.0), (1010, 2.0)])
+    core = Core.objects.get(pk=core.pk)
+    assert (core.top_depth, core.bottom_depth, core.core_section_length) == (1000.0, 1012.0, 12.0)
+    assert core.core_recovery == 10.8
@@ -0,0 +1,119 @@
+import pytest
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from crudapp.models import Core, ImportJob
+from crudapp.jobs import run_job
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    # Without a queue the job runs when it is enqueued
+    settings.IMPORT_QUEUE_URL = None
+
+
+def cores_csv(well_name, rows):
+    lines = ['Well,Core number,Planned,Section,Top,Remarks,Collected']
+    for number in range(1, rows + 1):
+        lines.append(f'{well_name},C1,C1,{number},{100 + number},Test Remarks,06/22/21 12:00 PM')
+    return SimpleUploadedFile('cores.csv', '\n'.join(lines).encode('utf-8'), content_type='text/csv')
+
+
+MAPPINGS = b'''
+column_mappings:
+  Well: well
+  Core number: core_number
+  Planned: planned_core_number
+  Section: core_section_number
+  Top: top_depth
+  Remarks: remarks
+  Collected: collection_date
+'''
+
+
+@pytest.mark.django_db
+def test_upload_runs_the_import_and_reports_progress(auth_client, user, well, media):
+    '''
+    AC: An uploaded csv file is imported in the background
+    AC: The progress endpoint reports the rows processed, the rows per second and the errors
+    '''
+    pytest.importorskip('yaml')
+    auth_client.force_login(user)
+    response = auth_client.post(reverse('import_upload'), data={
+        'csv_file': cores_csv(well.name, 3),
+        'mapping_file': SimpleUploadedFile('mappings.yaml', MAPPINGS),
+        'model_name': 'Core',
+    })
+
+    job = ImportJob.objects.get()
+    assert response.status_code == 302
+    assert response.url == reverse('import_job', kwargs={'pk': job.pk})
+
+    progress = auth_client.get(reverse('import_progress', kwargs={'pk': job.pk})).json()
+    assert progress['status'] == 'done'
+    assert progress['rows_total'] == 3
+    assert progress['rows_processed'] == 3
+    assert progress['rows_imported'] == 3
+    assert progress['errors'] == []
+    assert 'rows_per_second' in progress
+
+    cores = Core.objects.filter(well=well).order_by('core_section_number')
+    assert [core.core_section_name for core in cores] == ['Test Well-C1-1', 'Test Well-C1-2', 'Test Well-C1-3']
+    assert cores[0].registered_by == user
+
+
+@pytest.mark.django_db
+def test_import_reports_the_rows_that_fail(user, well, media):
+    '''
+    AC: The rows that can not be imported are reported with their line number, the others are imported
+    '''
+    content = ('well,core_number,planned_core_number,core_section_number,top_depth,remarks\n'
+               f'{well.name},C1,C1,1,100,Test Remarks\n'
+               'Unknown Well,C1,C1,2,101,Test Remarks\n'
+               f'{well.name},C1,C1,3,,Test Remarks\n')
+    job = ImportJob.objects.create(
+        csv_file=SimpleUploadedFile('cores.csv', content.encode('utf-8')),
+        model_name='Core', created_by=user)
+
+    job = run_job(job.pk, chunk_size=2)
+
+    assert job.status == 'done'
+    assert job.rows_processed == 3
+    assert job.rows_imported == 1
+    assert job.rows_failed == 2
+    assert {error['row'] for error in job.errors} == {3, 4}
+    assert Core.objects.filter(well=well).count() == 1
+
+
+@pytest.mark.django_db
+def test_requeued_job_continues_after_the_processed_rows(user, well, media):
+    '''
+    AC: A job that is run again after its worker died does not import the rows it already processed again
+    '''
+    content = ('well,core_number,planned_core_number,core_section_number,top_depth,remarks\n'
+               + ''.join(f'{well.name},C1,C1,{number},{100 + number},Test Remarks\n' for number in range(1, 4)))
+    job = ImportJob.objects.create(
+        csv_file=SimpleUploadedFile('cores.csv', content.encode('utf-8')),
+        model_name='Core', created_by=user, status='running', rows_processed=2, rows_imported=2)
+
+    job = run_job(job.pk)
+
+    assert job.status == 'done'
+    assert job.rows_processed == 3
+    assert job.rows_imported == 3
+    assert list(Core.objects.values_list('core_section_number', flat=True)) == [3]
+
+
+@pytest.mark.django_db
+def test_upload_needs_a_user(non_auth_client, well, media):
+    '''
+    AC: An anonymous upload is sent to the login, no job is created
+    '''
+    response = non_auth_client.post(reverse('import_upload'), data={
+        'csv_file': cores_csv(well.name, 1), 'model_name': 'Core'})
+
+    assert response.status_code == 302
+    assert response.url.startswith(reverse('login'))
+    assert not ImportJob.objects.exists()
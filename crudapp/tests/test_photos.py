@@ -0,0 +1,100 @@
+import os
+import stat
+
+import pytest
+
+from django.urls import reverse
+
+from crudapp.models import Core, Photo
+from crudapp.photos import candidate_names, import_folder, match_files, photo_path, photo_url, process_photo
+
+
+@pytest.fixture(autouse=True)
+def photo_root(settings, tmp_path):
+    settings.PHOTO_ROOT = str(tmp_path / 'photos')
+
+
+@pytest.fixture
+def sections(well, user):
+    return [Core.objects.create(well=well, registered_by=user, core_number='C1', planned_core_number='C1',
+                                core_section_number=number, top_depth=1000.0 + number) for number in (1, 10)]
+
+
+def test_candidate_names():
+    assert candidate_names('W-C1-1_wet (2).jpg') == ['W-C1-1_wet (2)', 'W-C1-1_wet', 'W-C1-1']
+
+
+@pytest.mark.django_db
+def test_files_are_matched_by_sample_name(sections):
+    '''
+    AC: The files are matched to the samples by name, a suffix after the name is allowed
+    '''
+    first, tenth = [section.core_section_name for section in sections]
+    matches = match_files([f'{first}.jpg', f'{tenth}_wet.jpg', 'scale_bar.jpg'])
+    assert matches == {f'{first}.jpg': ('Core', sections[0].pk, sections[0].well_id),
+                       f'{tenth}_wet.jpg': ('Core', sections[1].pk, sections[1].well_id)}
+
+
+@pytest.mark.django_db
+def test_import_folder_stores_content_addressed_derivatives(sections, tmp_path):
+    '''
+    AC: A photo and its thumbnails are stored under the sha256 of the file, a photo imported twice is stored once
+    '''
+    Image = pytest.importorskip('PIL.Image')
+    folder = tmp_path / 'box'
+    folder.mkdir()
+    name = sections[0].core_section_name
+    Image.new('RGB', (2000, 500), 'brown').save(folder / f'{name}.jpg')
+    (folder / f'{name}_copy.jpg').write_bytes((folder / f'{name}.jpg').read_bytes())
+    (folder / 'notes.jpg').write_bytes(b'not a sample')
+
+    report = import_folder(str(folder), workers=1)
+    assert report == {'imported': 1, 'duplicates': 1, 'not_matched': ['notes.jpg'], 'errors': []}
+
+    photo = Photo.objects.get()
+    assert (photo.width, photo.height) == (2000, 500)
+    with Image.open(tmp_path / 'photos' / photo_url(photo, 'thumbnail')[len('/photos/'):]) as thumbnail:
+        assert thumbnail.size == (320, 80)
+
+    assert import_folder(str(folder), workers=1)['imported'] == 0
+
+
+def test_every_derivative_has_its_size(tmp_path):
+    '''
+    AC: The web copy of a large jpeg is not made from the pixels decoded for the thumbnail
+    '''
+    Image = pytest.importorskip('PIL.Image')
+    path = tmp_path / 'box.jpg'
+    Image.new('RGB', (4000, 3000), 'brown').save(path)
+
+    result = process_photo(str(path), str(tmp_path / 'photos'))
+
+    for kind, size in [('web', (1600, 1200)), ('thumbnail', (320, 240))]:
+        with Image.open(photo_path(result['sha256'], kind, root=str(tmp_path / 'photos'))) as derivative:
+            assert derivative.size == size
+
+
+def test_stored_files_are_readable_by_the_web_server(tmp_path):
+    '''
+    AC: The photo and its derivatives can be read by nginx, not only by the user of the workers
+    '''
+    Image = pytest.importorskip('PIL.Image')
+    path = tmp_path / 'box.jpg'
+    Image.new('RGB', (400, 300), 'brown').save(path)
+
+    result = process_photo(str(path), str(tmp_path / 'photos'))
+
+    for kind in ('original', 'web', 'thumbnail'):
+        stored = photo_path(result['sha256'], kind, root=str(tmp_path / 'photos'))
+        assert stat.S_IMODE(os.stat(stored).st_mode) == 0o644
+
+
+@pytest.mark.django_db
+def test_core_box_page_links_the_thumbnails(sections, well, user, non_auth_client):
+    photo = Photo.objects.create(well=well, sample_model='Core', sample_id=sections[0].pk, sha256='ab' * 32,
+                                 extension='.jpg', filename='box.jpg', width=4000, height=1000, size=20000000)
+    non_auth_client.force_login(user)
+    content = non_auth_client.get(reverse('core_box', kwargs={'pk': well.pk}), {'core_number': 'C1'}).content.decode()
+    assert photo_url(photo, 'thumbnail') in content
+    assert photo_url(photo, 'web') in content
+    assert photo_url(photo, 'original') not in content
@@ -0,0 +1,80 @@
+import pytest
+
+from django.urls import reverse
+
+from crudapp.curves import lttb, save_curve
+from crudapp.models import Core, CoreChip, Cuttings, Well
+from crudapp.plots import depth_tracks, interval_track
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+
+
+@pytest.fixture
+def samples(well, user):
+    cores = [Core.objects.create(well=well, registered_by=user, core_number='C1', planned_core_number='C1',
+                                 core_section_number=number, top_depth=top, bottom_depth=top + 1)
+             for number, top in [(1, 1000.0), (2, 1001.0), (3, 1050.0)]]
+    Cuttings.objects.bulk_create([Cuttings(well=well, registered_by=user, cuttings_number=number,
+                                           cuttings_name=f'Test Well-CU-{number}', cuttings_depth=1000.0 + number / 100)
+                                  for number in range(1, 1000)])
+    return cores
+
+
+def test_interval_track_merges_the_covered_pixels():
+    intervals = np.array([[0.0, 10.0], [10.0, 20.0], [50.0, np.nan], [200.0, 300.0]])
+    assert interval_track(intervals, 0.0, 100.0, 10) == [[0.0, 30.0], [50.0, 60.0]]
+
+
+def test_lttb_keeps_the_ends_and_the_spikes():
+    depths = np.arange(10000, dtype=float)
+    values = np.zeros(10000)
+    values[4321] = 5.0
+    kept_depths, kept_values = lttb(depths, values, 100)
+    assert len(kept_depths) == 100
+    assert (kept_depths[0], kept_depths[-1]) == (0.0, 9999.0)
+    assert 5.0 in kept_values
+
+
+@pytest.mark.django_db
+def test_depth_tracks_are_reduced_to_the_height(samples, well):
+    '''
+    AC: Every track has at most a few points per pixel of the plot
+    AC: Without a window the plot covers the whole well
+    '''
+    save_curve(samples[0], 'gamma_ray', np.arange(1000.0, 1001.0, 0.0001), np.random.default_rng(1).random(10000))
+    well = Well.objects.get(pk=well.pk)
+
+    tracks = depth_tracks(well, height=100)
+    assert (tracks['top'], tracks['bottom']) == (1000.0, 1051.0)
+    assert np.allclose(tracks['cores'], [[1000.0, 1002.04], [1049.98, 1051.0]])
+    assert len(tracks['cuttings']) <= 100
+    assert sum(count for _, count in tracks['cuttings']) == 999
+    assert len(tracks['curves']['gamma_ray']['depth']) <= 200
+
+    tracks = depth_tracks(well, top=1000.0, bottom=1001.0, height=50, method='lttb')
+    assert len(tracks['curves']['gamma_ray']['depth']) == 100
+
+    with pytest.raises(ValueError):
+        depth_tracks(well, height=0)
+
+
+@pytest.mark.django_db
+def test_depth_tracks_are_cached_per_version_of_the_well(samples, well, user, non_auth_client):
+    '''
+    AC: The tracks are cached per version of the well and per window, a new sample shows up at once
+    '''
+    non_auth_client.force_login(user)
+    url = reverse('depth_tracks', kwargs={'pk': well.pk})
+    assert non_auth_client.get(url, {'top': 1000, 'bottom': 1100, 'height': 100}).json()['corechips'] == []
+
+    CoreChip.objects.create(well=well, registered_by=user, core_section_name=samples[0].core_section_name,
+                            corechip_depth=1000.5, top_depth=1000.0)
+    response = non_auth_client.get(url, {'top': 1000, 'bottom': 1100, 'height': 100})
+    assert response.json()['corechips'] == [[1000.0, 1]]
+
+    assert non_auth_client.get(url, {'method': 'spline'}).status_code == 400
@@ -0,0 +1,129 @@
+import os
+
+import pytest
+
+from django.core.management import call_command
+from django.db.models.signals import post_delete
+
+from crudapp.archive import archive_well
+from crudapp.audit import audit_log
+from crudapp.models import AuditEntry, Core, CoreArchive, Well
+from crudapp.purge import chunks, needs_collector, purge, purge_well
+
+
+@pytest.fixture
+def cores(well, user):
+    return [Core.objects.create(well=well, registered_by=user, core_number='C1', planned_core_number='C1',
+                                core_section_number=number, top_depth=float(number)) for number in range(1, 8)]
+
+
+@pytest.mark.django_db
+def test_chunks_split_the_primary_keys(cores):
+    queryset = Core.objects.all()
+    sizes = [chunk.count() for chunk in chunks(queryset, 3)]
+    assert sizes == [3, 3, 1]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_purge_deletes_without_the_collector(settings, tmp_path, cores, well):
+    '''
+    AC: The samples are deleted in chunks with set based deletes, the progress is reported
+    AC: The audit log and the version of the well still follow the deletes
+    '''
+    settings.AUDIT_SPOOL_DIR = tmp_path
+    assert not needs_collector(Core)
+    version = Well.objects.get(pk=well.pk).version
+    reported = []
+
+    deleted = purge(Core.objects.filter(well=well), chunk_size=3,
+                    progress=lambda model, done, total: reported.append((done, total)))
+
+    assert deleted == 7
+    assert reported == [(3, 7), (6, 7), (7, 7)]
+    assert not Core.objects.exists()
+    assert Well.objects.get(pk=well.pk).version > version
+
+    audit_log.flush()
+    assert AuditEntry.objects.filter(model='crudapp.core', action='delete').count() == 7
+
+
+@pytest.mark.django_db
+def test_unknown_receivers_use_the_collector(cores):
+    seen = []
+
+    def receiver(sender, instance, **kwargs):
+        seen.append(instance.pk)
+
+    post_delete.connect(receiver, sender=Core, dispatch_uid='test_receiver')
+    try:
+        assert needs_collector(Core)
+        assert purge(Core.objects.all(), chunk_size=3) == 7
+    finally:
+        post_delete.disconnect(dispatch_uid='test_receiver', sender=Core)
+    assert sorted(seen) == sorted(core.pk for core in cores)
+
+
+@pytest.mark.django_db
+def test_purge_well_command(cores, well, user):
+    archive_well(well)
+    Core.objects.create(well=Well.objects.create(name='Other Well'), registered_by=user, core_number='C1',
+                        planned_core_number='C1', core_section_number=1, top_depth=1.0)
+
+    call_command('purge_well', 'Test Well', '--chunk-size', '2')
+
+    assert not Well.objects.filter(name='Test Well').exists()
+    assert not CoreArchive.objects.exists()
+    assert Core.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_purge_well_can_keep_the_well(cores, well):
+    assert purge_well(well, keep_well=True)['Core'] == 7
+    assert Well.objects.filter(pk=well.pk).exists()
+
+
+@pytest.mark.django_db
+def test_deleted_sections_take_their_files_along(settings, tmp_path, cores, well, django_capture_on_commit_callbacks):
+    '''
+    AC: Deleting a section, alone or with purge, deletes its curves, its CT volumes and its photos with their files
+    AC: A photo file that another sample still has is kept
+    '''
+    from crudapp.curves import save_curve
+    from crudapp.models import CtVolume, MeasurementCurve, Photo
+    from crudapp.photos import photo_path
+    pytest.importorskip('numpy')
+    settings.MEDIA_ROOT = tmp_path
+    settings.CT_VOLUME_ROOT = str(tmp_path / 'ct')
+    settings.PHOTO_ROOT = str(tmp_path / 'photos')
+    settings.AUDIT_SPOOL_DIR = tmp_path
+
+    files = []
+    for core in cores[:2]:
+        curve = save_curve(core, 'gamma_ray', [1.0, 2.0], [3.0, 4.0])
+        volume = CtVolume.objects.create(well=well, core_id=core.pk, directory=f'{well.pk}/{core.pk}-ct-1',
+                                         slices=1, height=1, width=1, dtype='<u2', tile_size=256)
+        (tmp_path / 'ct' / volume.directory).mkdir(parents=True)
+        files += [curve.data.path, tmp_path / 'ct' / volume.directory]
+    for core, sha256 in [(cores[0], 'a' * 64), (cores[1], 'b' * 64), (cores[2], 'b' * 64)]:
+        Photo.objects.create(well=well, sample_model='Core', sample_id=core.pk, sha256=sha256, extension='.jpg',
+                             filename='box.jpg', width=1, height=1, size=1)
+    for sha256 in ('a' * 64, 'b' * 64):
+        path = photo_path(sha256, 'original')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'w').close()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Core.objects.get(pk=cores[0].pk).delete()
+    assert not os.path.exists(files[0]) and not os.path.exists(files[1])
+    assert not os.path.exists(photo_path('a' * 64, 'original'))
+    assert MeasurementCurve.objects.count() == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        purge(Core.objects.filter(pk=cores[1].pk))
+    assert not any(os.path.exists(path) for path in files)
+    assert not MeasurementCurve.objects.exists() and not CtVolume.objects.exists()
+    assert list(Photo.objects.values_list('sample_id', flat=True)) == [cores[2].pk]
+    # The third section still has the photo
+    assert os.path.exists(photo_path('b' * 64, 'original'))
+    # The audit entries of the deletes stay in this test
+    audit_log.flush()
@@ -0,0 +1,75 @@
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from crudapp.archive import archive_well
+from crudapp.models import Core, CoreArchive, Cuttings, Well
+from crudapp.rename import checksum, rename_well
+
+
+@pytest.fixture
+def cuttings(well, user):
+    return Cuttings.objects.create(well=well, registered_by=user, cuttings_number=1,
+                                   cuttings_name='Test Well-CU-1', cuttings_depth=10.0)
+
+
+@pytest.mark.django_db
+def test_rename_well_rewrites_the_sample_names(core, cuttings, well, user):
+    '''
+    AC: Renaming a well renames the samples whose names are built from it, hot and archived
+    AC: The names of the samples of other wells that share the prefix do not change
+    '''
+    other = Core.objects.create(well=Well.objects.create(name='Test Well-2'), registered_by=user,
+                                core_number='C1', planned_core_number='C1', core_section_number=1, top_depth=1.0)
+    version = well.version
+
+    renamed = rename_well(well, 'Renamed Well')
+
+    well.refresh_from_db()
+    assert well.name == 'Renamed Well'
+    assert well.version > version
+    assert renamed['Core'] == 1
+    assert renamed['Cuttings'] == 1
+    assert Core.objects.get(pk=core.pk).core_section_name == 'Renamed Well-C1-1'
+    assert Cuttings.objects.get(pk=cuttings.pk).cuttings_name == 'Renamed Well-CU-1'
+    assert Core.objects.get(pk=other.pk).core_section_name == 'Test Well-2-C1-1'
+
+    archive_well(well)
+    rename_well(well, 'Archived Well')
+    assert CoreArchive.objects.get().core_section_name == 'Archived Well-C1-1'
+
+
+@pytest.mark.django_db
+def test_rename_well_to_an_existing_name_changes_nothing(core, well):
+    Well.objects.create(name='Taken')
+    with pytest.raises(ValueError):
+        rename_well(well, 'Taken')
+
+    well.refresh_from_db()
+    assert well.name == 'Test Well'
+    assert Core.objects.get().core_section_name == 'Test Well-C1-1'
+
+
+@pytest.mark.django_db
+def test_checksum_counts_the_names_in_one_query(core, well, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        sums = checksum(well, 'Test Well-')
+    assert sums['Core_core_section_name_count'] == 1
+    assert sums['Core_core_section_name_length'] == len('Test Well-C1-1')
+    assert sums['CoreArchive_core_section_name_count'] == 0
+
+
+@pytest.mark.django_db
+def test_rename_well_command_and_admin_action(admin_client, core, well):
+    call_command('rename_well', 'Test Well', 'DEL-GT-01')
+    assert Core.objects.get().core_section_name == 'DEL-GT-01-C1-1'
+
+    url = reverse('admin:crudapp_well_changelist')
+    data = {'action': 'rename_selected_well', '_selected_action': [well.pk]}
+    response = admin_client.post(url, data)
+    assert 'new_name' in response.content.decode()
+
+    response = admin_client.post(url, {**data, 'apply': '1', 'new_name': 'DEL-GT-02'})
+    assert response.status_code == 302
+    assert Core.objects.get().core_section_name == 'DEL-GT-02-C1-1'
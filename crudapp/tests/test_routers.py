@@ -0,0 +1,79 @@
+import pytest
+
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.views.generic import View
+
+from crudapp.models import Core
+from crudapp.routers import ReplicaMiddleware, ReplicaReadMixin, ReplicaRouter, PIN_COOKIE
+
+
+@pytest.fixture
+def replica(settings):
+    settings.REPLICA_DATABASE = 'replica'
+
+
+class ReportView(ReplicaReadMixin, View):
+    pass
+
+
+def run(request, write=False, view_class=ReportView):
+    ''' Send a request through the middleware, returns the response and the
+    database that the router chose for reading cores and users
+    '''
+    router = ReplicaRouter()
+    chosen = {}
+
+    def view(request):
+        if write:
+            router.db_for_write(Core)
+        chosen['core'] = router.db_for_read(Core)
+        chosen['user'] = router.db_for_read(User)
+        return HttpResponse()
+    view.view_class = view_class
+
+    def get_response(request):
+        middleware.process_view(request, view, (), {})
+        return view(request)
+
+    middleware = ReplicaMiddleware(get_response)
+    return middleware(request), chosen
+
+
+def test_read_only_views_read_from_the_replica(replica, request_factory):
+    '''
+    AC: The GET requests of the read-only views read the samples from the replica
+    AC: The sessions and the users are always read from the primary
+    '''
+    response, chosen = run(request_factory.get('/wells/'))
+
+    assert chosen == {'core': 'replica', 'user': None}
+    assert PIN_COOKIE not in response.cookies
+
+
+def test_other_views_read_from_the_primary(replica, request_factory):
+    _, chosen = run(request_factory.get('/wells/1/cores/create/'), view_class=View)
+    assert chosen['core'] is None
+
+    _, chosen = run(request_factory.post('/wells/'))
+    assert chosen['core'] is None
+
+
+def test_reads_after_a_write_stick_to_the_primary(replica, request_factory):
+    '''
+    AC: After a write the reads of the same request and of the next requests go to the primary
+    '''
+    response, chosen = run(request_factory.post('/cores/create/'), write=True, view_class=View)
+    assert chosen['core'] is None
+    assert response.cookies[PIN_COOKIE]['max-age'] > 0
+
+    request = request_factory.get('/wells/')
+    request.COOKIES[PIN_COOKIE] = '1'
+    _, chosen = run(request)
+    assert chosen['core'] is None
+
+
+def test_without_replica_everything_reads_from_the_primary(settings, request_factory):
+    settings.REPLICA_DATABASE = None
+    _, chosen = run(request_factory.get('/wells/'))
+    assert chosen['core'] is None
@@ -0,0 +1,41 @@
+import pytest
+
+from django.urls import reverse
+
+from crudapp.models import Core
+from crudapp.search import search, trigrams
+
+
+def test_trigrams():
+    assert trigrams('Sand') == {'  s', ' sa', 'san', 'and', 'nd '}
+    assert trigrams('') == set()
+
+
+@pytest.mark.django_db
+def test_search_by_name_prefix(core):
+    results = search('Test Well-C1')
+
+    assert results[0] == {'type': 'core', 'id': core.pk, 'name': core.core_section_name, 'well': 'Test Well'}
+
+
+@pytest.mark.django_db
+def test_search_by_lithology(core, well, user):
+    sandstone = Core.objects.create(well=well, registered_by=user, remarks="Test Remarks",
+                                    lithology="Fine sandstone", core_number="C2",
+                                    planned_core_number="C2", core_section_number=1, top_depth=150.0)
+
+    results = search('sandstone', sample_type='core')
+
+    assert [result['id'] for result in results] == [sandstone.pk]
+
+
+@pytest.mark.django_db
+def test_search_view(auth_client, user, core):
+    auth_client.force_login(user)
+    response = auth_client.get(reverse('search'), {'q': 'lithology', 'type': 'core'})
+
+    assert response.status_code == 200
+    assert response.json()['results'][0]['id'] == core.pk
+
+    response = auth_client.get(reverse('search'), {'q': 'lithology', 'type': 'rock'})
+    assert response.status_code == 400
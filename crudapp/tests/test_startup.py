@@ -0,0 +1,69 @@
+'''
+Story: Workers and management commands should start fast, heavy libraries are
+only imported by the code that actually uses them.
+The tests start a fresh interpreter with `python -X importtime` so that they measure
+a cold start and not the modules that pytest already imported.
+'''
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Libraries that take longer to import than django itself
+HEAVY_MODULES = ['pandas', 'yaml', 'numpy', 'pyarrow', 'PIL']
+
+# Seconds that a cold start of django with all the url patterns and commands may take
+COLD_START_BUDGET = float(os.environ.get('COLD_START_BUDGET', 5.0))
+
+COLD_START = '''
+import sys, time
+start = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+import importlib
+from django.core.management import get_commands
+for name, app in get_commands().items():
+    # run_mapping is a script that processes files when it is imported
+    if app == 'crudapp' and name != 'run_mapping':
+        importlib.import_module(f'crudapp.management.commands.{name}')
+print(time.perf_counter() - start)
+print(' '.join(sorted(sys.modules)))
+'''
+
+
+def parse_importtime(stderr):
+    ''' The cumulative import time in microseconds of every top level package
+    '''
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.fixture(scope='module')
+def cold_start():
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', COLD_START],
+                            capture_output=True, text=True, env=dict(os.environ), cwd=root)
+    assert result.returncode == 0, result.stderr[-2000:]
+    seconds, modules = result.stdout.strip().splitlines()[-2:]
+    return float(seconds), set(modules.split()), parse_importtime(result.stderr)
+
+
+def test_startup_does_not_import_heavy_modules(cold_start):
+    _, modules, _ = cold_start
+    imported = [module for module in HEAVY_MODULES if module in modules]
+    assert imported == []
+
+
+def test_cold_start_time(cold_start):
+    seconds, _, times = cold_start
+    slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)[:10]
+    assert seconds < COLD_START_BUDGET, f'Cold start took {seconds:.2f}s, slowest imports (us): {slowest}'
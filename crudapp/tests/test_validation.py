@@ -0,0 +1,39 @@
+import pytest
+from pydantic import ValidationError
+
+from crudapp.forms import WellForm
+from crudapp.validation import registry
+
+
+def test_registry_is_built_on_startup():
+    assert registry.is_built
+    assert set(registry.validators) == {'Well', 'Core', 'CoreChip', 'Cuttings', 'MicroCore'}
+
+
+def test_validate_many():
+    results = registry.validate_many('Well', [{'id': 1, 'name': 'Well 1'}, {'id': 2}])
+
+    assert results[0].name == 'Well 1'
+    assert type(results[1]) is ValidationError
+
+
+def test_add_errors_to_form():
+    form = WellForm(data={})
+    checked_well = registry.validate('Well', {'id': 1})
+
+    registry.add_errors(form, checked_well, 'Well')
+
+    assert 'name' in form.errors
+
+
+def test_add_errors_with_prefix():
+    '''
+    AC: The errors of one sample of a batch name the sample
+    '''
+    form = WellForm(data={})
+    checked_core = registry.validate('Core', {'id': 1})
+
+    registry.add_errors(form, checked_core, 'Core', prefix='Test Well-C1-2')
+
+    assert form.non_field_errors()
+    assert all(message.startswith('Test Well-C1-2 ') for message in form.non_field_errors())
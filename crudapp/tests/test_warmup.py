@@ -0,0 +1,17 @@
+import pytest
+
+from crudapp.warmup import template_names, warm_up
+
+
+def test_template_names():
+    names = template_names()
+
+    assert 'base.html' in names
+    assert 'registration/login.html' in names
+
+
+@pytest.mark.django_db
+def test_warm_up_runs_every_step():
+    timings = warm_up()
+
+    assert set(timings) == {'templates', 'urls', 'database', 'caches'}
@@ -101,4 +101,37 @@ def test_well_form_view():
     request = RequestFactory().post(reverse('well_list'), data=form_data)
     response = view(request)
     assert response.status_code == 200
-    assert not response.context_data['form'].is_valid()
\ No newline at end of file
+    assert not response.context_data['form'].is_valid()
+
+@pytest.mark.django_db
+def test_well_version_follows_sample_writes(well, core):
+    well.refresh_from_db()
+    version = well.version
+
+    core.remarks = 'New remarks'
+    core.save()
+
+    well.refresh_from_db()
+    assert well.version == version + 1
+
+
+@pytest.mark.django_db
+def test_well_pages_conditional_get(auth_client, user, well, core):
+    auth_client.force_login(user)
+    url = reverse('select_core_number', kwargs={'pk': well.pk})
+
+    response = auth_client.get(url)
+    assert response.status_code == 200
+    etag = response['ETag']
+
+    response = auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    # Any write to a sample of the well invalidates the page
+    core.remarks = 'New remarks'
+    core.save()
+    response = auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+    response = auth_client.get(reverse('well_list'))
+    assert auth_client.get(reverse('well_list'), HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
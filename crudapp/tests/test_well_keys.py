@@ -0,0 +1,69 @@
+import pytest
+
+from django.core.management import call_command
+from django.db import connection
+
+from crudapp.forms import CoreChipForm
+from crudapp.models import Core, Well
+from crudapp.well_keys import add_column, backfill, table_state
+
+
+@pytest.fixture
+def legacy_table():
+    ''' A sample table of before the conversion, the well is stored by name
+    '''
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE TABLE legacy_samples (id integer PRIMARY KEY, well_id varchar(255) NOT NULL)')
+    yield 'legacy_samples'
+    with connection.cursor() as cursor:
+        cursor.execute('DROP TABLE legacy_samples')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_backfill_copies_the_well_ids_in_chunks(legacy_table):
+    '''
+    AC: The ids of the wells are filled in chunks of rows, running it again only fills the new rows
+    '''
+    first, second = Well.objects.create(name='Well A'), Well.objects.create(name='Well B')
+    with connection.cursor() as cursor:
+        cursor.executemany('INSERT INTO legacy_samples (id, well_id) VALUES (%s, %s)',
+                           [(1, 'Well A'), (2, 'Well B'), (3, 'Well A'), (7, 'Well B')])
+
+    assert table_state(legacy_table) == 'name'
+    assert add_column(legacy_table)
+    assert not add_column(legacy_table)
+
+    chunks = []
+    filled, missing = backfill(legacy_table, chunk_size=2, progress=lambda *args: chunks.append(args))
+    assert (filled, missing) == (4, 0)
+    assert [done for _, done, _ in chunks] == [2, 4, 6, 7]
+
+    with connection.cursor() as cursor:
+        cursor.execute("INSERT INTO legacy_samples (id, well_id) VALUES (8, 'Well A')")
+        assert backfill(legacy_table, chunk_size=2) == (1, 0)
+        cursor.execute('SELECT id, well_ref FROM legacy_samples ORDER BY id')
+        assert cursor.fetchall() == [(1, first.pk), (2, second.pk), (3, first.pk), (7, second.pk), (8, first.pk)]
+
+
+@pytest.mark.django_db
+def test_new_tables_are_already_converted():
+    assert table_state(Core._meta.db_table) == 'converted'
+    assert table_state('crudapp_does_not_exist') == 'missing'
+    call_command('migrate_well_keys')
+
+
+@pytest.mark.django_db
+def test_forms_still_take_the_well_name(well):
+    '''
+    AC: The forms keep sending the name of the well, the sample stores its id
+    '''
+    form = CoreChipForm(data={'well': well.name, 'core_number': 'C1', 'core_section_number': 1,
+                              'core_section_name': 'Test Well-C1-1', 'remarks': 'Test'})
+    form.is_valid()
+    assert 'well' not in form.errors
+    assert form.cleaned_data['well'] == well
+
+    # The payloads built from the instances carry the id
+    form = CoreChipForm(data={'well': str(well.pk)})
+    form.is_valid()
+    assert form.cleaned_data['well'] == well
@@ -0,0 +1,121 @@
+''' Registry of the pydantic validators of the datamodel package.
+
+The registry is built once when the app is ready, so the views, the api and the
+importers do not have to look up the pydantic model and work out how its fields
+map onto the django forms on every request.
+
+Example:
+>>> from crudapp.validation import registry
+>>> checked_core = registry.validate('Core', post_data)
+>>> if type(checked_core) is ValidationError:
+>>>     registry.add_errors(form, checked_core, 'Core')
+'''
+from typing import List
+
+from pydantic import ValidationError
+
+# The models that exist both in datamodel and in the django ORM with the same name
+MODEL_NAMES = ['Well', 'Core', 'CoreChip', 'Cuttings', 'MicroCore']
+
+
+def _pydantic_fields(model):
+    # pydantic 2 renamed __fields__ to model_fields
+    return getattr(model, 'model_fields', None) or getattr(model, '__fields__', {})
+
+
+class ValidatorRegistry:
+    def __init__(self):
+        self.models = {}
+        self.validators = {}
+        self.list_validators = {}
+        self.field_maps = {}
+
+    @property
+    def is_built(self):
+        return bool(self.validators)
+
+    def build(self, model_names=MODEL_NAMES):
+        ''' Look up every pydantic model and prepare its validators and the
+        mapping of its fields onto the fields of the django form of the same model
+        '''
+        # Here we have access to the pydantic models,
+        # we keep datamodel as a namespace to avoid confusion with the django models
+        import datamodel
+        from .forms import WellForm, CoreForm, CoreChipForm, CuttingsForm, MicroCoreForm
+
+        forms = {
+            'Well': WellForm,
+            'Core': CoreForm,
+            'CoreChip': CoreChipForm,
+            'Cuttings': CuttingsForm,
+            'MicroCore': MicroCoreForm,
+        }
+
+        for model_name in model_names:
+            model = getattr(datamodel, model_name)
+            self.models[model_name] = model
+
+            if hasattr(model, 'model_validate'):
+                from pydantic import TypeAdapter
+                self.validators[model_name] = model.model_validate
+                self.list_validators[model_name] = TypeAdapter(List[model]).validate_python
+            else:
+                self.validators[model_name] = model.parse_obj
+
+            # Errors of fields that are not displayed in the form become non field errors
+            form_fields = forms[model_name].base_fields if model_name in forms else {}
+            self.field_maps[model_name] = {
+                field: field if field in form_fields else None
+                for field in _pydantic_fields(model)
+            }
+
+    def get_validator(self, model_name):
+        if not self.is_built:
+            self.build()
+        return self.validators[model_name]
+
+    def validate(self, model_name, payload):
+        ''' Validate a single payload, returns the pydantic model instance
+        or the ValidationError if the payload is invalid
+        '''
+        try:
+            return self.get_validator(model_name)(payload)
+        except ValidationError as e:
+            return e
+
+    def validate_many(self, model_name, payloads):
+        ''' Validate a batch of payloads, returns a list with a pydantic model instance
+        or a ValidationError for each payload.
+        With pydantic 2 the whole batch goes through one list validator and we only
+        fall back to validating one by one when something in the batch is invalid.
+        '''
+        self.get_validator(model_name)
+        list_validator = self.list_validators.get(model_name)
+        if list_validator is not None:
+            try:
+                return list_validator(payloads)
+            except ValidationError:
+                pass
+        return [self.validate(model_name, payload) for payload in payloads]
+
+    def add_errors(self, form, error, model_name, prefix=None):
+        ''' Copy the errors of a pydantic ValidationError onto a django form.
+        With a prefix, e.g. the name of one sample of a batch, they are all errors of the whole form
+        that start with the prefix
+        '''
+        field_map = self.field_maps.get(model_name, {})
+        for item in error.errors():
+            field = item['loc'][0] if item['loc'] else None
+            if prefix is not None:
+                form.add_error(None, f"{prefix} {field}: {item['msg']}")
+                continue
+            form_field = field_map.get(field)
+            if form_field not in form.fields:
+                form_field = None
+            if form_field is None and field is not None:
+                form.add_error(None, f"{field}: {item['msg']}")
+            else:
+                form.add_error(form_field, item['msg'])
+
+
+registry = ValidatorRegistry()
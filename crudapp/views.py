@@ -2,24 +2,40 @@ import pprint as pp
 import json
 
 from typing import Any, Dict
-from django.http import HttpRequest, HttpResponse
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import render
 
 # Create your views here.
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Max
+from django.db import transaction
+from django.db.models import Max, Sum, Count
 from django.views.generic import ListView, DetailView, FormView, View
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.forms.models import model_to_dict
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
 
-from .models import Contact, Well, Core, CoreChip
-from .forms import ContactForm, WellForm, CoreForm, CoreChipForm, MicroCoreForm, CuttingsForm
+from .models import Contact, Well, Core, CoreChip, ImportJob, CtVolume, next_core_section_number
+from .forms import ContactForm, WellForm, CoreForm, CoreChipForm, MicroCoreForm, CuttingsForm, CoreBatchForm, core_section_formset, ImportJobForm, BulkEditForm
 
 from pydantic import ValidationError
 
-# Here we have access to the pydantic models,
-# we keep datamodel as a namespace to avoid confusion with the django models
-import datamodel
+from .validation import registry
+from .signals import samples_changed
+from .audit import record_bulk
+from .samples import bulk_create, closed_well_message
+from .routers import ReplicaReadMixin
+from .archive import with_archive
+from . import search
+from .autocomplete import name_index, DEFAULT_LIMIT as AUTOCOMPLETE_LIMIT
+from .jobs import enqueue
+from .bulk_edit import bulk_edit, BULK_EDIT_MODELS
+# The modules that import numpy are only imported by the views that use them
+from . import photos
 
 def set_well_name(view_instance, well_name):
     view_instance.well_name = well_name
@@ -43,10 +59,56 @@ def set_success_url(view_instance, url_name):
     else:
         raise Exception('Well is None')
 
-def calculate_next_core_section_number(Core, core_number):
-    latest_number = Core.objects.filter(core_number=core_number).aggregate(
-        Max('core_section_number'))['core_section_number__max']
-    return latest_number + 1 if latest_number is not None else 1
+def calculate_next_core_section_number(Core, core_number, well):
+    # The same rule as the batches and Core.save, per well and core number
+    return next_core_section_number(well, core_number)
+
+def allocate_core_section_numbers(Core, well, core_number, count):
+    ''' Reserve `count` consecutive core section numbers for a core run of a well.
+    It must be called inside a transaction after locking the well row, otherwise
+    two rigs registering the same core at the same time could get the same numbers.
+    '''
+    first_number = next_core_section_number(well, core_number)
+    return range(first_number, first_number + count)
+
+def _well_stamp(request, pk):
+    ''' The version and modification date of a well, read once per request.
+    It is all we need to know whether the pages of a well changed, without running their queries.
+    '''
+    if not hasattr(request, '_well_stamps'):
+        request._well_stamps = {}
+    if pk not in request._well_stamps:
+        request._well_stamps[pk] = Well.objects.filter(pk=pk).values_list('version', 'modified_at').first()
+    return request._well_stamps[pk]
+
+def _wells_stamp(request):
+    ''' The same as _well_stamp for the pages that show all the wells
+    '''
+    if not hasattr(request, '_wells_stamp'):
+        request._wells_stamp = Well.objects.aggregate(
+            count=Count('pk'), last_pk=Max('pk'), version=Sum('version'), modified_at=Max('modified_at'))
+    return request._wells_stamp
+
+def well_etag(request, *args, **kwargs):
+    stamp = _well_stamp(request, kwargs['pk'])
+    if stamp is None:
+        return None
+    return f'well-{kwargs["pk"]}-{stamp[0]}-{request.user.pk}'
+
+def well_last_modified(request, *args, **kwargs):
+    stamp = _well_stamp(request, kwargs['pk'])
+    return stamp[1] if stamp is not None else None
+
+def wells_etag(request, *args, **kwargs):
+    stamp = _wells_stamp(request)
+    return f'wells-{stamp["count"]}-{stamp["last_pk"]}-{stamp["version"] or 0}-{request.user.pk}'
+
+def wells_last_modified(request, *args, **kwargs):
+    return _wells_stamp(request)['modified_at']
+
+# Answer with a 304 Not Modified when the browser already has the current version of the page
+well_conditional = method_decorator(condition(etag_func=well_etag, last_modified_func=well_last_modified))
+wells_conditional = method_decorator(condition(etag_func=wells_etag, last_modified_func=wells_last_modified))
 
 class IndexView(ListView):
     template_name = 'index.html'
@@ -99,7 +161,8 @@ def get_well_from_pk(well_pk, Well):
 def _validate(payload, **kwargs):
     ''' How it works:
     - Get the name of the model that we're working with, Such model has a class
-    in pydantic, for example Well and also on Django ORM with the same name
+    in pydantic, for example Well and also on Django ORM with the same name.
+    The pydantic validators are prepared once by the registry in crudapp.validation
     - Get the data from the POST request
     - Add an ID to the data (if one doesn't already exist) this is required for pydantic to work
     because the id is part of the data model in pydantic.
@@ -118,19 +181,12 @@ def _validate(payload, **kwargs):
     '''
     model_name = kwargs.get('model_name')
 
-    try:
-        # Get the correct model class for example Well, or Core
-        model = getattr(datamodel, model_name)
-
-        # Create a new instance of the specified model using the provided data
-        # This will raise a ValidationError if the data is invalid
-        validated_data = model(**payload)
-    except ValidationError as e:
-        return e
-    return validated_data
+    # The registry already has the pydantic model of every django model, for example Well, or Core
+    # It returns the ValidationError instead of raising it if the data is invalid
+    return registry.validate(model_name, payload)
 
 
-class HomeView(ListView):
+class HomeView(ReplicaReadMixin, ListView):
     template_name = 'index.html'
     context_object_name = 'well_list'
 
@@ -143,10 +199,11 @@ class HomeView(ListView):
             return render(request, self.template_name, {'wells': None})
 
 
-class WellListView(ListView):
+class WellListView(ReplicaReadMixin, ListView):
     template_name = 'well_list.html'
     context_object_name = 'well_list'
 
+    @wells_conditional
     def get(self, request, *args, **kwargs):
         # A list of all the wells in the database
         try:
@@ -204,10 +261,7 @@ class WellFormView(FormView):
         if checked_well is not None:
             if type(checked_well) is ValidationError:
                 form = self.get_form()
-                for error in checked_well.errors():
-                    field = error['loc'][0]
-                    message = error['msg']
-                    form.add_error(field, message)
+                registry.add_errors(form, checked_well, 'Well')
                 return self.form_invalid(form)
 
         # Reject entry if the selected Well already exists in the database
@@ -226,7 +280,7 @@ class WellFormView(FormView):
             return self.form_invalid(form)
 
 
-class CoreNumberSelectView(ListView):
+class CoreNumberSelectView(ReplicaReadMixin, ListView):
     ''' This view is used to list all the cores that belong to a well
     '''
     model = Well
@@ -234,13 +288,16 @@ class CoreNumberSelectView(ListView):
     context_object_name = 'select_core_number'
     success_url = reverse_lazy('core_form')
 
+    @well_conditional
     def get(self, request, *args, **kwargs):
         try:
             well = get_well_from_pk(well_pk=self.kwargs['pk'], Well=self.model)
-            cores = Core.objects.filter(well=well)
+            # The queryset is lazy, it only runs when the cached table of the template is rendered
+            cores = with_archive(Core, well=well).order_by('core_number', 'core_section_number')
 
             return render(request, self.template_name, {'well': well,
-                                                        'core_form': cores})
+                                                        'core_form': cores,
+                                                        'fragment_cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT})
         except Well.DoesNotExist:
             return render(request, self.template_name, {'well': None, 'core_form': None})
 
@@ -276,7 +333,7 @@ class CoreFormView(FormView):
 
         core_number = self.request.GET.get('core_number')
         initial['core_number'] = core_number
-        initial['core_section_number'] = calculate_next_core_section_number(Core, core_number)   
+        initial['core_section_number'] = calculate_next_core_section_number(Core, core_number, well_name)
         return initial
 
     # Create section name based on the well name, the core number and the core section number
@@ -301,7 +358,7 @@ class CoreFormView(FormView):
         core_section_name = f"{post_data.get('well')}-{post_data.get('core_number')}-{post_data.get('core_section_number')}"
         post_data['core_section_name'] = core_section_name
 
-        if Core.objects.filter(core_section_name=core_section_name).exists():
+        if with_archive(Core, core_section_name=core_section_name).exists():
             form = self.get_form()
             form.add_error(
                 'core_section_name', f'A core with name {core_section_name} already exists. Please try again with a number bigger than {post_data.get("core_section_number") }.')
@@ -312,10 +369,7 @@ class CoreFormView(FormView):
         if checked_core is not None:
             if checked_core is ValidationError:
                 form = self.get_form()
-                for error in checked_core.errors():
-                    field = error['loc'][0]
-                    message = error['msg']
-                    form.add_error(field, message)
+                registry.add_errors(form, checked_core, 'Core')
 
                 return self.form_invalid(form)
 
@@ -329,17 +383,121 @@ class CoreFormView(FormView):
             print(form.errors)
             return self.form_invalid(form)
 
-class CoreChipSelectView(ListView):
+class CoreBatchFormView(FormView):
+    '''This view is used to register all the sections of a core run at once
+    AC: The user enters the shared core data once and one row per section
+    to this url: well/<pk>/cores/batch/?core_number=C1&sections=9
+    AC: The section numbers are consecutive and all sections are inserted together or not at all
+    '''
+    template_name = 'core_batch.html'
+    form_class = CoreBatchForm
+    success_url = reverse_lazy('create_sample')
+    # A core run is at most a few tens of one meter sections
+    max_sections = 30
+
+    well = None
+
+    def get_initial(self):
+        initial = super().get_initial()
+        initial['core_number'] = self.request.GET.get('core_number')
+        initial['planned_core_number'] = self.request.GET.get('core_number')
+        initial['collection_date'] = timezone.now()
+        return initial
+
+    def get_formset(self, sections=1):
+        formset_class = core_section_formset(sections, self.max_sections)
+        if self.request.method == 'POST':
+            return formset_class(self.request.POST, instance=self.well, prefix='sections')
+        return formset_class(instance=self.well, prefix='sections', queryset=Core.objects.none())
+
+    def get(self, request, *args, **kwargs):
+        self.well = get_well_from_pk(well_pk=self.kwargs['pk'], Well=Well)
+        try:
+            sections = int(request.GET.get('sections', 1))
+        except ValueError:
+            sections = 1
+        sections = max(1, min(sections, self.max_sections))
+        return render(request, self.template_name, {'well': self.well,
+                                                    'form': self.get_form(),
+                                                    'formset': self.get_formset(sections)})
+
+    def post(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            current_user = request.user
+        else:
+            raise Exception('User is not authenticated')
+
+        self.well = get_well_from_pk(well_pk=self.kwargs['pk'], Well=Well)
+        set_success_url(self, 'create_sample')
+
+        form = self.get_form()
+        formset = self.get_formset()
+        context = {'well': self.well, 'form': form, 'formset': formset}
+
+        if not (form.is_valid() and formset.is_valid()):
+            return render(request, self.template_name, context)
+
+        shared_data = form.cleaned_data
+        # An empty choice means that the drilling mud is unknown
+        shared_data['drilling_mud'] = shared_data['drilling_mud'] or None
+        sections = [section for section in formset.save(commit=False)]
+        if not sections:
+            form.add_error(None, 'At least one core section is required.')
+            return render(request, self.template_name, context)
+
+        with transaction.atomic():
+            # Lock the well so that concurrent registrations of the same core wait for us
+            well = Well.objects.select_for_update().get(pk=self.well.pk)
+            if well.closed:
+                form.add_error(None, closed_well_message(well))
+                return render(request, self.template_name, context)
+            numbers = allocate_core_section_numbers(
+                Core, well, shared_data['core_number'], len(sections))
+
+            for section, core_section_number in zip(sections, numbers):
+                section.well = well
+                section.registered_by = current_user
+                section.core_section_number = core_section_number
+                section.core_section_name = f"{well.name}-{shared_data['core_number']}-{core_section_number}"
+                for field, value in shared_data.items():
+                    setattr(section, field, value)
+
+            names = [section.core_section_name for section in sections]
+            if with_archive(Core, core_section_name__in=names).exists():
+                form.add_error(None, f'Some of the core sections {names} already exist. Please try again.')
+                return render(request, self.template_name, context)
+
+            for section in sections:
+                payload = model_to_dict(section)
+                payload['well'] = well.name
+                payload['core_section_name'] = section.core_section_name
+                payload['id'] = 1
+                checked_core = _validate(payload=payload, model_name='Core')
+                if type(checked_core) is ValidationError:
+                    registry.add_errors(form, checked_core, 'Core', prefix=section.core_section_name)
+                    return render(request, self.template_name, context)
+
+            bulk_create(Core, sections)
+            # bulk_create does not send the post_save signals
+            samples_changed(Core, sections[0].well_id)
+            record_bulk(Core, sections, 'create')
+
+        return redirect(self.success_url)
+
+
+class CoreChipSelectView(ReplicaReadMixin, ListView):
     template_name = 'corechip_select.html'
     success_url = ""
 
+    @well_conditional
     def get(self, request, *args, **kwargs):
         well = get_well_from_pk(well_pk=self.kwargs['pk'], Well=Well)
-        cores = Core.objects.filter(well=well)
+        cores = with_archive(Core, well=well)
 
         self.success_url = reverse_lazy('corechips_select', kwargs={'pk': well.pk})
         return render(request, self.template_name, {'well': well,
-                                                    'corechips_select': cores})
+                                                    'corechips_select': cores,
+                                                    'fragment_cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT})
 
 class CoreChipFormView(FormView):
     template_name = 'corechip_form.html'
@@ -365,7 +523,7 @@ class CoreChipFormView(FormView):
 
         core_number = self.request.GET.get('core_number')
         initial['core_number'] = core_number
-        initial['core_section_number'] = calculate_next_core_section_number(Core, core_number)
+        initial['core_section_number'] = calculate_next_core_section_number(Core, core_number, self.well_name)
         return initial
 
     def get(self, request, *args, **kwargs):
@@ -415,7 +573,7 @@ class CoreChipFormView(FormView):
         # Add the corechip name to the post data to make the post data valid
         corechip_name = f"{post_data.get('well')}-{post_data.get('core_number')}-{post_data.get('core_section_number')}-{post_data.get('corechip_number')}-{post_data.get('from_top_bottom')}"
         
-        if CoreChip.objects.filter(corechip_name=corechip_name).exists():
+        if with_archive(CoreChip, corechip_name=corechip_name).exists():
             form = self.get_form()
             form.add_error(
                 'corechip_name', f'A corechip with name {corechip_name} already exists. Please try again with a number bigger than {post_data.get("corechip_number") }.')
@@ -426,10 +584,7 @@ class CoreChipFormView(FormView):
         if checked_corechip is not None:
             if checked_corechip is ValidationError:
                 form = self.get_form()
-                for error in checked_corechip.errors():
-                    field = error['loc'][0]
-                    message = error['msg']
-                    form.add_error(field, message)
+                registry.add_errors(form, checked_corechip, 'CoreChip')
 
                 return self.form_invalid(form)
 
@@ -486,10 +641,7 @@ class MicroCoreFormView(FormView):
         if checked_microcore is not None:
             if checked_microcore is ValidationError:
                 form = self.get_form()
-                for error in checked_microcore.errors():
-                    field = error['loc'][0]
-                    message = error['msg']
-                    form.add_error(field, message)
+                registry.add_errors(form, checked_microcore, 'MicroCore')
 
                 return self.form_invalid(form)
         
@@ -551,10 +703,7 @@ class CuttingsFormView(FormView):
         if checked_cuttings is not None:
             if type(checked_cuttings) is ValidationError:
                 form = self.get_form()
-                for error in checked_cuttings.errors():
-                    field = error['loc'][0]
-                    message = error['msg']
-                    form.add_error(field, message)
+                registry.add_errors(form, checked_cuttings, 'Cuttings')
                 return self.form_invalid(form)
 
         form = self.get_form()
@@ -565,3 +714,246 @@ class CuttingsFormView(FormView):
             return super().form_valid(form)
         else:
             return self.form_invalid(form)
+
+
+class SearchView(ReplicaReadMixin, View):
+    ''' Search samples by name, remarks, lithology and formation, it answers with json
+    so that it can be used for typeahead in the forms
+    Example: /search/?q=sandstone&type=core&limit=10
+    '''
+    @wells_conditional
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = int(request.GET.get('limit', search.DEFAULT_LIMIT))
+            results = search.search(request.GET.get('q'), sample_type=request.GET.get('type'), limit=limit)
+        except ValueError as e:
+            return JsonResponse({'errors': [str(e)]}, status=400)
+        return JsonResponse({'results': results})
+
+
+class AutocompleteView(View):
+    ''' Names of wells or samples that start with the text typed by the user,
+    the forms fetch their options from here instead of listing every well
+    Example: /autocomplete/?kind=well&q=DEL
+    '''
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = int(request.GET.get('limit', AUTOCOMPLETE_LIMIT))
+            results = name_index.suggest(request.GET.get('kind', 'well'), request.GET.get('q', ''), limit)
+        except ValueError as e:
+            return JsonResponse({'errors': [str(e)]}, status=400)
+        return JsonResponse({'results': results})
+
+
+class ImportUploadView(LoginRequiredMixin, FormView):
+    ''' Upload a csv file of samples, the import runs in the worker and
+    the user is sent to a page that follows its progress
+    '''
+    template_name = 'import_upload.html'
+    form_class = ImportJobForm
+
+    def form_valid(self, form):
+        job = form.save(commit=False)
+        job.created_by = self.request.user
+        job.save()
+        enqueue(job)
+        return redirect('import_job', pk=job.pk)
+
+
+class ImportJobView(DetailView):
+    model = ImportJob
+    template_name = 'import_job.html'
+    context_object_name = 'job'
+
+
+class ImportProgressView(View):
+    ''' The progress of an import as json, polled by the import job page
+    Example: /imports/12/progress/
+    '''
+    def get(self, request, *args, **kwargs):
+        job = get_object_or_404(ImportJob, pk=kwargs['pk'])
+        return JsonResponse(job.progress())
+
+
+class BulkEditView(LoginRequiredMixin, FormView):
+    ''' Assign one value to a field of every sample that matches a filter,
+    e.g. mark all the sections of the core C3 of a well as ct scanned.
+    The middleware only sends the GET requests to the login, the mixin also covers the POST ones.
+    '''
+    template_name = 'bulk_edit.html'
+    form_class = BulkEditForm
+
+    def form_valid(self, form):
+        data = form.cleaned_data
+        model = BULK_EDIT_MODELS[data['sample_type']]
+        filters = {name: data[name] for name in ['well', 'core_number', 'min_depth', 'max_depth']}
+        try:
+            # The value is typed in as text, the form field of the model field reads it
+            value = model._meta.get_field(data['field']).formfield().clean(data['value'])
+            updated, errors = bulk_edit(model, filters, {data['field']: value}, user=self.request.user)
+        except DjangoValidationError as e:
+            form.add_error('value', e)
+            return self.form_invalid(form)
+        except (ValueError, FieldDoesNotExist) as e:
+            form.add_error(None, str(e))
+            return self.form_invalid(form)
+
+        for error in errors:
+            form.add_error('value' if error['field'] == data['field'] else None, error['msg'])
+        if errors:
+            return self.form_invalid(form)
+        return self.render_to_response(self.get_context_data(form=form, updated=updated))
+
+
+class CurveView(ReplicaReadMixin, View):
+    ''' The points of a measurement curve of a well between two depths as json, decimated
+    to at most 2 * buckets points for the plots
+    Example: /wells/3/curves/gamma_ray/?top=1500&bottom=1600&buckets=800
+    '''
+    def get(self, request, *args, **kwargs):
+        from . import curves
+
+        well = get_object_or_404(Well, pk=kwargs['pk'])
+        if kwargs['kind'] not in curves.KINDS:
+            return JsonResponse({'errors': [f"Unknown kind of curve {kwargs['kind']}"]}, status=400)
+        try:
+            top = float(request.GET['top']) if request.GET.get('top') else None
+            bottom = float(request.GET['bottom']) if request.GET.get('bottom') else None
+            buckets = int(request.GET.get('buckets', curves.DEFAULT_BUCKETS))
+        except ValueError:
+            return JsonResponse({'errors': ['top, bottom and buckets must be numbers']}, status=400)
+        buckets = min(buckets, curves.MAX_BUCKETS)
+        depths, values = curves.well_curve(well, kwargs['kind'], top, bottom, buckets)
+        return JsonResponse({'kind': kwargs['kind'], 'depth': depths.tolist(), 'value': values.tolist()})
+
+
+class DepthTrackView(ReplicaReadMixin, View):
+    ''' The tracks of the depth plot of a well as json: the cored intervals, the core chips,
+    the cuttings and the curves, reduced on the server to the height of the plot in pixels
+    Example: /wells/3/tracks/?top=1500&bottom=1600&height=800&method=lttb
+    '''
+    @well_conditional
+    def get(self, request, *args, **kwargs):
+        from . import plots
+
+        well = get_object_or_404(Well, pk=kwargs['pk'])
+        try:
+            top = float(request.GET['top']) if request.GET.get('top') else None
+            bottom = float(request.GET['bottom']) if request.GET.get('bottom') else None
+            height = int(request.GET.get('height', 800))
+            tracks = plots.depth_tracks(well, top, bottom, height, request.GET.get('method', 'minmax'))
+        except ValueError as e:
+            return JsonResponse({'errors': [str(e)]}, status=400)
+        return JsonResponse(tracks)
+
+
+class CtVolumeView(ReplicaReadMixin, View):
+    ''' The size of a CT volume and the urls of its tiles as json, for the viewer
+    Example: /ct/5/
+    '''
+    def get(self, request, *args, **kwargs):
+        from . import ct
+
+        volume = get_object_or_404(CtVolume, pk=kwargs['pk'])
+        url = reverse('ct_volume', kwargs={'pk': volume.pk})
+        return JsonResponse({
+            'core': volume.core_id, 'kind': volume.kind, 'dtype': volume.dtype, 'voxel_size': volume.voxel_size,
+            'shape': [volume.slices, volume.height, volume.width], 'tile_size': volume.tile_size,
+            'tiles': [volume.slices, -(-volume.height // volume.tile_size), -(-volume.width // volume.tile_size)],
+            'thumbnail_shape': ct.thumbnail_shape(volume),
+            'tile_url': url + 'tiles/{z}/{row}/{column}/',
+            'thumbnail_url': url + 'thumbnails/{z}/',
+        })
+
+
+def raw_response(request, data, shape, dtype):
+    ''' The bytes of a tile, or the part of them asked with a Range header.
+    The tiles of a volume never change, the browsers can keep them.
+    '''
+    from . import ct
+
+    try:
+        requested = ct.byte_range(request.headers.get('Range'), len(data))
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{len(data)}'
+        return response
+    if requested is None:
+        response = HttpResponse(data, content_type='application/octet-stream')
+    else:
+        start, end = requested
+        response = HttpResponse(data[start:end + 1], status=206, content_type='application/octet-stream')
+        response['Content-Range'] = f'bytes {start}-{end}/{len(data)}'
+    response['Accept-Ranges'] = 'bytes'
+    response['X-Shape'] = ','.join(str(size) for size in shape)
+    response['X-Dtype'] = dtype
+    response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+
+class CtTileView(ReplicaReadMixin, View):
+    ''' The raw voxels of a tile of a slice of a CT volume, read from the memory map
+    Example: /ct/5/tiles/120/2/1/
+    '''
+    def get(self, request, *args, **kwargs):
+        from . import ct
+
+        volume = get_object_or_404(CtVolume, pk=kwargs['pk'])
+        try:
+            data = ct.tile(volume, kwargs['z'], kwargs['row'], kwargs['column'])
+        except IndexError as e:
+            return JsonResponse({'errors': [str(e)]}, status=404)
+        return raw_response(request, data, ct.tile_shape(volume), volume.dtype)
+
+
+class CtThumbnailView(ReplicaReadMixin, View):
+    ''' The raw voxels of the thumbnail of a slice of a CT volume
+    Example: /ct/5/thumbnails/120/
+    '''
+    def get(self, request, *args, **kwargs):
+        from . import ct
+
+        volume = get_object_or_404(CtVolume, pk=kwargs['pk'])
+        try:
+            data = ct.thumbnail(volume, kwargs['z'])
+        except IndexError as e:
+            return JsonResponse({'errors': [str(e)]}, status=404)
+        return raw_response(request, data, ct.thumbnail_shape(volume), volume.dtype)
+
+
+class CoreBoxView(ReplicaReadMixin, View):
+    ''' The photos of the sections of the cores of a well, the page only loads the thumbnails,
+    they link to the web sized copies
+    Example: /wells/3/photos/?core_number=C3
+    '''
+    template_name = 'core_box.html'
+
+    @well_conditional
+    def get(self, request, *args, **kwargs):
+        well = get_object_or_404(Well, pk=kwargs['pk'])
+        core_number = request.GET.get('core_number') or None
+        filters = {'well': well} if core_number is None else {'well': well, 'core_number': core_number}
+        sections = list(with_archive(Core, **filters).order_by('core_number', 'core_section_number'))
+        section_photos = photos.sample_photos('Core', [section.pk for section in sections])
+        rows = [(section, [(photos.photo_url(photo, 'thumbnail'), photos.photo_url(photo, 'web'), photo)
+                           for photo in section_photos.get(section.pk, [])])
+                for section in sections]
+        return render(request, self.template_name, {'well': well, 'core_number': core_number, 'rows': rows})
+
+
+class CoreReportView(ReplicaReadMixin, View):
+    ''' The recovery, the lengths, the gaps and the weights of the core runs of a well,
+    as a page or as json with ?format=json
+    Example: /wells/3/core-report/?format=json
+    '''
+    template_name = 'core_report.html'
+
+    @well_conditional
+    def get(self, request, *args, **kwargs):
+        from .core_report import core_report
+
+        well = get_object_or_404(Well, pk=kwargs['pk'])
+        report = core_report(well)
+        if request.GET.get('format') == 'json':
+            return JsonResponse(report)
+        return render(request, self.template_name, {'well': well, 'report': report})
@@ -0,0 +1,164 @@
+''' Move the well foreign key of the samples from the well name to the integer Well.id.
+
+The samples used to point to their well with `ForeignKey(Well, to_field='name')`, every
+row of the sample tables and of their indexes carried a VARCHAR(255) copy of the name.
+The models now point to Well.id, the databases created before have to be converted.
+The new code can not run on a database that is not converted, so the conversion runs
+from the new image in one-off containers while the containers of the old image keep
+serving, and the new containers are only started after the swap:
+
+1. `docker compose build`, then, with the old containers still running,
+   `docker compose run --rm --no-deps web python manage.py migrate_well_keys`:
+   a `well_ref` BIGINT column is added to every sample table (hot and archive) and
+   filled in chunks of rows by primary key. The old code does not know the new column,
+   every chunk is its own short UPDATE, the inserts of the rig teams are never blocked
+   for long. It can be run again as often as needed, it only fills the rows that are
+   still empty.
+2. `docker compose stop web worker`, then `migrate_well_keys --swap` the same way: the
+   rows inserted since the last backfill are filled, `well_id` is renamed to `well_name`
+   and `well_ref` becomes the new `well_id` with a foreign key to crudapp_well(id).
+   Then `docker compose up -d` starts the new code.
+3. `--drop-old`, once the new code works: drop the `well_name` columns.
+
+The migrations are in crudapp/migrations and the containers only apply them, with
+--fake-initial for the databases whose tables were made by the makemigrations the
+containers used to run at start. 0003_well_id_keys records the new well_id in the
+migration state and leaves the tables converted by the swap alone, it only converts the
+empty tables that still hold the names (a new database) and stops on the others.
+
+The forms and the importers keep sending well names, see WellNameField in forms.py
+and the wells_by_name lookups of the api and of the import jobs.
+'''
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .models import Well, ARCHIVE_MODELS
+
+NEW_COLUMN = 'well_ref'
+OLD_COLUMN = 'well_name'
+CHUNK_SIZE = 5000
+
+
+def sample_tables():
+    tables = []
+    for model, archive in ARCHIVE_MODELS.items():
+        tables.extend([model._meta.db_table, archive._meta.db_table])
+    return tables
+
+
+def columns(cursor, connection, table):
+    ''' The columns of a table and the django field type that matches them
+    '''
+    return {
+        column.name: connection.introspection.get_field_type(column.type_code, column)
+        for column in connection.introspection.get_table_description(cursor, table)
+    }
+
+
+def table_state(table, using=DEFAULT_DB_ALIAS):
+    ''' Where the conversion of a table is:
+    - 'missing': the table does not exist in this database
+    - 'name': well_id still holds the name of the well
+    - 'converted': well_id is the id of the well, well_name may still be there
+    '''
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            return 'missing'
+        table_columns = columns(cursor, connection, table)
+    if table_columns.get('well_id') == 'CharField':
+        return 'name'
+    return 'converted'
+
+
+def add_column(table, using=DEFAULT_DB_ALIAS):
+    ''' Add the nullable well_ref column and its index, both are online operations in MySQL
+    '''
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        if NEW_COLUMN in columns(cursor, connection, table):
+            return False
+        cursor.execute(f'ALTER TABLE {quote(table)} ADD COLUMN {quote(NEW_COLUMN)} bigint NULL')
+        cursor.execute(f'CREATE INDEX {quote(table + "_" + NEW_COLUMN)} ON {quote(table)} ({quote(NEW_COLUMN)})')
+    return True
+
+
+def backfill(table, chunk_size=CHUNK_SIZE, pause=0, progress=None, using=DEFAULT_DB_ALIAS):
+    ''' Copy the id of the well to well_ref, a chunk of primary keys at a time.
+    Returns the number of rows filled and the number of rows left without a well.
+    '''
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    well_table = quote(Well._meta.db_table)
+    sample_table = quote(table)
+
+    filled = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN(id), MAX(id) FROM {sample_table} WHERE {quote(NEW_COLUMN)} IS NULL')
+        first, last = cursor.fetchone()
+        if first is None:
+            return filled, 0
+
+        for start in range(first, last + 1, chunk_size):
+            # Autocommit, every chunk is its own short transaction
+            cursor.execute(
+                f'UPDATE {sample_table} SET {quote(NEW_COLUMN)} = '
+                f'(SELECT w.id FROM {well_table} w WHERE w.name = {sample_table}.well_id) '
+                f'WHERE id >= %s AND id < %s AND {quote(NEW_COLUMN)} IS NULL',
+                [start, start + chunk_size])
+            filled += cursor.rowcount
+            if progress is not None:
+                progress(table, min(start + chunk_size - 1, last), last)
+            if pause:
+                time.sleep(pause)
+
+        cursor.execute(f'SELECT COUNT(*) FROM {sample_table} WHERE {quote(NEW_COLUMN)} IS NULL')
+        missing = cursor.fetchone()[0]
+    return filled, missing
+
+
+def swap(table, using=DEFAULT_DB_ALIAS):
+    ''' Make well_ref the well_id of the table, the writers have to be stopped
+    '''
+    connection = connections[using]
+    if connection.vendor != 'mysql':
+        raise NotImplementedError(
+            f'The swap needs MySQL, recreate the {connection.vendor} database with the new models instead')
+    quote = connection.ops.quote_name
+
+    filled, missing = backfill(table, using=using)
+    if missing:
+        raise ValueError(f'{missing} rows of {table} point to a well that does not exist')
+
+    with connection.cursor() as cursor:
+        foreign_keys = [
+            name for name, constraint in connection.introspection.get_constraints(cursor, table).items()
+            if constraint['foreign_key'] and constraint['columns'] == ['well_id']
+        ]
+        changes = [f'DROP FOREIGN KEY {quote(name)}' for name in foreign_keys] + [
+            f'CHANGE well_id {quote(OLD_COLUMN)} varchar(255) NULL',
+            f'CHANGE {quote(NEW_COLUMN)} well_id bigint NOT NULL',
+        ]
+        cursor.execute(f'ALTER TABLE {quote(table)} {", ".join(changes)}, ALGORITHM=INPLACE, LOCK=NONE')
+
+        # Every row was just checked, the constraint is added without scanning the table again
+        cursor.execute('SET foreign_key_checks = 0')
+        try:
+            cursor.execute(
+                f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(table + "_well_id_fk")} '
+                f'FOREIGN KEY (well_id) REFERENCES {quote(Well._meta.db_table)} (id), ALGORITHM=INPLACE')
+        finally:
+            cursor.execute('SET foreign_key_checks = 1')
+    return filled
+
+
+def drop_old(table, using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        if OLD_COLUMN not in columns(cursor, connection, table):
+            return False
+        cursor.execute(f'ALTER TABLE {quote(table)} DROP COLUMN {quote(OLD_COLUMN)}')
+    return True
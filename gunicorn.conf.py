@@ -0,0 +1,17 @@
+''' Configuration of gunicorn in the production containers
+
+Usage:
+>>> gunicorn -c gunicorn.conf.py rockin.wsgi:application
+'''
+import os
+
+bind = '0.0.0.0:5000'
+workers = int(os.environ.get('WEB_CONCURRENCY', 3))
+timeout = 120
+
+
+def post_worker_init(worker):
+    # Django is loaded by now, the worker warms up before it accepts its first request
+    from crudapp.warmup import warm_up
+    timings = warm_up()
+    worker.log.info('Worker %s warmed up %s', worker.pid, timings)
@@ -28,6 +28,10 @@ SECRET_KEY = 'django-insecure-zj*vccogzcfujkxjl#n#*7um)mz!b34%)nw@2ys5$q&)veq9ps
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.environ.get('DEBUG', False)
 
+# Set in the production containers, it enables the settings that need a deployment step
+# such as the collected and hashed static files
+PRODUCTION = os.environ.get('PRODUCTION', False)
+
 ALLOWED_HOSTS = [
     'localhost', os.environ.get('APP_HOST'), os.environ.get('DB_HOST')
 ]
@@ -53,6 +57,8 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'crudapp.middleware.CustomAuthenticationMiddleware',
+    'crudapp.audit.AuditUserMiddleware',
+    'crudapp.routers.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -78,7 +84,16 @@ TEMPLATES = [
     },
 ]
 
-# STATIC_ROOT = os.path.join(BASE_DIR, 'crudapp/templates')
+if PRODUCTION:
+    # Compile every template once per process instead of on every render,
+    # the warm up of the workers (crudapp/warmup.py) fills this cache before the first request
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
 
 WSGI_APPLICATION = 'rockin.wsgi.application'
 
@@ -96,6 +111,9 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PWD'),
         'HOST': os.environ.get('DB_HOST'),
         'PORT': os.environ.get('DB_PORT'),
+        # Keep the connection open between requests, the warm up of the workers opens it
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
     },
     'test': {
         'ENGINE': 'django.db.backends.mysql',
@@ -107,6 +125,47 @@ DATABASES = {
     }
 }
 
+# Read replica of the database, the lists, the search and the reports read from it (see crudapp/routers.py)
+if os.environ.get('DB_REPLICA_HOST') or os.environ.get('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.environ.get('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        # The tests do not create a second database, they read from the primary
+        'TEST': {'MIRROR': 'default'},
+    }
+REPLICA_DATABASE = 'replica' if 'replica' in DATABASES else None
+# How long a user that wrote something keeps reading from the primary, longer than the lag of the replica
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+DATABASE_ROUTERS = ['crudapp.routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The redis service of docker compose is shared by all the workers, without it every process keeps its own cache
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# The queue of the csv imports, see crudapp/jobs.py. Without it the imports run in the web process
+IMPORT_QUEUE_URL = os.environ.get('IMPORT_QUEUE_URL', os.environ.get('REDIS_URL'))
+
+# How long the rendered tables of a well are kept, they are keyed by the version of the well
+# so a stale table is never served, the timeout only frees the memory of old versions
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -154,11 +213,41 @@ USE_L10N = False
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
-STATIC_URL = 'static/'
+STATIC_URL = '/static/'
 
-STATICFILES_DIRS = [
-    BASE_DIR / 'crudapp/templates/',
-]
+# collectstatic copies the files here, nginx serves this folder at /static/
+STATIC_ROOT = os.environ.get('STATIC_ROOT', BASE_DIR / 'staticfiles')
+
+# The static files of the app live in crudapp/static and are found by the app directories finder
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        # Hashed file names only exist after collectstatic, so they are only used in production
+        'BACKEND': 'crudapp.storage.CompressedManifestStaticFilesStorage' if PRODUCTION
+                   else 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Audit log, see crudapp/audit.py. The entries are written to the database in batches of
+# AUDIT_BUFFER_SIZE or every AUDIT_FLUSH_INTERVAL seconds, until then they are kept in the spool
+AUDIT_SPOOL_DIR = os.environ.get('AUDIT_SPOOL_DIR', BASE_DIR / 'audit_spool')
+AUDIT_BUFFER_SIZE = int(os.environ.get('AUDIT_BUFFER_SIZE', 200))
+AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 5))
+
+# Uploaded files, the csv files of the imports are read from here by the worker
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', BASE_DIR / 'media')
+
+# The tiled CT volumes, see crudapp/ct.py. They are memory mapped, so they must be on a local disk
+CT_VOLUME_ROOT = os.environ.get('CT_VOLUME_ROOT', os.path.join(MEDIA_ROOT, 'ct'))
+# The memory of every worker for the tiles that were served last
+CT_TILE_CACHE_BYTES = int(os.environ.get('CT_TILE_CACHE_BYTES', 64 * 1024 * 1024))
+
+# The photos of the samples and their thumbnails, see crudapp/photos.py. The files are named
+# after their content and never change, nginx serves PHOTO_ROOT at PHOTO_URL with a cache of a year
+PHOTO_ROOT = os.environ.get('PHOTO_ROOT', os.path.join(MEDIA_ROOT, 'photos'))
+PHOTO_URL = '/photos/'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -14,10 +14,12 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from django.contrib.auth import views as auth_views
-from crudapp import views
+from crudapp import views, api
 
 urlpatterns = [
     path('', views.HomeView.as_view(), name='index'),
@@ -35,7 +37,27 @@ urlpatterns = [
     path('wells/<int:pk>/samples/create/', views.SampleFormView.as_view(), name='create_sample'),
     path('wells/<int:pk>/', views.CoreNumberSelectView.as_view(), name='select_core_number'),
     path('wells/<int:pk>/cores/create/', views.CoreFormView.as_view(), name='core_form'),
+    path('wells/<int:pk>/cores/batch/', views.CoreBatchFormView.as_view(), name='core_batch'),
     path('wells/<int:pk>/corechips/create/', views.CoreChipFormView.as_view(), name='corechips'),
     path('wells/<int:pk>/corechips/select/', views.CoreChipSelectView.as_view(), name='corechips_select'), # A core needs to be selected before a corechip can be created
     path('wells/<int:pk>/microcores/create/', views.MicroCoreFormView.as_view(), name='microcores'),
+    path('wells/<int:pk>/curves/<str:kind>/', views.CurveView.as_view(), name='well_curve'),
+    path('wells/<int:pk>/tracks/', views.DepthTrackView.as_view(), name='depth_tracks'),
+    path('wells/<int:pk>/core-report/', views.CoreReportView.as_view(), name='core_report'),
+    path('wells/<int:pk>/photos/', views.CoreBoxView.as_view(), name='core_box'),
+    path('ct/<int:pk>/', views.CtVolumeView.as_view(), name='ct_volume'),
+    path('ct/<int:pk>/tiles/<int:z>/<int:row>/<int:column>/', views.CtTileView.as_view(), name='ct_tile'),
+    path('ct/<int:pk>/thumbnails/<int:z>/', views.CtThumbnailView.as_view(), name='ct_thumbnail'),
+    path('search/', views.SearchView.as_view(), name='search'),
+    path('autocomplete/', views.AutocompleteView.as_view(), name='autocomplete'),
+    path('imports/', views.ImportUploadView.as_view(), name='import_upload'),
+    path('imports/<int:pk>/', views.ImportJobView.as_view(), name='import_job'),
+    path('imports/<int:pk>/progress/', views.ImportProgressView.as_view(), name='import_progress'),
+    path('samples/bulk-edit/', views.BulkEditView.as_view(), name='bulk_edit'),
+    path('api/<str:resource>/', api.ApiListView.as_view(), name='api_list'),
+    path('api/<str:resource>/bulk-edit/', api.ApiBulkEditView.as_view(), name='api_bulk_edit'),
+    path('api/<str:resource>/<int:pk>/', api.ApiDetailView.as_view(), name='api_detail'),
 ]
+
+# nginx serves the photos in production, static() does nothing when DEBUG is off
+urlpatterns += static(settings.PHOTO_URL, document_root=settings.PHOTO_ROOT)